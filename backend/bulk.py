@@ -0,0 +1,228 @@
+"""
+Bulk import and export of complaints and users as NDJSON (one JSON object per line).
+
+Exports stream one record at a time. Imports run in two passes so memory
+stays bounded whatever the input size:
+
+1. feed() validates the input in batches of BATCH_SIZE lines against the API
+   models (Complaint, RegisterRequest) and the stores (complaint authors must
+   exist, user phones must be new), and spools the valid records to a
+   temporary file.
+2. commit() writes them in chunks of COMMIT_SIZE: each chunk saves its
+   touched complaint shards, the directory and the author index, or
+   users.json, once. Complaint ids are reserved in one block up front.
+
+An import is all or nothing: with any invalid line nothing is written and
+the report lists the errors, unless skip_invalid is set. A store error in
+the middle of commit() (e.g. a disk filling up) leaves the chunks written
+before it in place. Complaint timestamps must be ISO datetimes (analytics
+and archival parse them); they are stored in the app's own naive local form.
+
+Used by `python -m backend.cli import-ndjson/export-ndjson` and the /admin endpoints.
+"""
+
+import heapq
+import json
+import tempfile
+from datetime import datetime
+from itertools import islice
+from typing import List
+from pydantic import TypeAdapter, ValidationError, field_validator
+from .jobs import jobs
+from .routes.auth import RegisterRequest
+from .routes.complaints import Complaint
+from .utils import analytics, auth_utils, complaint_archive, complaint_store
+from .utils.id_sequence import reserve
+
+BATCH_SIZE = 1000
+# Records written per store save during commit()
+COMMIT_SIZE = 10000
+# Errors listed in an import report; the count is always complete
+MAX_REPORTED_ERRORS = 100
+
+
+def _ndjson(records):
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def export_complaints(include_archived: bool = True):
+    """NDJSON lines of every complaint in id order."""
+    if include_archived:
+        return _ndjson(heapq.merge(complaint_store.iter_all(), complaint_archive.iter_all(), key=lambda c: c["id"]))
+    return _ndjson(complaint_store.iter_all())
+
+
+def export_users():
+    """NDJSON lines of every user, without passwords."""
+    return _ndjson(auth_utils.public_profile(user) for user in auth_utils.get_all_users())
+
+
+def _error_message(errors: list) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in errors)
+
+
+class _Import:
+    """
+    Validates NDJSON lines batch by batch into a spool; commit() writes the valid records.
+    """
+    model = None
+
+    def __init__(self, skip_invalid: bool = False):
+        self.skip_invalid = skip_invalid
+        self.adapter = TypeAdapter(List[self.model])
+        self.count = 0  # valid records spooled
+        self.errors = []
+        self.error_count = 0
+        self.line = 0
+        self._batch = []  # (line number, record)
+        self._spool = tempfile.TemporaryFile("w+", encoding="utf-8")
+
+    def prepare(self, record: dict) -> dict:
+        """Fill in fields the caller may leave out before validation."""
+        return record
+
+    def check(self, record: dict) -> str | None:
+        """Error message for a valid record that conflicts with the stores, or None."""
+        return None
+
+    def feed(self, lines):
+        for line in lines:
+            self.line += 1
+            if isinstance(line, bytes):
+                line = line.decode("utf-8")
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("expected a JSON object")
+            except ValueError as e:
+                self._error(self.line, str(e))
+                continue
+            self._batch.append((self.line, self.prepare(record)))
+            if len(self._batch) >= BATCH_SIZE:
+                self._validate()
+
+    def _error(self, line: int, message: str):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def _validate(self):
+        batch, self._batch = self._batch, []
+        try:
+            valid = self.adapter.validate_python([record for _, record in batch])
+        except ValidationError as e:
+            by_index = {}
+            for error in e.errors():
+                by_index.setdefault(error["loc"][0], []).append({**error, "loc": error["loc"][1:]})
+            for index, errors in sorted(by_index.items()):
+                self._error(batch[index][0], _error_message(errors))
+            batch = [item for index, item in enumerate(batch) if index not in by_index]
+            valid = self.adapter.validate_python([record for _, record in batch])
+        for (line, _), item in zip(batch, valid):
+            record = item.model_dump()
+            error = self.check(record)
+            if error:
+                self._error(line, error)
+                continue
+            self._spool.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.count += 1
+
+    def chunks(self):
+        """The spooled records, COMMIT_SIZE at a time."""
+        self._spool.seek(0)
+        records = (json.loads(line) for line in self._spool)
+        while chunk := list(islice(records, COMMIT_SIZE)):
+            yield chunk
+
+    def commit(self) -> dict:
+        """
+        Validate what is left and write every valid record, unless there
+        were errors and skip_invalid is off. Returns the import report.
+        """
+        try:
+            if self._batch:
+                self._validate()
+            report = {"imported": 0, "invalid": self.error_count, "errors": self.errors}
+            if self.error_count and not self.skip_invalid:
+                return report
+            if self.count:
+                report["ids"] = self.write()
+                report["imported"] = self.count
+            return report
+        finally:
+            self._spool.close()
+
+    def write(self) -> list:
+        """Write chunks(); returns the first and last id assigned."""
+        raise NotImplementedError
+
+
+class ImportedComplaint(Complaint):
+    @field_validator("created_at", "completed_at")
+    @classmethod
+    def iso_datetime(cls, value):
+        if value is None:
+            return value
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            raise ValueError("expected an ISO date or datetime")
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone().replace(tzinfo=None)
+        return parsed.isoformat()
+
+
+class ComplaintImport(_Import):
+    model = ImportedComplaint
+
+    def prepare(self, record: dict) -> dict:
+        # Ids are assigned on commit; votes, status and timestamps default like a new complaint
+        return {
+            "status": "open",
+            "created_at": datetime.now().isoformat(),
+            "upvoted_by": [],
+            **record,
+            "upvotes": len(record.get("upvoted_by") or []),
+            "id": 0,
+        }
+
+    def check(self, record: dict) -> str | None:
+        if auth_utils.get_user_by_id(record["author_id"]) is None:
+            return f"author_id: no user with id {record['author_id']}"
+        return None
+
+    def write(self) -> list:
+        seed = lambda: max(complaint_store.max_id(), complaint_archive.max_id())
+        ids = reserve("complaints", self.count, seed)
+        next_ids = iter(ids)
+        for chunk in self.chunks():
+            for complaint in chunk:
+                complaint["id"] = next(next_ids)
+            complaint_store.add_many(chunk)
+            jobs.enqueue("update_analytics", {"events": [analytics.status_event(c, None) for c in chunk]})
+        return [ids.start, ids.stop - 1]
+
+
+class UserImport(_Import):
+    model = RegisterRequest
+
+    def __init__(self, skip_invalid: bool = False):
+        super().__init__(skip_invalid)
+        self._phones = set()  # phones of this import, so repeats are line errors too
+
+    def check(self, record: dict) -> str | None:
+        phone = record["phone"]
+        if phone in self._phones or auth_utils.get_user_by_phone(phone) is not None:
+            return f"phone: already registered: {phone}"
+        self._phones.add(phone)
+        return None
+
+    def write(self) -> list:
+        ids = []
+        for chunk in self.chunks():
+            added = auth_utils.add_users(chunk)
+            ids = [ids[0] if ids else added[0]["id"], added[-1]["id"]]
+        return ids
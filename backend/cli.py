@@ -0,0 +1,137 @@
+"""
+Hamro Aawaz maintenance commands.
+
+Usage:
+    python -m backend.cli archive-activities [--days N]
+    python -m backend.cli archive-complaints [--days N]
+    python -m backend.cli rebuild-timeline
+    python -m backend.cli rebuild-analytics
+    python -m backend.cli import-json
+    python -m backend.cli export-json
+    python -m backend.cli import-ndjson {complaints,users} FILE [--skip-invalid]
+    python -m backend.cli export-ndjson {complaints,users} [--out FILE]
+"""
+
+import argparse
+import sys
+from .utils import file_handler
+from .utils import activity_log, analytics, complaint_archive, complaint_timeline, municipality_store
+
+
+def archive_activities(args):
+    total = 0
+    for key in municipality_store.load_index():
+        archived = activity_log.archive(key, args.days)
+        if archived:
+            print(f"{key}: archived {archived} segment(s)")
+        total += archived
+    print(f"Archived {total} segment(s) older than {args.days} days")
+
+
+def archive_complaints(args):
+    moved = complaint_archive.archive_completed(args.days)
+    print(f"Archived {moved} complaint(s) completed more than {args.days} days ago")
+
+
+def rebuild_timeline(args):
+    complaint_timeline.rebuild()
+    print("Rebuilt complaint timeline index")
+
+
+def rebuild_analytics(args):
+    analytics.rebuild()
+    print("Rebuilt analytics rollups from the complaint store and archive")
+
+
+def import_json(args):
+    """Convert every JSON data file into a binary snapshot."""
+    names = [n for n in file_handler.data_files() if (file_handler.DATA_DIR/n).exists()]
+    for name in names:
+        file_handler.import_json(name)
+    print(f"Wrote {len(names)} snapshot(s); set HAMRO_SNAPSHOT_FORMAT=binary to keep saving snapshots")
+
+
+def export_json(args):
+    """Write every data file back out as human-readable JSON."""
+    names = file_handler.data_files()
+    for name in names:
+        file_handler.export_json(name)
+    print(f"Exported {len(names)} file(s) as JSON")
+
+
+def import_ndjson(args):
+    """Validate and import complaints or users from an NDJSON file (- for stdin)."""
+    from .bulk import ComplaintImport, UserImport
+
+    importer = (ComplaintImport if args.kind == "complaints" else UserImport)(args.skip_invalid)
+    source = sys.stdin if args.file == "-" else open(args.file, encoding="utf-8")
+    with source:
+        importer.feed(source)
+    try:
+        report = importer.commit()
+    except ValueError as e:
+        raise SystemExit(f"Nothing imported: {e}")
+    for error in report["errors"]:
+        print(f"line {error['line']}: {error['error']}", file=sys.stderr)
+    if report["invalid"] and not args.skip_invalid:
+        raise SystemExit(f"{report['invalid']} invalid record(s), nothing imported; "
+                         "use --skip-invalid to import the rest")
+    print(f"Imported {report['imported']} {args.kind} (ids {report.get('ids')}), skipped {report['invalid']}")
+
+
+def export_ndjson(args):
+    """Stream complaints or users to an NDJSON file (stdout by default)."""
+    from .bulk import export_complaints, export_users
+
+    lines = export_complaints(not args.hot_only) if args.kind == "complaints" else export_users()
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    count = 0
+    try:
+        for line in lines:
+            out.write(line)
+            count += 1
+    finally:
+        if args.out:
+            out.close()
+    print(f"Exported {count} {args.kind}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m backend.cli", description="Hamro Aawaz maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    archive = commands.add_parser("archive-activities", help="Compress activity segments past the retention age")
+    archive.add_argument("--days", type=int, default=activity_log.RETENTION_DAYS, help="Retention age in days")
+    archive.set_defaults(func=archive_activities)
+
+    archive = commands.add_parser("archive-complaints", help="Move old completed complaints to the archive tier")
+    archive.add_argument("--days", type=int, default=complaint_archive.ARCHIVE_AFTER_DAYS, help="Age in days")
+    archive.set_defaults(func=archive_complaints)
+
+    timeline = commands.add_parser("rebuild-timeline", help="Rebuild the complaint id -> activities index")
+    timeline.set_defaults(func=rebuild_timeline)
+
+    rollups = commands.add_parser("rebuild-analytics", help="Backfill the per-ward backlog and resolution rollups")
+    rollups.set_defaults(func=rebuild_analytics)
+
+    commands.add_parser("import-json", help="Convert JSON data files to binary snapshots").set_defaults(func=import_json)
+    commands.add_parser("export-json", help="Export data files as human-readable JSON").set_defaults(func=export_json)
+
+    ndjson = commands.add_parser("import-ndjson", help="Import complaints or users from NDJSON in bulk writes")
+    ndjson.add_argument("kind", choices=["complaints", "users"])
+    ndjson.add_argument("file", help="NDJSON file, or - for stdin")
+    ndjson.add_argument("--skip-invalid", action="store_true", help="Import the valid records despite errors")
+    ndjson.set_defaults(func=import_ndjson)
+
+    ndjson = commands.add_parser("export-ndjson", help="Stream complaints or users as NDJSON")
+    ndjson.add_argument("kind", choices=["complaints", "users"])
+    ndjson.add_argument("--out", help="Output file (default: stdout)")
+    ndjson.add_argument("--hot-only", action="store_true", help="Leave out archived complaints")
+    ndjson.set_defaults(func=export_ndjson)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from .utils.security import verify_token
+from .utils import rate_limit
+from .utils.job_queue import jobs
 
 # Use HTTPBearer instead of OAuth2PasswordBearer
 security = HTTPBearer()
@@ -21,3 +23,39 @@ def require_admin(user: dict = Depends(get_current_user)):
     if user.get("role") != "admin":
         raise HTTPException(status_code=403, detail="Admins only")
     return user
+
+def _too_many_requests(retry_after: int, detail: str):
+    raise HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=detail,
+        headers={"Retry-After": str(retry_after)},
+    )
+
+def _shed(limit: str):
+    retry_after = rate_limit.check_load(limit, jobs.pending)
+    if retry_after is not None:
+        _too_many_requests(retry_after, "Server is busy, try again shortly")
+
+def rate_limited(limit: str, shed: bool = True):
+    """
+    Dependency limiting the current user to the named limit (see
+    utils.rate_limit); with shed, writes are also refused while the job
+    backlog is too deep. Reuses the route's get_current_user result.
+    """
+    def dependency(current_user: dict = Depends(get_current_user)):
+        if shed:
+            _shed(limit)
+        retry_after = rate_limit.check(limit, current_user["id"])
+        if retry_after is not None:
+            _too_many_requests(retry_after, "Too many requests")
+    return dependency
+
+def rate_limited_by_ip(limit: str):
+    """
+    Like rate_limited, keyed by client address, for endpoints without a user (login).
+    """
+    def dependency(request: Request):
+        retry_after = rate_limit.check(limit, request.client.host if request.client else None)
+        if retry_after is not None:
+            _too_many_requests(retry_after, "Too many requests")
+    return dependency
@@ -0,0 +1,50 @@
+"""
+Post-commit side effects, run by the job queue (see utils.job_queue).
+
+Every handler may run again after it (partly) succeeded: a retry after an
+error, or a replay when the process died before the job was marked done.
+Each one skips what an earlier run already did:
+- store_upload finds the file already moved,
+- activities carry an id (see activity_log.new_id) and the feed and
+  the timeline index drop ids they already hold,
+- analytics rollups remember the jobs they have applied.
+"""
+
+import shutil
+from pathlib import Path
+from .utils import analytics, complaint_timeline, municipality_store
+from .utils.job_queue import jobs
+from .utils.metrics import Callback
+
+Callback("hamro_job_queue_depth", "Jobs waiting for a worker.", lambda: jobs.stats()["depth"])
+Callback("hamro_job_queue_pending", "Jobs queued, running or waiting to be retried.", lambda: jobs.stats()["pending"])
+Callback("hamro_jobs_failed_total", "Jobs given up after the last retry.", lambda: jobs.failed, kind="counter")
+
+
+@jobs.register("store_upload")
+def store_upload(payload: dict):
+    """Move an uploaded file from the spool into the public uploads directory."""
+    staged = Path(payload["blobs"]["file"])
+    target = Path(payload["target"])
+    if not staged.exists() and target.exists():
+        return  # moved by an earlier attempt
+    target.parent.mkdir(parents=True, exist_ok=True)
+    shutil.move(staged, target)
+
+
+@jobs.register("append_activities")
+def append_activities(payload: dict):
+    """Append activities to a municipality's feed, skipping ids it already has."""
+    municipality_store.append_activities(payload["key"], payload["activities"])
+
+
+@jobs.register("record_timeline")
+def record_timeline(payload: dict):
+    """Index status-change activities under the complaints they reference, skipping ids already indexed."""
+    complaint_timeline.record(payload["activities"], payload["municipality"])
+
+
+@jobs.register("update_analytics")
+def update_analytics(payload: dict):
+    """Apply complaint status events to the per-municipality analytics rollups, once per job."""
+    analytics.record(payload["events"], batch=payload.get("job_id"))
@@ -8,53 +8,105 @@ Features:
 - Authentication and authorization
 - Complaint management
 - Municipality activity tracking
+- Backlog and resolution-time analytics
+- NDJSON bulk import/export for admins
 - Static file serving for uploads
+- Start-up warm-up with health and readiness probes
+- Prometheus metrics and an optional slow-request profiler
 """
 
 import os
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from .routes.admin import admin_router
+from .routes.analytics import analytics_router
 from .routes.auth import auth_router
 from .routes.complaints import complaints_router
 from .routes.municipality import municipality_router
+from .dependency import require_admin
+from .jobs import jobs
+from .middleware import MetricsMiddleware
+from .utils import metrics
+from .utils.profiler import SlowRequestProfiler
+from .warmup import WarmUp
 
-# Initialize FastAPI application
-app = FastAPI(
-    title="Hamro Aawaz API",
-    description="A citizen-municipality collaboration platform for Nepal",
-    version="1.0.0"
-)
+# Configure file upload directories
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # Go up one level to project root
+UPLOADS_DIR = os.path.join(BASE_DIR, "backend", "uploads")  # Put uploads inside backend folder
 
-# Register routes
-app.include_router(auth_router)
-app.include_router(complaints_router)
-app.include_router(municipality_router)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Preload stores and indexes; /readyz reports progress
+    app.state.warmup.start()
+    yield
+    # Let queued post-commit jobs finish; anything left is replayed from the spool
+    jobs.stop(timeout=10)
 
-# Configure CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # In production, replace with specific origins
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
-# Configure file upload directories
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # Go up one level to project root
-UPLOADS_DIR = os.path.join(BASE_DIR, "backend", "uploads")  # Put uploads inside backend folder
+def create_app() -> FastAPI:
+    """
+    Build the FastAPI application. Nothing is read or created on disk until
+    the lifespan hook runs.
+    """
+    app = FastAPI(
+        title="Hamro Aawaz API",
+        description="A citizen-municipality collaboration platform for Nepal",
+        version="1.0.0",
+        lifespan=lifespan
+    )
+    app.state.warmup = WarmUp()
+
+    # Register routes
+    app.include_router(auth_router)
+    app.include_router(complaints_router)
+    app.include_router(municipality_router)
+    app.include_router(analytics_router)
+    app.include_router(admin_router)
+
+    # Configure CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # In production, replace with specific origins
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Outermost, so latency includes every other middleware
+    app.add_middleware(MetricsMiddleware, profiler=SlowRequestProfiler.from_env())
+
+    # Mount the uploads directory for static file serving (created by the warm-up)
+    app.mount("/uploads", StaticFiles(directory=UPLOADS_DIR, check_dir=False), name="uploads")
+
+    @app.get("/")
+    def root():
+        return {"message": "Complaint Box API running"}
+
+    # Liveness: the process is up and serving
+    @app.get("/healthz")
+    def healthz():
+        return {"status": "ok"}
+
+    # Readiness: 503 until every warm-up step has finished
+    @app.get("/readyz")
+    def readyz(request: Request):
+        report = request.app.state.warmup.report()
+        return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+    # Prometheus scrape endpoint (per worker process)
+    @app.get("/metrics", response_class=PlainTextResponse)
+    def prometheus_metrics():
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
-# Ensure directories exist
-os.makedirs(os.path.join(UPLOADS_DIR, "complaints"), exist_ok=True)
-os.makedirs(os.path.join(UPLOADS_DIR, "municipality"), exist_ok=True)
+    @app.get("/jobs/stats")
+    def job_stats(admin: dict = Depends(require_admin)):
+        return jobs.stats()
 
-print(f"Project root directory: {BASE_DIR}")  # Debug print
-print(f"Uploads directory: {UPLOADS_DIR}")  # Debug print
+    return app
 
-# Mount the uploads directory for static file serving
-app.mount("/uploads", StaticFiles(directory=UPLOADS_DIR), name="uploads")
 
-@app.get("/")
-def root():
-    return {"message": "Complaint Box API running"}
\ No newline at end of file
+app = create_app()
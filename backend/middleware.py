@@ -0,0 +1,56 @@
+"""
+Request instrumentation: per-route latency histogram and status counts for
+/metrics, plus the optional slow-request profiler (see utils.profiler).
+
+Written as plain ASGI middleware rather than BaseHTTPMiddleware so that it
+adds no extra task or response copy per request.
+"""
+
+import time
+from .utils.metrics import HTTP_DURATION, HTTP_REQUESTS
+from .utils.profiler import SlowRequestProfiler
+
+
+def route_label(scope: dict, root_path: str) -> str:
+    """
+    The matched route's template, the mount path for mounted apps
+    (/uploads), or <unmatched>.
+    """
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    mounted = scope.get("root_path", "")[len(root_path):]
+    return mounted or "<unmatched>"
+
+
+class MetricsMiddleware:
+
+    def __init__(self, app, profiler: SlowRequestProfiler | None = None):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500  # reported if the app raises before responding
+        root_path = scope.get("root_path", "")
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        sample = self.profiler.begin(f"{scope['method']} {scope['path']}") if self.profiler else None
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            if sample is not None:
+                self.profiler.end(sample)
+            route = route_label(scope, root_path)
+            HTTP_DURATION.observe(elapsed, method=scope["method"], route=route)
+            HTTP_REQUESTS.inc(method=scope["method"], route=route, status=status)
@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from .. import bulk
+from ..dependency import require_admin
+
+admin_router = APIRouter(prefix="/admin", tags=["Admin"])
+
+NDJSON = "application/x-ndjson"
+
+
+# ---------------- HELPERS ---------------- #
+async def feed_lines(request: Request, importer):
+    """
+    Split the streamed request body into lines and feed them to importer;
+    validation runs in the thread pool so the event loop keeps serving.
+    """
+    rest = b""
+    async for chunk in request.stream():
+        lines = (rest + chunk).split(b"\n")
+        rest = lines.pop()
+        await run_in_threadpool(importer.feed, lines)
+    await run_in_threadpool(importer.feed, [rest])
+
+
+async def run_import(request: Request, importer):
+    await feed_lines(request, importer)
+    try:
+        report = await run_in_threadpool(importer.commit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if report["invalid"] and not importer.skip_invalid:
+        raise HTTPException(status_code=422, detail=report)
+    return report
+
+
+# ---------------- ROUTES ---------------- #
+
+# 1. Export complaints as NDJSON (streamed)
+@admin_router.get("/export/complaints")
+def export_complaints(include_archived: bool = True, admin: dict = Depends(require_admin)):
+    return StreamingResponse(bulk.export_complaints(include_archived), media_type=NDJSON)
+
+# 2. Export users as NDJSON (streamed, without passwords)
+@admin_router.get("/export/users")
+def export_users(admin: dict = Depends(require_admin)):
+    return StreamingResponse(bulk.export_users(), media_type=NDJSON)
+
+# 3. Import complaints from an NDJSON request body
+@admin_router.post("/import/complaints")
+async def import_complaints(request: Request, skip_invalid: bool = False, admin: dict = Depends(require_admin)):
+    return await run_import(request, bulk.ComplaintImport(skip_invalid))
+
+# 4. Import users from an NDJSON request body
+@admin_router.post("/import/users")
+async def import_users(request: Request, skip_invalid: bool = False, admin: dict = Depends(require_admin)):
+    return await run_import(request, bulk.UserImport(skip_invalid))
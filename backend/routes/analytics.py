@@ -0,0 +1,64 @@
+from fastapi import APIRouter, Depends, HTTPException
+from datetime import date
+from typing import Optional
+from ..utils import analytics, municipality_store
+from ..dependency import get_current_user
+
+analytics_router = APIRouter(prefix="/analytics", tags=["Analytics"])
+
+
+# ---------------- HELPERS ---------------- #
+def require_official(current_user: dict = Depends(get_current_user)):
+    if current_user.get("role") not in ("staff", "admin"):
+        raise HTTPException(status_code=403, detail="Only municipal staff can view analytics")
+    return current_user
+
+def municipality_key_or_404(name: str) -> str:
+    municipality = municipality_store.find_municipality(name)
+    if not municipality:
+        raise HTTPException(status_code=404, detail="Municipality not found")
+    return municipality["key"]
+
+def parse_week_bound(value: Optional[str], name: str) -> Optional[date]:
+    """Validate an ISO date query parameter; weeks are matched by their Monday."""
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name}: expected an ISO date")
+
+
+# ---------------- ROUTES ---------------- #
+
+# 1. Open complaints, resolved complaints and median resolution time per ward
+@analytics_router.get("/{name}/wards")
+def get_ward_summary(name: str, current_user: dict = Depends(require_official)):
+    key = municipality_key_or_404(name)
+    return {"municipality": name, "wards": analytics.wards(key)}
+
+# 2. Weekly backlog (opened / resolved / still open at the end of the week)
+@analytics_router.get("/{name}/backlog")
+def get_backlog(
+    name: str,
+    ward: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    current_user: dict = Depends(require_official)
+):
+    key = municipality_key_or_404(name)
+    weeks = analytics.backlog(key, ward, parse_week_bound(since, "since"), parse_week_bound(until, "until"))
+    return {"municipality": name, "ward": ward, "weeks": weeks}
+
+# 3. Median hours from creation to completion, overall and per week of completion
+@analytics_router.get("/{name}/resolution")
+def get_resolution_time(
+    name: str,
+    ward: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    current_user: dict = Depends(require_official)
+):
+    key = municipality_key_or_404(name)
+    result = analytics.resolution(key, ward, parse_week_bound(since, "since"), parse_week_bound(until, "until"))
+    return {"municipality": name, "ward": ward, **result}
@@ -2,16 +2,14 @@ from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from datetime import timedelta
 
-from ..utils.auth_utils import register_user, login_user
+from ..utils.auth_utils import register_user, login_user, get_user_by_id, get_all_users, public_profile
 from ..utils.security import create_access_token
-from ..utils.file_handler import load_json
-from ..dependency import get_current_user  # now using HTTPBearer version
+from ..dependency import get_current_user, rate_limited_by_ip, require_admin  # now using HTTPBearer version
 
 auth_router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
 class RegisterRequest(BaseModel):
-    id: int
     name: str
     phone: str
     password: str
@@ -27,7 +25,7 @@ class LoginRequest(BaseModel):
 
 
 # ✅ Register endpoint
-@auth_router.post("/register")
+@auth_router.post("/register", dependencies=[Depends(rate_limited_by_ip("register"))])
 def register(req: RegisterRequest):
     try:
         new_user = register_user(req.model_dump())
@@ -37,7 +35,7 @@ def register(req: RegisterRequest):
 
 
 # ✅ Login endpoint → returns JWT
-@auth_router.post("/login")
+@auth_router.post("/login", dependencies=[Depends(rate_limited_by_ip("login"))])
 def login(req: LoginRequest):
     try:
         user = login_user(req.phone, req.password)
@@ -60,16 +58,15 @@ def login(req: LoginRequest):
 @auth_router.get("/me")
 def read_users_me(current_user: dict = Depends(get_current_user)):
     """
-    Test endpoint to validate JWT token.
-    Returns the current logged-in user's data from the token.
+    Validate the JWT token and return the token claims plus the user's
+    full profile (without password), looked up by id.
     """
-    return {"current_user": current_user}
+    user = get_user_by_id(current_user["id"])
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return {"current_user": current_user, "profile": public_profile(user)}
 
-# Get all users (for ID generation)
+# Get all users (admins only, without passwords)
 @auth_router.get("/users")
-def get_users():
-    try:
-        users = load_json("users.json")
-        return users
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+def get_users(admin: dict = Depends(require_admin)):
+    return [public_profile(user) for user in get_all_users()]
@@ -1,26 +1,25 @@
 import os
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+import heapq
+import logging
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Header, Request, Response
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
-from ..utils.file_handler import load_json, save_json
-from ..dependency import get_current_user
-
-# File paths
-COMPLAINTS_FILE = "complains.json"
-USERS_FILE = "users.json"
-
-# Set up upload directory with absolute path
+from ..utils.auth_utils import get_user_by_id
+from ..utils.response_cache import cached_json_response
+from ..utils.idempotency import fingerprint, idempotent, upload_fingerprint
+from ..utils.id_sequence import next_id
+from ..utils import analytics, complaint_archive, complaint_store, complaint_timeline
+from ..jobs import jobs
+from ..utils.municipality_store import municipality_key
+from ..dependency import get_current_user, rate_limited
+
+# Set up upload directory with absolute path (created at start-up, see backend.warmup)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 UPLOAD_DIR = os.path.join(BASE_DIR, "uploads", "complaints")
 
-# Ensure upload directory exists
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
-# Debug print to verify paths
-print(f"Upload directory: {UPLOAD_DIR}")
-
 complaints_router = APIRouter(prefix="/complaints", tags=["Complaints"])
+logger = logging.getLogger(__name__)
 
 # Response model
 class Complaint(BaseModel):
@@ -36,36 +35,46 @@ class Complaint(BaseModel):
     upvotes: int
     upvoted_by: List[int]
     image_url: Optional[str] = None
+    completed_at: Optional[str] = None
 
-# Helpers
-def load_complaints():
-    return load_json(COMPLAINTS_FILE)
+class ComplaintDetail(Complaint):
+    activities: List[dict]
 
-def save_complaints(complaints):
-    save_json(COMPLAINTS_FILE, complaints)
+class ComplaintTimeline(BaseModel):
+    complaint: Complaint
+    timeline: List[dict]
 
-def load_users():
-    return load_json(USERS_FILE)
+# Helpers
+def load_complaints(include_archived: bool = False):
+    if include_archived:
+        return list(heapq.merge(complaint_store.iter_all(), complaint_archive.iter_all(), key=lambda c: c["id"]))
+    return complaint_store.load_all()
 
-def generate_complaint_id(complaints: List[dict]) -> int:
-    return max((c["id"] for c in complaints), default=0) + 1
+def generate_complaint_id() -> int:
+    return next_id("complaints", lambda: max(complaint_store.max_id(), complaint_archive.max_id()))
 
-# POST: Create complaint (with optional image)
-@complaints_router.post("/", response_model=Complaint)
+# POST: Create complaint (with optional image); retries with the same Idempotency-Key are not re-applied
+@complaints_router.post("/", response_model=Complaint, dependencies=[Depends(rate_limited("create_complaint"))])
 async def create_complaint(
+    response: Response,
     title: str = Form(...),
     content: str = Form(...),
     image: Optional[UploadFile] = File(None),
+    idempotency_key: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user)
 ):
-    complaints = load_complaints()
-    users = load_users()
-
-    user = next((u for u in users if u["id"] == current_user["id"]), None)
+    return await idempotent(
+        idempotency_key, f"create_complaint:{current_user['id']}",
+        fingerprint(title, content, upload_fingerprint(image)), response,
+        lambda: save_complaint(title, content, image, current_user)
+    )
+
+async def save_complaint(title: str, content: str, image: Optional[UploadFile], current_user: dict):
+    user = get_user_by_id(current_user["id"])
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Save image if provided
+    # Read the image if provided; it is stored once the complaint is saved
     image_url = None
     if image:
         try:
@@ -80,22 +89,19 @@ async def create_complaint(
             # Read the file content
             contents = await image.read()
             
-            # Save the file
-            with open(file_path, "wb") as f:
-                f.write(contents)
-            
             # Generate URL path (use forward slashes for URL)
             image_url = f"/uploads/complaints/{filename}"
             
             # Reset file pointer for potential future reads
             await image.seek(0)
             
-        except Exception as e:
-            print(f"Error saving file: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Error saving image: {str(e)}")
+        except Exception:
+            logger.exception("Reading the uploaded image failed")
+            raise HTTPException(status_code=500, detail="Error saving image")
 
-    new_id = generate_complaint_id(complaints)
-    complaint = {
+    new_id = generate_complaint_id()
+    # Validate once here so list reads can serve stored records as-is
+    complaint = Complaint(**{
         "id": new_id,
         "title": title,
         "content": content,
@@ -108,53 +114,110 @@ async def create_complaint(
         "upvotes": 0,
         "upvoted_by": [],
         "image_url": image_url
-    }
+    }).model_dump()
 
-    complaints.append(complaint)
-    save_complaints(complaints)
+    complaint_store.add(complaint)
+    if image:
+        # Spooled only now that a complaint points to it; a background job moves it into the uploads folder
+        try:
+            jobs.enqueue("store_upload", {"target": file_path}, blobs={"file": contents})
+        except Exception:
+            logger.exception("Queueing the image of complaint %s failed", complaint["id"])
+            raise HTTPException(status_code=500, detail="Error saving image")
+    jobs.enqueue("update_analytics", {"events": [analytics.status_event(complaint, None)]})
     return complaint
 
-# GET: List all complaints
+# GET: List all complaints (or those of one municipality)
 @complaints_router.get("/", response_model=List[Complaint])
-def list_complaints(current_user: dict = Depends(get_current_user)):
-    return load_complaints()
+def list_complaints(
+    request: Request,
+    municipality: Optional[str] = None,
+    include_archived: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
+    # Records are validated on write, so the encoded bytes are reused until the data changes
+    if municipality:
+        key = municipality_key(municipality)
+        if not complaint_store.has_shard(key):
+            return []  # unknown names are not cached, so they cannot grow the caches
+        return cached_json_response(
+            request, f"complaints:{key}", complaint_store.store_version(key),
+            lambda: complaint_store.load_shard(key)
+        )
+    if include_archived:
+        return cached_json_response(
+            request, "complaints:archived",
+            (complaint_store.store_version(), complaint_archive.store_version()),
+            lambda: load_complaints(include_archived=True)
+        )
+    return cached_json_response(request, "complaints", complaint_store.store_version(), load_complaints)
+
+# GET: Complaints submitted by the current user, served from the author index
+@complaints_router.get("/mine", response_model=List[Complaint])
+def list_my_complaints(include_archived: bool = False, current_user: dict = Depends(get_current_user)):
+    mine = []
+    for complaint_id in complaint_store.complaint_ids_by_author(current_user["id"]):
+        complaint = complaint_store.get(complaint_id)
+        if not complaint and include_archived:
+            complaint = complaint_archive.find(complaint_id)
+        if complaint:
+            mine.append(complaint)
+    return mine
+
+def find_any_complaint(complaint_id: int):
+    complaint = complaint_store.get(complaint_id)
+    if not complaint:
+        complaint = complaint_archive.find(complaint_id)
+    if not complaint:
+        raise HTTPException(status_code=404, detail="Complaint not found")
+    return complaint
+
+# GET: Single complaint (hot or archived) with its status-change activities
+@complaints_router.get("/{complaint_id}", response_model=ComplaintDetail)
+def get_complaint(complaint_id: int, current_user: dict = Depends(get_current_user)):
+    complaint = find_any_complaint(complaint_id)
+    return {**complaint, "activities": complaint_timeline.get(complaint_id)}
+
+# GET: What the municipality did about a complaint, oldest first
+@complaints_router.get("/{complaint_id}/timeline", response_model=ComplaintTimeline)
+def get_complaint_timeline(complaint_id: int, current_user: dict = Depends(get_current_user)):
+    complaint = find_any_complaint(complaint_id)
+    return {"complaint": complaint, "timeline": complaint_timeline.get(complaint_id)}
 
 # POST: Upvote complaint
-@complaints_router.post("/{complaint_id}/upvote")
+@complaints_router.post("/{complaint_id}/upvote", dependencies=[Depends(rate_limited("upvote"))])
 def upvote_complaint(complaint_id: int, current_user: dict = Depends(get_current_user)):
-    complaints = load_complaints()
-    complaint = next((c for c in complaints if c["id"] == complaint_id), None)
+    user_id = current_user["id"]
 
-    if not complaint:
-        raise HTTPException(status_code=404, detail="Complaint not found")
+    def upvote(complaint):
+        if user_id in complaint["upvoted_by"]:
+            raise HTTPException(status_code=400, detail="You have already upvoted this complaint")
 
-    user_id = current_user["id"]
+        complaint["upvoted_by"].append(user_id)
+        complaint["upvotes"] = len(complaint["upvoted_by"])
 
-    if user_id in complaint["upvoted_by"]:
-        raise HTTPException(status_code=400, detail="You have already upvoted this complaint")
+    complaint = complaint_store.update(complaint_id, upvote)
 
-    complaint["upvoted_by"].append(user_id)
-    complaint["upvotes"] = len(complaint["upvoted_by"])
+    if not complaint:
+        raise HTTPException(status_code=404, detail="Complaint not found")
 
-    save_complaints(complaints)
     return {"message": "Upvoted successfully", "upvotes": complaint["upvotes"]}
 
 # POST: Unvote complaint
-@complaints_router.post("/{complaint_id}/unvote")
+@complaints_router.post("/{complaint_id}/unvote", dependencies=[Depends(rate_limited("upvote"))])
 def unvote_complaint(complaint_id: int, current_user: dict = Depends(get_current_user)):
-    complaints = load_complaints()
-    complaint = next((c for c in complaints if c["id"] == complaint_id), None)
+    user_id = current_user["id"]
 
-    if not complaint:
-        raise HTTPException(status_code=404, detail="Complaint not found")
+    def unvote(complaint):
+        if user_id not in complaint["upvoted_by"]:
+            raise HTTPException(status_code=400, detail="You have not upvoted this complaint")
 
-    user_id = current_user["id"]
+        complaint["upvoted_by"].remove(user_id)
+        complaint["upvotes"] = len(complaint["upvoted_by"])
 
-    if user_id not in complaint["upvoted_by"]:
-        raise HTTPException(status_code=400, detail="You have not upvoted this complaint")
+    complaint = complaint_store.update(complaint_id, unvote)
 
-    complaint["upvoted_by"].remove(user_id)
-    complaint["upvotes"] = len(complaint["upvoted_by"])
+    if not complaint:
+        raise HTTPException(status_code=404, detail="Complaint not found")
 
-    save_complaints(complaints)
     return {"message": "Unvoted successfully", "upvotes": complaint["upvotes"]}
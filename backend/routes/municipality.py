@@ -1,29 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from pydantic import BaseModel
-from datetime import datetime
-from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Header, Request, Response
+from pydantic import BaseModel, Field
+from datetime import date, datetime, time
+from typing import List, Optional
 import os
-from ..utils.file_handler import load_json, save_json
-from ..dependency import get_current_user
+from ..utils.auth_utils import get_user_by_id
+from ..utils.response_cache import cached_json_response
+from ..utils.idempotency import fingerprint, idempotent, upload_fingerprint
+from ..utils import activity_log, analytics, complaint_store, municipality_store
+from ..jobs import jobs
+from ..dependency import get_current_user, rate_limited
 
 # Load user info since it's not in JWT token
-USERS_FILE = "users.json"
-
 def get_full_user_info(user_id: int):
-    users = load_json(USERS_FILE)
-    return next((u for u in users if u["id"] == user_id), None)
+    return get_user_by_id(user_id)
 
-MUNICIPALITY_FILE = "municipality.json"
-COMPLAINTS_FILE = "complains.json"
+# Upper bound on items accepted by one batch request
+MAX_BATCH_UPDATES = 500
 
 # ----------------- FIXED PATH -----------------
 # Go up to project root, then to backend/uploads/municipality
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# (created at start-up, see backend.warmup)
 UPLOAD_FOLDER = os.path.join(BASE_DIR, "backend", "uploads", "municipality")
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-
-# Debug print to verify paths
-print(f"Municipality upload folder: {UPLOAD_FOLDER}")
 
 municipality_router = APIRouter(prefix="/municipality", tags=["Municipality"])
 
@@ -34,54 +32,200 @@ class ComplaintStatusUpdate(BaseModel):
     statement: Optional[str] = None   # optional field
 
 
-# ---------------- HELPERS ---------------- #
-def load_municipalities():
-    return load_json(MUNICIPALITY_FILE)
+class ActivityPost(BaseModel):
+    title: str
+    action: str
+    statement: Optional[str] = None
 
-def save_municipalities(data):
-    save_json(MUNICIPALITY_FILE, data)
 
-def load_complaints():
-    return load_json(COMPLAINTS_FILE)
+class BatchActivityPost(BaseModel):
+    posts: List[ActivityPost] = Field(..., min_length=1, max_length=MAX_BATCH_UPDATES)
 
-def save_complaints(data):
-    save_json(COMPLAINTS_FILE, data)
 
+class BatchStatusUpdate(BaseModel):
+    updates: List[ComplaintStatusUpdate] = Field(..., min_length=1, max_length=MAX_BATCH_UPDATES)
 
-# ---------------- ROUTES ---------------- #
 
-# 1. Get all municipalities
-@municipality_router.get("/")
-async def get_municipalities(current_user: dict = Depends(get_current_user)):
-    return load_municipalities()
+# ---------------- HELPERS ---------------- #
+def load_municipalities():
+    return municipality_store.load_all()
 
-# 2. Get all municipality activities
-@municipality_router.get("/activities")
-async def get_all_activities(current_user: dict = Depends(get_current_user)):
-    municipalities = load_municipalities()
+def find_staff_municipality(user_info):
+    return municipality_store.find_municipality(user_info["municipality"])
+
+def apply_status(complaint, status, previous=None):
+    # previous collects each complaint's status before its first change (for analytics)
+    if previous is not None:
+        previous.setdefault(complaint["id"], complaint["status"])
+    complaint["status"] = status
+    # Completion time drives archival of finished complaints
+    complaint["completed_at"] = datetime.now().isoformat() if status == "completed" else None
+
+def build_status_activity(complaint, status, statement, user_id, image_path=None):
+    return {
+        "id": activity_log.new_id(),
+        "complaint_id": complaint["id"],
+        "title": complaint["title"],
+        "action": f"Marked as {status}",
+        "statement": statement,
+        "timestamp": datetime.now().isoformat(),
+        "by": user_id,
+        "action_image": image_path
+    }
+
+async def read_upload(image: Optional[UploadFile], user_id: int):
+    """
+    Read an attached image before anything is saved. Returns the pending
+    upload for queue_upload() and the URL the record should point to.
+    """
+    if not image:
+        return None, None
+    file_ext = os.path.splitext(image.filename)[1]
+    filename = f"{datetime.now().timestamp()}_{user_id}{file_ext}"
+    return (os.path.join(UPLOAD_FOLDER, filename), await image.read()), f"/uploads/municipality/{filename}"
+
+def queue_upload(upload):
+    """Move a read image into place (see backend.jobs), once its record is saved."""
+    if upload:
+        target, contents = upload
+        jobs.enqueue("store_upload", {"target": target}, blobs={"file": contents})
+
+def queue_status_activities(municipality: dict, activities: list):
+    """Feed append and timeline indexing run after the response (see backend.jobs)."""
+    jobs.enqueue("append_activities", {"key": municipality["key"], "activities": activities})
+    jobs.enqueue("record_timeline", {"municipality": municipality["municipality"], "activities": activities})
+
+def queue_status_rollups(complaints: list, previous: dict):
+    """Analytics rollups follow each complaint's overall transition (see backend.jobs)."""
+    latest = {c["id"]: c for c in complaints if c}
+    events = [analytics.status_event(c, previous[cid]) for cid, c in latest.items()]
+    if events:
+        jobs.enqueue("update_analytics", {"events": events})
+
+def parse_time_bound(value: Optional[str], name: str, end_of_day: bool = False) -> Optional[str]:
+    """
+    Validate an ISO date/datetime query parameter and normalise it for comparison.
+    Stored timestamps are naive local time, so a bound with an offset (Z,
+    +05:45) is converted to local time first. With end_of_day a bare date
+    stands for the last moment of that day, so an inclusive upper bound keeps
+    the whole day.
+    """
+    if value is None:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name}: expected an ISO date or datetime")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    if end_of_day and _is_date(value):
+        parsed = datetime.combine(parsed.date(), time.max)
+    return parsed.isoformat()
+
+def _is_date(value: str) -> bool:
+    try:
+        date.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+def build_activity_feed(since=None, until=None, include_archived=False, keys=None):
+    """Activities across municipalities (or just keys), newest first."""
+    index = municipality_store.load_index()
     all_activities = []
-    for muni in municipalities:
-        for activity in muni.get("activities", []):
+    for key in keys or index:
+        muni = index[key]
+        for activity in municipality_store.load_activities(key, since, until, include_archived):
             # Add municipality info to each activity
             activity_with_muni = {
                 **activity,
                 "municipality": muni["municipality"]
             }
             all_activities.append(activity_with_muni)
-    
+
     # Sort by timestamp, newest first
     all_activities.sort(key=lambda x: x["timestamp"], reverse=True)
     return all_activities
 
-# 3. Municipality Post Action (with optional image)
-@municipality_router.post("/post-action")
+
+# ---------------- ROUTES ---------------- #
+
+# 1. Get all municipalities
+@municipality_router.get("/")
+async def get_municipalities(
+    request: Request,
+    include_archived: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
+    return cached_json_response(
+        request,
+        f"municipalities:{include_archived}",
+        municipality_store.store_version(),
+        lambda: municipality_store.load_all(include_archived)
+    )
+
+# 2. Get all municipality activities
+@municipality_router.get("/activities")
+async def get_all_activities(
+    request: Request,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    include_archived: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Feed of all municipalities, newest first. since/until (ISO) limit the
+    range and only open the overlapping segments; archived segments are
+    included only with include_archived=true.
+    """
+    since = parse_time_bound(since, "since")
+    until = parse_time_bound(until, "until", end_of_day=True)
+    if since or until:
+        return build_activity_feed(since, until, include_archived)
+
+    return cached_json_response(
+        request,
+        f"activities:{include_archived}",
+        municipality_store.store_version(),
+        lambda: build_activity_feed(include_archived=include_archived)
+    )
+
+# 2b. Activities of one municipality
+@municipality_router.get("/{name}/activities")
+async def get_municipality_activities(
+    name: str,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    include_archived: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
+    municipality = municipality_store.find_municipality(name)
+    if not municipality:
+        raise HTTPException(status_code=404, detail="Municipality not found")
+
+    since = parse_time_bound(since, "since")
+    until = parse_time_bound(until, "until", end_of_day=True)
+    return build_activity_feed(since, until, include_archived, keys=[municipality["key"]])
+
+# 3. Municipality Post Action (with optional image); Idempotency-Key retries are not re-applied
+@municipality_router.post("/post-action", dependencies=[Depends(rate_limited("staff_write"))])
 async def municipality_post(
+    response: Response,
     title: str = Form(...),
     action: str = Form(...),
     statement: Optional[str] = Form(None),
     image: Optional[UploadFile] = File(None),
+    idempotency_key: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user)
 ):
+    return await idempotent(
+        idempotency_key, f"post_action:{current_user['id']}",
+        fingerprint(title, action, statement, upload_fingerprint(image)), response,
+        lambda: save_municipality_post(title, action, statement, image, current_user)
+    )
+
+async def save_municipality_post(title: str, action: str, statement: Optional[str],
+                                 image: Optional[UploadFile], current_user: dict):
     if current_user.get("role") != "staff":
         raise HTTPException(status_code=403, detail="Only staff can post municipality actions")
 
@@ -89,25 +233,14 @@ async def municipality_post(
     if not user_info:
         raise HTTPException(status_code=404, detail="User not found")
 
-    municipalities = load_municipalities()
-    municipality = next(
-        (m for m in municipalities if m["municipality"].lower() == user_info["municipality"].lower()),
-        None
-    )
+    municipality = find_staff_municipality(user_info)
     if not municipality:
         raise HTTPException(status_code=404, detail="Municipality not found for current staff")
 
-    # Handle image upload
-    image_path = None
-    if image:
-        file_ext = os.path.splitext(image.filename)[1]
-        filename = f"{datetime.now().timestamp()}_{current_user['id']}{file_ext}"
-        file_path = os.path.join(UPLOAD_FOLDER, filename)
-        with open(file_path, "wb") as f:
-            f.write(await image.read())
-        image_path = f"/uploads/municipality/{filename}"
+    upload, image_path = await read_upload(image, current_user["id"])
 
     activity = {
+        "id": activity_log.new_id(),
         "complaint_id": None,
         "title": title,
         "action": action,
@@ -117,66 +250,145 @@ async def municipality_post(
         "action_image": image_path
     }
 
-    municipality["activities"].append(activity)
-    save_municipalities(municipalities)
+    # The post is this endpoint's record, so it is in the feed before the response
+    municipality_store.append_activities(municipality["key"], [activity])
+    queue_upload(upload)
 
     return {"message": "Post added to municipality feed", "post": activity}
 
 
-# 2. Update Complaint Status (with optional image)
-@municipality_router.post("/update-complaint-status")
+# 2. Update Complaint Status (with optional image); Idempotency-Key retries are not re-applied
+@municipality_router.post("/update-complaint-status", dependencies=[Depends(rate_limited("staff_write"))])
 async def update_complaint_status(
+    response: Response,
     complaint_id: int = Form(...),
     status: str = Form(...),
     statement: Optional[str] = Form(None),
     image: Optional[UploadFile] = File(None),
+    idempotency_key: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user)
 ):
+    return await idempotent(
+        idempotency_key, f"update_status:{current_user['id']}",
+        fingerprint(complaint_id, status, statement, upload_fingerprint(image)), response,
+        lambda: save_complaint_status(complaint_id, status, statement, image, current_user)
+    )
+
+async def save_complaint_status(complaint_id: int, status: str, statement: Optional[str],
+                                image: Optional[UploadFile], current_user: dict):
     if current_user.get("role") != "staff":
         raise HTTPException(status_code=403, detail="Only staff can update complaint status")
 
-    complaints = load_complaints()
-    complaint = next((c for c in complaints if c["id"] == complaint_id), None)
+    user_info = get_full_user_info(current_user["id"])
+    if not user_info:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    municipality = find_staff_municipality(user_info)
+    if not municipality:
+        raise HTTPException(status_code=404, detail="Municipality not found for current staff")
+
+    upload, image_path = await read_upload(image, current_user["id"])
+
+    # Update complaint status (only the owning municipality's shard is written)
+    previous = {}
+    complaint = complaint_store.update(complaint_id, lambda c: apply_status(c, status, previous))
     if not complaint:
         raise HTTPException(status_code=404, detail="Complaint not found")
+    queue_upload(upload)
+    queue_status_rollups([complaint], previous)
+
+    activity = build_status_activity(complaint, status, statement, current_user["id"], image_path)
+
+    queue_status_activities(municipality, [activity])
+
+    return {"message": f"Complaint {complaint['id']} status updated to {status}", "activity": activity}
 
-    # Update complaint status
-    complaint["status"] = status
-    save_complaints(complaints)
+
+# 4. Batch Update Complaint Status (JSON body, no images)
+@municipality_router.post("/update-complaint-status/batch", dependencies=[Depends(rate_limited("staff_write"))])
+async def batch_update_complaint_status(
+    req: BatchStatusUpdate,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Apply many status updates with a single save of each complaint shard
+    touched and of the staff municipality's activity shard. Items whose complaint does not
+    exist are reported in the results and skipped.
+    """
+    if current_user.get("role") != "staff":
+        raise HTTPException(status_code=403, detail="Only staff can update complaint status")
 
     user_info = get_full_user_info(current_user["id"])
     if not user_info:
         raise HTTPException(status_code=404, detail="User not found")
 
-    municipalities = load_municipalities()
-    municipality = next(
-        (m for m in municipalities if m["municipality"].lower() == user_info["municipality"].lower()),
-        None
-    )
+    municipality = find_staff_municipality(user_info)
     if not municipality:
         raise HTTPException(status_code=404, detail="Municipality not found for current staff")
 
-    # Handle image upload
-    image_path = None
-    if image:
-        file_ext = os.path.splitext(image.filename)[1]
-        filename = f"{datetime.now().timestamp()}_{current_user['id']}{file_ext}"
-        file_path = os.path.join(UPLOAD_FOLDER, filename)
-        with open(file_path, "wb") as f:
-            f.write(await image.read())
-        image_path = f"/uploads/municipality/{filename}"
-
-    activity = {
-        "complaint_id": complaint["id"],
-        "title": complaint["title"],
-        "action": f"Marked as {status}",
-        "statement": statement,
-        "timestamp": datetime.now().isoformat(),
-        "by": current_user["id"],
-        "action_image": image_path
+    previous = {}
+    updated = complaint_store.update_many([
+        (update.complaint_id, lambda c, status=update.status: apply_status(c, status, previous))
+        for update in req.updates
+    ])
+    queue_status_rollups(updated, previous)
+
+    results = []
+    activities = []
+    for update, complaint in zip(req.updates, updated):
+        if not complaint:
+            results.append({"complaint_id": update.complaint_id, "ok": False, "detail": "Complaint not found"})
+            continue
+
+        activity = build_status_activity(complaint, update.status, update.statement, current_user["id"])
+        activities.append(activity)
+        results.append({"complaint_id": update.complaint_id, "ok": True, "activity": activity})
+
+    if activities:
+        queue_status_activities(municipality, activities)
+
+    return {
+        "message": f"Updated {len(activities)} of {len(req.updates)} complaints",
+        "updated": len(activities),
+        "results": results
     }
 
-    municipality["activities"].append(activity)
-    save_municipalities(municipalities)
 
-    return {"message": f"Complaint {complaint['id']} status updated to {status}", "activity": activity}
+# 5. Batch Municipality Post Action (JSON body, no images)
+@municipality_router.post("/post-action/batch", dependencies=[Depends(rate_limited("staff_write"))])
+async def batch_municipality_post(
+    req: BatchActivityPost,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Append many feed posts with a single save of the municipality's activity shard.
+    """
+    if current_user.get("role") != "staff":
+        raise HTTPException(status_code=403, detail="Only staff can post municipality actions")
+
+    user_info = get_full_user_info(current_user["id"])
+    if not user_info:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    municipality = find_staff_municipality(user_info)
+    if not municipality:
+        raise HTTPException(status_code=404, detail="Municipality not found for current staff")
+
+    timestamp = datetime.now().isoformat()
+    posts = [
+        {
+            "id": activity_log.new_id(),
+            "complaint_id": None,
+            "title": post.title,
+            "action": post.action,
+            "statement": post.statement,
+            "timestamp": timestamp,
+            "by": current_user["id"],
+            "action_image": None
+        }
+        for post in req.posts
+    ]
+
+    municipality_store.append_activities(municipality["key"], posts)
+
+    return {"message": f"Added {len(posts)} posts to municipality feed", "posts": posts}
@@ -0,0 +1,233 @@
+"""
+Time-segmented activity log.
+
+Each municipality's activities are stored in monthly segments with a small
+index of segment bounds, so a time-range query opens only the segments that
+overlap it:
+
+    data/municipalities/<key>/segments.json             [{segment, start, end, count, archived}, ...]
+    data/municipalities/<key>/segments/2025-08.json      [activity, ...]
+    data/municipalities/<key>/segments/2024-01.json.gz   archived, read-only
+
+Segments whose newest activity is older than the retention age are
+compacted into gzip files by archive(), which only runs from the scheduled
+`python -m backend.cli archive-activities` (cron). Archived segments are
+skipped by default, so old history never slows down the recent feed.
+
+Segments that have been read stay resident as compact ActivityRecords
+until their file changes.
+
+New activities carry an "id" (new_id()); appending an id that is already in
+its segment is a no-op, so a retried or replayed append job does not write
+the activity twice. Activities from before ids were introduced have none.
+"""
+
+import gzip
+import json
+import os
+import uuid
+from datetime import datetime, timedelta
+from . import file_handler
+from .file_handler import load_json, save_json, data_version, delete_data, bump_version
+from .atomic import atomic_write
+from .locking import store_lock
+from .records import ActivityRecord
+
+# Segments whose newest activity is older than this are archived
+RETENTION_DAYS = int(os.environ.get("HAMRO_ACTIVITY_RETENTION_DAYS", "365"))
+
+# (key, segment file) -> (file version, [ActivityRecord, ...])
+_segments = {}
+
+
+def new_id() -> str:
+    """Id for a new activity, assigned before it is handed to the job queue."""
+    return uuid.uuid4().hex
+
+
+def segment_name(timestamp: str) -> str:
+    """Monthly bucket ("YYYY-MM") for an ISO timestamp."""
+    return timestamp[:7]
+
+
+def _writer(key: str):
+    """
+    Cross-process lock serialising read-modify-write of key's segments;
+    readers never take it.
+    """
+    return store_lock(f"activities-{key}")
+
+
+def index_file(key: str) -> str:
+    return f"municipalities/{key}/segments.json"
+
+
+def segment_file(key: str, segment: str, archived: bool = False) -> str:
+    suffix = ".json.gz" if archived else ".json"
+    return f"municipalities/{key}/segments/{segment}{suffix}"
+
+
+def load_segment_index(key: str) -> list:
+    _migrate_flat_shard(key)
+    return load_json(index_file(key))
+
+
+def _save_segment_index(key: str, index: list):
+    index.sort(key=lambda s: s["segment"])
+    save_json(index_file(key), index)
+
+
+def _read_archived(key: str, segment: str) -> list:
+    with gzip.open(file_handler.DATA_DIR/segment_file(key, segment, archived=True), "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_segment(key: str, entry: dict) -> list:
+    if entry["archived"]:
+        return _read_archived(key, entry["segment"])
+    return load_json(segment_file(key, entry["segment"]))
+
+
+def _segment_records(key: str, entry: dict) -> list:
+    filename = segment_file(key, entry["segment"], entry["archived"])
+    version = data_version(filename)
+    cached = _segments.get((key, filename))
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    records = [ActivityRecord.from_dict(a) for a in load_segment(key, entry)]
+    _segments[(key, filename)] = (version, records)
+    return records
+
+
+def append(key: str, activities: list):
+    """
+    Append activities, writing only the segments their timestamps fall in.
+    Appending into an archived month re-opens that segment as plain JSON.
+    Activities whose id is already stored are skipped.
+    """
+    _migrate_flat_shard(key)
+    with _writer(key):
+        _append(key, activities)
+
+
+def _append(key: str, activities: list):
+    if not activities:
+        return
+
+    index = {entry["segment"]: entry for entry in load_json(index_file(key))}
+
+    by_segment = {}
+    for activity in activities:
+        by_segment.setdefault(segment_name(activity["timestamp"]), []).append(activity)
+
+    for segment, new_items in by_segment.items():
+        entry = index.get(segment)
+        if entry and entry["archived"] and not (file_handler.DATA_DIR/segment_file(key, segment, archived=True)).exists():
+            entry = {**entry, "archived": False}  # re-opened by an attempt that failed before saving the index
+        # Without an entry, an attempt that failed before saving the index may have written the segment
+        items = load_segment(key, entry) if entry else load_json(segment_file(key, segment))
+        stored = {item.get("id") for item in items} - {None}
+        items.extend(a for a in new_items if a.get("id") is None or a["id"] not in stored)
+        # Saved even when every item was stored already: an earlier attempt may have failed after this point
+        save_json(segment_file(key, segment), items)
+
+        if entry and entry["archived"]:
+            (file_handler.DATA_DIR/segment_file(key, segment, archived=True)).unlink()
+            bump_version(segment_file(key, segment, archived=True))
+
+        timestamps = [a["timestamp"] for a in new_items]
+        index[segment] = {
+            "segment": segment,
+            "start": min(timestamps + ([entry["start"]] if entry else [])),
+            "end": max(timestamps + ([entry["end"]] if entry else [])),
+            "count": len(items),
+            "archived": False
+        }
+
+    _save_segment_index(key, list(index.values()))
+
+
+def query(key: str, since: str | None = None, until: str | None = None, include_archived: bool = False) -> list:
+    """
+    Activities with since <= timestamp <= until (ISO strings, either bound optional).
+    Only segments whose [start, end] overlaps the range are opened.
+    """
+    results = []
+    for entry in load_segment_index(key):
+        if entry["archived"] and not include_archived:
+            continue
+        if since is not None and entry["end"] < since:
+            continue
+        if until is not None and entry["start"] > until:
+            continue
+
+        records = _segment_records(key, entry)
+        inside = (since is None or entry["start"] >= since) and (until is None or entry["end"] <= until)
+        if inside:
+            results.extend(record.to_dict() for record in records)
+            continue
+
+        # Segment straddles a bound: check each activity
+        for record in records:
+            timestamp = record["timestamp"]
+            if (since is None or timestamp >= since) and (until is None or timestamp <= until):
+                results.append(record.to_dict())
+    return results
+
+
+def archive(key: str, retention_days: int = RETENTION_DAYS) -> int:
+    """
+    Compact segments older than the retention age into gzip files.
+    Returns the number of segments archived.
+    """
+    cutoff = (datetime.now() - timedelta(days=retention_days)).isoformat()
+    with _writer(key):
+        return _archive(key, cutoff)
+
+
+def _archive(key: str, cutoff: str) -> int:
+    index = load_segment_index(key)
+
+    archived = 0
+    for entry in index:
+        if entry["archived"] or entry["end"] >= cutoff:
+            continue
+
+        items = load_json(segment_file(key, entry["segment"]))
+        archive_path = file_handler.DATA_DIR/segment_file(key, entry["segment"], archived=True)
+        with atomic_write(archive_path, "wt", opener=gzip.open, encoding="utf-8") as f:
+            json.dump(items, f, ensure_ascii=False)
+        bump_version(segment_file(key, entry["segment"], archived=True))
+        delete_data(segment_file(key, entry["segment"]))
+
+        entry["archived"] = True
+        archived += 1
+
+    if archived:
+        _save_segment_index(key, index)
+    return archived
+
+
+def version(key: str):
+    """Changes whenever any segment of key is written or archived."""
+    return data_version(index_file(key))
+
+
+def _migrate_flat_shard(key: str):
+    """
+    Convert a single municipalities/<key>/activities.json shard into segments.
+    """
+    flat = file_handler.DATA_DIR/f"municipalities/{key}/activities.json"
+    if not flat.exists():
+        return
+
+    with _writer(key):
+        if flat.exists():
+            _append(key, load_json(f"municipalities/{key}/activities.json"))
+            flat.unlink()
+
+
+def reset_cache():
+    """Drop resident segments (e.g. after DATA_DIR changes in tests)."""
+    _segments.clear()
@@ -0,0 +1,298 @@
+"""
+Rollups for municipality analytics: backlog and resolution time per ward and week.
+
+Answering "how many complaints were open in ward 4 each week" or "how long
+does a complaint take to be completed" from the complaints themselves means
+scanning every record. Instead every municipality keeps one small rollup,
+updated incrementally when a complaint is created or changes status:
+
+    data/analytics/<key>.json
+        {"<week>": {"<ward>": {"opened": n, "reopened": n, "resolved": n,
+                               "hours": {"<whole hours to completion>": n}}},
+         "_applied": ["<job id>", ...]}
+
+Weeks are keyed by their Monday (ISO date). Resolution times are kept as a
+histogram by whole hours, so medians are exact to the hour and cost
+O(distinct hours) rather than O(complaints). Queries are bounded by the
+number of weeks and wards, whatever the number of complaints.
+
+The counters are not idempotent, so each rollup also lists the last
+APPLIED_BATCHES jobs whose events it holds, saved in the same write; events
+of a job that is retried or replayed after a crash are applied only once.
+
+The rollups are rebuilt from the complaint store and archive the first time
+they are used, or via `python -m backend.cli rebuild-analytics`. A rebuild
+only sees each complaint's current state: a complaint reopened and completed
+again counts as resolved once, at its latest completion.
+"""
+
+import threading
+from datetime import date, datetime, timedelta
+from . import complaint_archive, complaint_store, file_handler
+from .file_handler import load_json, save_json, data_version
+from .locking import store_lock
+from .municipality_store import municipality_key
+
+ANALYTICS_DIR = "analytics"
+RESOLVED = "completed"
+APPLIED = "_applied"
+# Jobs remembered per rollup; far more than can be retried or replayed at once
+APPLIED_BATCHES = 1000
+
+# key -> (file version, {week: {ward: cell}}, [job id, ...])
+_rollups = {}
+# Events waiting for the next save; concurrent record() calls share one
+_pending = []
+_pending_lock = threading.Lock()
+
+
+def rollup_file(key: str) -> str:
+    return f"{ANALYTICS_DIR}/{key}.json"
+
+
+def week_of(timestamp: str) -> str:
+    """Monday of the ISO week containing timestamp, as an ISO date."""
+    day = datetime.fromisoformat(timestamp).date()
+    return (day - timedelta(days=day.weekday())).isoformat()
+
+
+def resolution_hours(created_at: str, completed_at: str) -> int:
+    elapsed = datetime.fromisoformat(completed_at) - datetime.fromisoformat(created_at)
+    return max(0, int(elapsed.total_seconds() // 3600))
+
+
+def _cell(rollup: dict, week: str, ward: str) -> dict:
+    wards = rollup.setdefault(week, {})
+    cell = wards.get(ward)
+    if cell is None:
+        cell = wards[ward] = {"opened": 0, "reopened": 0, "resolved": 0, "hours": {}}
+    return cell
+
+
+def _resolve(rollup: dict, ward: str, created_at: str, completed_at: str):
+    cell = _cell(rollup, week_of(completed_at), ward)
+    cell["resolved"] += 1
+    hours = str(resolution_hours(created_at, completed_at))
+    cell["hours"][hours] = cell["hours"].get(hours, 0) + 1
+
+
+def _load_entry(key: str) -> tuple:
+    version = data_version(rollup_file(key))
+    entry = _rollups.get(key)
+    if entry is not None and entry[0] == version:
+        return entry
+    rollup = load_json(rollup_file(key)) or {}
+    applied = rollup.pop(APPLIED, [])
+    entry = _rollups[key] = (version, rollup, applied)
+    return entry
+
+
+def _load(key: str) -> dict:
+    return _load_entry(key)[1]
+
+
+def _save(key: str, rollup: dict, applied: list = ()):
+    save_json(rollup_file(key), {**rollup, APPLIED: list(applied)})
+    _rollups[key] = (data_version(rollup_file(key)), rollup, list(applied))
+
+
+def _copy(rollup: dict) -> dict:
+    """Deep enough a copy to modify; readers may hold the current rollup."""
+    return {
+        week: {ward: {**cell, "hours": dict(cell["hours"])} for ward, cell in wards.items()}
+        for week, wards in rollup.items()
+    }
+
+
+def status_event(complaint, previous: str | None) -> dict:
+    """
+    The rollup change for complaint moving from previous (None when it was
+    just created) to its current status.
+    """
+    return {
+        "key": municipality_key(complaint["municipality"]),
+        "ward": str(complaint["ward"]),
+        "created_at": complaint["created_at"],
+        "completed_at": complaint.get("completed_at"),
+        "previous": previous,
+        "status": complaint["status"],
+        "at": complaint.get("completed_at") or datetime.now().isoformat(),
+    }
+
+
+def record(events: list, batch: str | None = None):
+    """
+    Apply status events (see status_event) to the rollups, saving each
+    municipality's rollup once. Events queued by other threads while the
+    lock was held are applied in the same save; they are on disk by the
+    time their own record() call returns, since it waits for the lock.
+    With a batch id (the job id), a rollup that has already applied that
+    batch skips its events.
+    """
+    if not (file_handler.DATA_DIR/ANALYTICS_DIR).exists():
+        # Events are recorded after the change is saved, so a rebuild already includes them
+        rebuild()
+        return
+
+    events = [{**event, "batch": batch} for event in events]
+    with _pending_lock:
+        _pending.extend(events)
+    own = {id(event) for event in events}
+
+    with store_lock("analytics"):
+        with _pending_lock:
+            batch = list(_pending)
+            _pending.clear()
+        try:
+            _apply(batch)
+        except BaseException:
+            # Hand the other callers' events back; ours are retried by our caller
+            with _pending_lock:
+                _pending[:0] = [event for event in batch if id(event) not in own]
+            raise
+
+
+def _apply(events: list):
+    by_key = {}
+    for event in events:
+        by_key.setdefault(event["key"], []).append(event)
+
+    for key, items in by_key.items():
+        _, current, applied = _load_entry(key)
+        done = set(applied)
+        items = [event for event in items if event.get("batch") is None or event["batch"] not in done]
+        if not items:
+            continue
+        rollup = _copy(current)
+        for event in items:
+            ward = event["ward"]
+            if event["previous"] is None:
+                _cell(rollup, week_of(event["created_at"]), ward)["opened"] += 1
+            elif event["previous"] == RESOLVED and event["status"] != RESOLVED:
+                _cell(rollup, week_of(event["at"]), ward)["reopened"] += 1
+            if event["status"] == RESOLVED and event["previous"] != RESOLVED:
+                _resolve(rollup, ward, event["created_at"], event["completed_at"] or event["at"])
+        batches = list(dict.fromkeys(event["batch"] for event in items if event.get("batch") is not None))
+        _save(key, rollup, (applied + batches)[-APPLIED_BATCHES:])
+
+
+def rebuild():
+    """
+    Rebuild every municipality's rollup from the hot and archived complaints.
+    """
+    rollups = {}
+    for source in (complaint_store.iter_all(), complaint_archive.iter_all()):
+        for complaint in source:
+            rollup = rollups.setdefault(municipality_key(complaint["municipality"]), {})
+            ward = str(complaint["ward"])
+            _cell(rollup, week_of(complaint["created_at"]), ward)["opened"] += 1
+            if complaint["status"] == RESOLVED and complaint.get("completed_at"):
+                _resolve(rollup, ward, complaint["created_at"], complaint["completed_at"])
+
+    with store_lock("analytics"):
+        analytics_dir = file_handler.DATA_DIR/ANALYTICS_DIR
+        analytics_dir.mkdir(parents=True, exist_ok=True)
+        for stale in analytics_dir.glob("*.json*"):
+            stale.unlink()
+        _rollups.clear()
+        for key, rollup in rollups.items():
+            _save(key, dict(sorted(rollup.items())))
+
+
+def rollup(key: str) -> dict:
+    """
+    {week: {ward: cell}} for one municipality, building the rollups if needed.
+    """
+    if not (file_handler.DATA_DIR/ANALYTICS_DIR).exists():
+        rebuild()
+    return _load(key)
+
+
+def _in_range(week: str, since: date | None, until: date | None) -> bool:
+    """Whether week overlaps since..until (inclusive dates)."""
+    if since and week < (since - timedelta(days=since.weekday())).isoformat():
+        return False
+    return not (until and week > until.isoformat())
+
+
+def _wards(wards: dict, ward: str | None):
+    return wards.values() if ward is None else filter(None, [wards.get(ward)])
+
+
+def median(histogram: dict):
+    """Median of an {hours: count} histogram, or None if it is empty."""
+    total = sum(histogram.values())
+    if not total:
+        return None
+    seen = 0
+    for hours in sorted(histogram, key=int):
+        seen += histogram[hours]
+        if seen * 2 >= total:
+            return int(hours)
+
+
+def backlog(key: str, ward: str | None = None, since: date | None = None, until: date | None = None) -> list:
+    """
+    Per week: complaints opened, reopened and resolved, and those still open
+    at the end of the week (for one ward, or the whole municipality).
+    """
+    weeks = []
+    still_open = 0
+    for week, wards in sorted(rollup(key).items()):
+        opened = reopened = resolved = 0
+        for cell in _wards(wards, ward):
+            opened += cell["opened"]
+            reopened += cell["reopened"]
+            resolved += cell["resolved"]
+        still_open += opened + reopened - resolved
+        if not _in_range(week, since, until):
+            continue
+        weeks.append({"week": week, "opened": opened, "reopened": reopened, "resolved": resolved,
+                      "open": still_open})
+    return weeks
+
+
+def resolution(key: str, ward: str | None = None, since: date | None = None, until: date | None = None) -> dict:
+    """
+    Median hours from creation to completion overall and per week of completion.
+    """
+    total = {}
+    weeks = []
+    for week, wards in sorted(rollup(key).items()):
+        if not _in_range(week, since, until):
+            continue
+        histogram = {}
+        for cell in _wards(wards, ward):
+            for hours, count in cell["hours"].items():
+                histogram[hours] = histogram.get(hours, 0) + count
+        if not histogram:
+            continue
+        for hours, count in histogram.items():
+            total[hours] = total.get(hours, 0) + count
+        weeks.append({"week": week, "resolved": sum(histogram.values()), "median_hours": median(histogram)})
+    return {"resolved": sum(total.values()), "median_hours": median(total), "weeks": weeks}
+
+
+def wards(key: str) -> list:
+    """
+    Per ward: complaints currently open, resolved in total and the median resolution time.
+    """
+    summary = {}
+    for wards_in_week in rollup(key).values():
+        for ward, cell in wards_in_week.items():
+            entry = summary.setdefault(ward, {"open": 0, "resolved": 0, "hours": {}})
+            entry["open"] += cell["opened"] + cell["reopened"] - cell["resolved"]
+            entry["resolved"] += cell["resolved"]
+            for hours, count in cell["hours"].items():
+                entry["hours"][hours] = entry["hours"].get(hours, 0) + count
+    return [
+        {"ward": ward, "open": entry["open"], "resolved": entry["resolved"], "median_hours": median(entry["hours"])}
+        for ward, entry in sorted(summary.items(), key=lambda item: (len(item[0]), item[0]))
+    ]
+
+
+def reset_cache():
+    """Drop cached rollups (e.g. after DATA_DIR changes in tests)."""
+    _rollups.clear()
+    with _pending_lock:
+        _pending.clear()
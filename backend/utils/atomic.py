@@ -0,0 +1,36 @@
+"""
+Atomic file replacement.
+
+Data files are never rewritten in place: the new content goes to a temporary
+file in the same directory, which is then renamed over the target. A reader
+opening the file at any moment sees either the complete old version or the
+complete new one, never a half-written file.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+
+def _tmp_path(path: Path) -> Path:
+    # unique per process and thread so concurrent writers never share a temp file
+    return path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+@contextmanager
+def atomic_write(path: Path, mode: str = "w", opener=open, **kwargs):
+    """
+    Open a temporary sibling of path for writing; on success it replaces path.
+    If the block raises, path is left untouched and the temporary file removed.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = _tmp_path(path)
+    try:
+        with opener(tmp, mode, **kwargs) as f:
+            yield f
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
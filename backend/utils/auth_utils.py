@@ -1,52 +1,112 @@
-from .file_handler import load_json, save_json
+import threading
+from .file_handler import load_json, save_json, data_version
+from .id_sequence import next_id, max_id_in, reserve
+from .locking import store_lock
 
 USERS_FILE = 'users.json'
 
+# (users.json version, users, {id: user}, {phone: user})
+_user_index = (None, [], {}, {})
+_user_index_lock = threading.Lock()
+
+
+def _load_user_index():
+    """
+    Users plus id and phone lookups, rebuilt only when users.json changes.
+    The first user wins on duplicate ids/phones, like the old linear scans.
+    """
+    global _user_index
+    version = data_version(USERS_FILE)
+    if _user_index[0] == version:
+        return _user_index
+
+    with _user_index_lock:
+        users = load_json(USERS_FILE)
+        by_id, by_phone = {}, {}
+        for user in users:
+            by_id.setdefault(user['id'], user)
+            by_phone.setdefault(user['phone'], user)
+        _user_index = (version, users, by_id, by_phone)
+    return _user_index
+
+
+def preload():
+    """Build the user id/phone index ahead of the first request."""
+    _load_user_index()
+
+
+def public_profile(user: dict) -> dict:
+    """
+    User record without the password.
+    """
+    return {k: v for k, v in user.items() if k != 'password'}
+
 def authenticate_user(phone:str, password:str):
     """
     Authenticate user by phone and password (plain check).
     Returns user dict if valid, else None.
     """
-    users = load_json(USERS_FILE)
+    user = _load_user_index()[3].get(phone)
+    if user and user['password'] == password:
+        return user
 
-    for user in users:
-        if user['phone'] == phone and user['password'] == password:
-            return user
-        
     return None
 
 
 def register_user(user_data: dict):
     """
     Register a new user.
-    Expects dict with keys: id, name, phone, password, role, city, municipality, ward
+    Expects dict with keys: name, phone, password, role, city, municipality, ward
+    The id is allocated by the server.
     """
-    users = load_json(USERS_FILE)
-
-    # ✅ Check duplicate phone number
-    for user in users:
-        if user['phone'] == user_data['phone']:
+    # Serialised across workers so two concurrent saves cannot drop a user
+    with store_lock("users"):
+        # ✅ Check duplicate phone number
+        if user_data['phone'] in _load_user_index()[3]:
             raise ValueError("Phone number already registered")
 
-    # ✅ Append and save outside the loop
-    users.append(user_data)
-    save_json(USERS_FILE, users)
+        users = list(_load_user_index()[1])
+
+        # ✅ Allocate id server-side, then append and save outside the loop
+        user_data = {"id": next_id("users", lambda: max_id_in(USERS_FILE)), **user_data}
+        users.append(user_data)
+        save_json(USERS_FILE, users)
     return user_data
 
+
+def add_users(new_users: list) -> list:
+    """
+    Register many users with one save of users.json; ids are allocated in
+    one block. Raises ValueError, saving nothing, if any phone number is
+    already registered or repeated.
+    """
+    with store_lock("users"):
+        by_phone = _load_user_index()[3]
+        seen = set()
+        for user in new_users:
+            if user['phone'] in by_phone or user['phone'] in seen:
+                raise ValueError(f"Phone number already registered: {user['phone']}")
+            seen.add(user['phone'])
+
+        ids = reserve("users", len(new_users), lambda: max_id_in(USERS_FILE))
+        added = [{"id": user_id, **user} for user_id, user in zip(ids, new_users)]
+        save_json(USERS_FILE, list(_load_user_index()[1]) + added)
+    return added
+
     
 def get_user_by_id(user_id:int):
     """
-    Fetch a single user by their ID.
+    Fetch a single user by their ID (O(1) via the cached id index).
     Returns dict or None if not found.
     """
+    return _load_user_index()[2].get(user_id)
 
-    users = load_json(USERS_FILE)
-
-    for user in users:
-        if user['id'] == user_id:
-            return user
-        
-    return None
+def get_user_by_phone(phone: str):
+    """
+    Fetch a single user by phone number (O(1) via the cached phone index).
+    Returns dict or None if not found.
+    """
+    return _load_user_index()[3].get(phone)
 
 def get_all_users():
     """
@@ -60,15 +120,15 @@ def login_user(phone:str, password:str)->dict:
     Returns user dict if valid, else raises ValueError.
     """
 
-    users = load_json(USERS_FILE)
-
-    for user in users:
-        if user['phone'] == phone:
-            if user['password'] == password:
-                return user # login successful
-            else:
-                raise ValueError("Incorrect password")
-    raise ValueError("Phone number not registered")
+    user = _load_user_index()[3].get(phone)
+    if not user:
+        raise ValueError("Phone number not registered")
+    if user['password'] != password:
+        raise ValueError("Incorrect password")
+    return user # login successful
 
-    
 
+def reset_cache():
+    """Drop the cached user index (e.g. after DATA_DIR changes in tests)."""
+    global _user_index
+    _user_index = (None, [], {}, {})
@@ -0,0 +1,148 @@
+"""
+Cold tier for completed complaints.
+
+Complaints that were completed more than ARCHIVE_AFTER_DAYS ago are moved
+out of the hot shards into compressed, read-only archive files, so the
+working set that every request loads stays small:
+
+    data/complaints/archive/directory.json    {"<complaint id>": "<municipality key>", ...}
+    data/complaints/archive/<key>.json.gz     [complaint, ...] in id order
+
+Nothing in the app calls archive_completed(): it runs from
+`python -m backend.cli archive-complaints`, which has to be scheduled (cron).
+
+Archived complaints are only read when explicitly requested. A shard is
+read, archived and trimmed under the complaint store lock, so an upvote or a
+reopen cannot land on a complaint between being read and being removed.
+"""
+
+import gzip
+import heapq
+import json
+import os
+from datetime import datetime, timedelta
+from . import complaint_store, file_handler
+from .file_handler import load_json, save_json, data_version, bump_version
+from .atomic import atomic_write
+from .locking import store_lock
+
+ARCHIVE_DIRECTORY_FILE = "complaints/archive/directory.json"
+
+# Completed complaints older than this leave the hot set
+ARCHIVE_AFTER_DAYS = int(os.environ.get("HAMRO_COMPLAINT_ARCHIVE_DAYS", "30"))
+
+# key -> (file version, [complaint, ...], {id: complaint})
+_archives = {}
+# (file version, {id: key})
+_directory = (None, {})
+
+
+def archive_file(key: str) -> str:
+    return f"complaints/archive/{key}.json.gz"
+
+
+def load_directory() -> dict:
+    global _directory
+    version = data_version(ARCHIVE_DIRECTORY_FILE)
+    if _directory[0] == version:
+        return _directory[1]
+
+    directory = {int(cid): key for cid, key in (load_json(ARCHIVE_DIRECTORY_FILE) or {}).items()}
+    _directory = (version, directory)
+    return directory
+
+
+def _archive_entry(key: str):
+    version = data_version(archive_file(key))
+    entry = _archives.get(key)
+    if entry is not None and entry[0] == version:
+        return entry
+
+    path = file_handler.DATA_DIR/archive_file(key)
+    complaints = []
+    if path.exists():
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            complaints = json.load(f)
+    entry = (version, complaints, {c["id"]: c for c in complaints})
+    _archives[key] = entry
+    return entry
+
+
+def load_archive(key: str) -> list:
+    return _archive_entry(key)[1]
+
+
+def find(complaint_id: int):
+    """
+    Return the archived complaint with complaint_id, or None.
+    """
+    key = load_directory().get(complaint_id)
+    if key is None:
+        return None
+    return _archive_entry(key)[2].get(complaint_id)
+
+
+def iter_all():
+    keys = sorted(set(load_directory().values()))
+    return heapq.merge(*(load_archive(key) for key in keys), key=lambda c: c["id"])
+
+
+def max_id() -> int:
+    return max(load_directory(), default=0)
+
+
+def store_version():
+    directory = load_directory()
+    keys = sorted(set(directory.values()))
+    return (data_version(ARCHIVE_DIRECTORY_FILE),) + tuple(data_version(archive_file(k)) for k in keys)
+
+
+def _is_cold(complaint: dict, cutoff: str) -> bool:
+    if complaint["status"] != "completed":
+        return False
+    return (complaint.get("completed_at") or complaint["created_at"]) < cutoff
+
+
+def archive_completed(days: int = ARCHIVE_AFTER_DAYS) -> int:
+    """
+    Move completed complaints older than days from the hot shards to the archive.
+    Returns the number of complaints archived.
+    """
+    cutoff = (datetime.now() - timedelta(days=days)).isoformat()
+    moved = 0
+
+    with store_lock("complaint-archive"):
+        archive_directory = dict(load_directory())
+        for key in complaint_store.shard_keys():
+            # The same (reentrant) lock complaint_store writers and remove() take
+            with store_lock("complaints"):
+                moved += _archive_shard(key, cutoff, archive_directory)
+
+    return moved
+
+
+def _archive_shard(key: str, cutoff: str, archive_directory: dict) -> int:
+    """Archive the cold complaints of one shard; callers hold both store locks."""
+    cold = [c for c in complaint_store.load_shard(key) if _is_cold(c, cutoff)]
+    if not cold:
+        return 0
+
+    archived = sorted(load_archive(key) + cold, key=lambda c: c["id"])
+    path = file_handler.DATA_DIR/archive_file(key)
+    with atomic_write(path, "wt", opener=gzip.open, encoding="utf-8") as f:
+        json.dump(archived, f, ensure_ascii=False)
+    bump_version(archive_file(key))
+    _archives.pop(key, None)
+
+    archive_directory.update({c["id"]: key for c in cold})
+    save_json(ARCHIVE_DIRECTORY_FILE, {str(cid): k for cid, k in archive_directory.items()})
+
+    complaint_store.remove(key, {c["id"] for c in cold})
+    return len(cold)
+
+
+def reset_cache():
+    """Drop cached archives (e.g. after DATA_DIR changes in tests)."""
+    global _directory
+    _archives.clear()
+    _directory = (None, {})
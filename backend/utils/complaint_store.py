@@ -0,0 +1,354 @@
+"""
+Complaint storage, sharded per municipality.
+
+Complaints are partitioned by the normalised municipality key so an upvote
+in one municipality never rewrites or re-parses another's complaints:
+
+    data/complaints/directory.json    {"<complaint id>": "<municipality key>", ...}
+    data/complaints/authors.json      {"<author id>": [complaint id, ...], ...}
+    data/complaints/<key>.json        [complaint, ...] in id order
+
+Shards are kept in memory as compact ComplaintRecords (see records) and
+reloaded only when their file changes. A legacy data/complains.json is
+split into this layout on first access.
+
+Readers never lock. Every cached structure (a shard, the directory, the
+author index) is an immutable snapshot that is replaced, never modified:
+a reader takes one reference and works on it for the whole request, while
+a writer holds the store lock, builds the next version from copies, saves
+it and then publishes it with a single assignment.
+
+The store lock is a file lock shared by all uvicorn workers. Caches are
+keyed on data_version(), which every save bumps for all workers, so a
+writer always starts from the latest data on disk and no update is lost.
+Route code changes complaints through update()/update_many(), which hand
+the change function a copy.
+"""
+
+import heapq
+from typing import NamedTuple
+from . import file_handler
+from .file_handler import load_json, save_json, data_version, data_exists
+from .locking import store_lock
+from .municipality_store import municipality_key
+from .records import ComplaintRecord
+
+LEGACY_FILE = "complains.json"
+DIRECTORY_FILE = "complaints/directory.json"
+AUTHORS_FILE = "complaints/authors.json"
+
+
+class Shard(NamedTuple):
+    """
+    Published state of one shard. Neither the tuple nor the dict is ever
+    modified after publication; writers replace the whole Shard.
+    """
+    version: tuple
+    records: tuple   # (ComplaintRecord, ...) in id order
+    by_id: dict      # {id: ComplaintRecord}
+
+
+# key -> Shard
+_shards = {}
+# (file version, {id: key})
+_directory = (None, {})
+# (file version, {author id: [complaint id, ...]})
+_authors = (None, {})
+
+
+def _writer():
+    """Cross-process lock held by writers only."""
+    return store_lock("complaints")
+
+
+def shard_file(key: str) -> str:
+    return f"complaints/{key}.json"
+
+
+def shard_key(complaint: dict) -> str:
+    return municipality_key(complaint.get("municipality"))
+
+
+def migrate_legacy():
+    """
+    Split a legacy complains.json into per-municipality shards + directory.
+    The legacy file is renamed to complains.json.migrated afterwards.
+    """
+    legacy_path = file_handler.DATA_DIR/LEGACY_FILE
+    if not legacy_path.exists() or data_exists(DIRECTORY_FILE):
+        return
+
+    with _writer():
+        if legacy_path.exists() and not data_exists(DIRECTORY_FILE):
+            _migrate_legacy(legacy_path)
+
+
+def _migrate_legacy(legacy_path):
+    shards = {}
+    for complaint in load_json(LEGACY_FILE):
+        shards.setdefault(shard_key(complaint), []).append(complaint)
+
+    directory = {}
+    for key, complaints in shards.items():
+        complaints.sort(key=lambda c: c["id"])
+        save_json(shard_file(key), complaints)
+        directory.update({str(c["id"]): key for c in complaints})
+
+    save_json(DIRECTORY_FILE, directory)
+    legacy_path.rename(legacy_path.with_name(LEGACY_FILE + ".migrated"))
+
+
+def load_directory() -> dict:
+    """
+    Return {complaint id: shard key}, reloaded only when directory.json changes.
+    The returned dict is a snapshot and must not be modified.
+    """
+    global _directory
+    migrate_legacy()
+
+    version = data_version(DIRECTORY_FILE)
+    entry = _directory
+    if entry[0] == version:
+        return entry[1]
+
+    directory = {int(cid): key for cid, key in (load_json(DIRECTORY_FILE) or {}).items()}
+    _directory = (version, directory)
+    return directory
+
+
+def _save_directory(directory: dict):
+    global _directory
+    save_json(DIRECTORY_FILE, {str(cid): key for cid, key in directory.items()})
+    _directory = (data_version(DIRECTORY_FILE), directory)
+
+
+def load_authors() -> dict:
+    """
+    Return {author id: [complaint id, ...]}, built on first use and then
+    maintained by add(). Archived complaints keep their entries.
+    The returned dict is a snapshot and must not be modified.
+    """
+    global _authors
+    if not data_exists(AUTHORS_FILE):
+        _rebuild_authors()
+
+    version = data_version(AUTHORS_FILE)
+    entry = _authors
+    if entry[0] == version:
+        return entry[1]
+
+    authors = {int(aid): ids for aid, ids in (load_json(AUTHORS_FILE) or {}).items()}
+    _authors = (version, authors)
+    return authors
+
+
+def _save_authors(authors: dict):
+    global _authors
+    save_json(AUTHORS_FILE, {str(aid): ids for aid, ids in authors.items()})
+    _authors = (data_version(AUTHORS_FILE), authors)
+
+
+def _rebuild_authors():
+    from .complaint_archive import iter_all as iter_archived  # archive imports this module
+
+    with _writer():
+        if data_exists(AUTHORS_FILE):
+            return
+        authors = {}
+        for complaint in heapq.merge(iter_all(), iter_archived(), key=lambda c: c["id"]):
+            authors.setdefault(complaint["author_id"], []).append(complaint["id"])
+        _save_authors(authors)
+
+
+def complaint_ids_by_author(author_id: int) -> list:
+    return load_authors().get(author_id, [])
+
+
+def shard_keys() -> list:
+    return sorted(set(load_directory().values()))
+
+
+def has_shard(key: str) -> bool:
+    """Whether key has a shard file; nothing is loaded or cached."""
+    migrate_legacy()
+    return data_exists(shard_file(key))
+
+
+def shard(key: str) -> Shard:
+    """
+    Current snapshot of one municipality's shard, reloaded only when its
+    file changes.
+    """
+    migrate_legacy()
+    version = data_version(shard_file(key))
+    entry = _shards.get(key)
+    if entry is not None and entry.version == version:
+        return entry
+
+    # Concurrent readers may both load; whichever publishes last wins and a
+    # stale result is replaced on the next call because its version is older.
+    records = tuple(ComplaintRecord.from_dict(c) for c in load_json(shard_file(key)))
+    entry = Shard(version, records, {r.id: r for r in records})
+    _shards[key] = entry
+    return entry
+
+
+def shard_records(key: str) -> tuple:
+    """
+    Resident records of one municipality. They are shared with other
+    readers; use update() to change a complaint.
+    """
+    return shard(key).records
+
+
+def load_shard(key: str) -> list:
+    """
+    Complaints of one municipality as plain dicts.
+    """
+    return [record.to_dict() for record in shard_records(key)]
+
+
+def save_shard(key: str, records):
+    """
+    Persist one shard and publish the saved records as its new snapshot.
+    Callers must hold the store lock.
+    """
+    records = tuple(records)
+    save_json(shard_file(key), [record.to_dict() for record in records])
+    _shards[key] = Shard(data_version(shard_file(key)), records, {r.id: r for r in records})
+
+
+def find(complaint_id: int):
+    """
+    Return (shard key, resident record) for complaint_id, or (None, None).
+    Only the owning shard is loaded. The record is read-only.
+    """
+    key = load_directory().get(complaint_id)
+    if key is None:
+        return None, None
+    record = shard(key).by_id.get(complaint_id)
+    return (key, record) if record is not None else (None, None)
+
+
+def get(complaint_id: int):
+    """
+    Return complaint_id as a plain dict, or None.
+    """
+    _, record = find(complaint_id)
+    return record.to_dict() if record is not None else None
+
+
+def update(complaint_id: int, change):
+    """
+    Apply change(record) to a copy of complaint_id and publish the result.
+    Returns the new record, or None if the complaint does not exist.
+    If change raises, nothing is saved or published.
+    """
+    return update_many([(complaint_id, change)])[0]
+
+
+def update_many(changes: list) -> list:
+    """
+    Apply [(complaint id, change), ...] in order, saving each touched shard
+    once. Returns the new record for each item (None where the complaint
+    does not exist). If any change raises, nothing is saved or published.
+    """
+    results = []
+    with _writer():
+        changed = {}  # key -> {id: record copy}
+        for complaint_id, change in changes:
+            key, record = find(complaint_id)
+            if record is None:
+                results.append(None)
+                continue
+
+            copies = changed.setdefault(key, {})
+            record = copies.get(complaint_id) or record.copy()
+            change(record)
+            copies[complaint_id] = record
+            results.append(record)
+
+        for key, copies in changed.items():
+            save_shard(key, (copies.get(r.id, r) for r in shard_records(key)))
+    return results
+
+
+def add(complaint: dict):
+    """
+    Append a new complaint to its municipality's shard and register it in
+    the directory and author index.
+    """
+    add_many([complaint])
+
+
+def add_many(complaints: list):
+    """
+    Append new complaints (with ids above every stored one), saving each
+    touched shard, the directory and the author index once.
+    """
+    by_key = {}
+    for complaint in complaints:
+        by_key.setdefault(shard_key(complaint), []).append(ComplaintRecord.from_dict(complaint))
+
+    with _writer():
+        authors = load_authors()
+        directory = dict(load_directory())
+        for key, records in by_key.items():
+            save_shard(key, shard_records(key) + tuple(records))
+            directory.update((r.id, key) for r in records)
+        _save_directory(directory)
+
+        authors = dict(authors)
+        for complaint in complaints:
+            author_id = complaint["author_id"]
+            authors[author_id] = authors.get(author_id, []) + [complaint["id"]]
+        _save_authors(authors)
+
+
+def remove(key: str, complaint_ids: set):
+    """
+    Drop complaints from a shard and from the directory (used when archiving).
+    """
+    with _writer():
+        save_shard(key, [r for r in shard_records(key) if r.id not in complaint_ids])
+        _save_directory({cid: k for cid, k in load_directory().items() if cid not in complaint_ids})
+
+
+def iter_all():
+    """
+    Lazily merge all shards in id order, yielding plain dicts.
+    """
+    merged = heapq.merge(*(shard_records(key) for key in shard_keys()), key=lambda r: r.id)
+    return (record.to_dict() for record in merged)
+
+
+def load_all() -> list:
+    return list(iter_all())
+
+
+def load_municipality(name: str) -> list:
+    """
+    Complaints of a single municipality; only its shard is read.
+    """
+    return load_shard(municipality_key(name))
+
+
+def max_id() -> int:
+    return max(load_directory(), default=0)
+
+
+def store_version(key: str | None = None):
+    """
+    Version stamp of one shard, or of the directory plus every shard.
+    """
+    if key is not None:
+        return data_version(shard_file(key))
+    return (data_version(DIRECTORY_FILE),) + tuple(data_version(shard_file(k)) for k in shard_keys())
+
+
+def reset_cache():
+    """Drop cached shards (e.g. after DATA_DIR changes in tests)."""
+    global _directory, _authors
+    _shards.clear()
+    _directory = (None, {})
+    _authors = (None, {})
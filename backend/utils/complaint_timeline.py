@@ -0,0 +1,139 @@
+"""
+Secondary index: complaint id -> status-change activities.
+
+Municipality activities are stored per municipality and month (see
+activity_log), which is the wrong shape for "what happened to complaint
+42". This index keeps a copy of every activity that references a complaint,
+grouped by the complaint's own shard, so a timeline lookup costs
+O(activities for that complaint):
+
+    data/complaints/timeline/<key>.json    {"<complaint id>": [activity, ...], ...}
+
+It is updated whenever status-change activities are appended and is rebuilt
+from the activity log the first time it is used (or via the CLI). An
+activity whose id is already indexed is not added again.
+"""
+
+from . import complaint_archive, complaint_store, file_handler
+from .file_handler import load_json, save_json, data_version
+from .locking import store_lock
+from .municipality_store import load_activities, load_index
+from .records import ActivityRecord
+
+TIMELINE_DIR = "complaints/timeline"
+
+# key -> (file version, {complaint id: [ActivityRecord, ...]})
+_timelines = {}
+
+
+def timeline_file(key: str) -> str:
+    return f"{TIMELINE_DIR}/{key}.json"
+
+
+def _shard_for(complaint_id: int):
+    return complaint_store.load_directory().get(complaint_id) or complaint_archive.load_directory().get(complaint_id)
+
+
+def _load(key: str) -> dict:
+    version = data_version(timeline_file(key))
+    entry = _timelines.get(key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    timeline = {
+        int(cid): [ActivityRecord.from_dict(item) for item in items]
+        for cid, items in (load_json(timeline_file(key)) or {}).items()
+    }
+    _timelines[key] = (version, timeline)
+    return timeline
+
+
+def _save(key: str, timeline: dict):
+    save_json(timeline_file(key), {str(cid): [r.to_dict() for r in items] for cid, items in timeline.items()})
+    _timelines[key] = (data_version(timeline_file(key)), timeline)
+
+
+def _ensure_built() -> bool:
+    """Build the index if it is missing; returns whether it was built."""
+    if not (file_handler.DATA_DIR/TIMELINE_DIR).exists():
+        rebuild()
+        return True
+    return False
+
+
+def record(activities: list, municipality: str):
+    """
+    Index activities (posted by municipality) that reference a complaint,
+    skipping ids already in the index (a retried or replayed job).
+    """
+    if _ensure_built():
+        # The rebuild read the activity log, which usually has these already:
+        # ids are deduplicated below, activities without one cannot be and are skipped
+        activities = [activity for activity in activities if activity.get("id") is not None]
+    by_shard = {}
+    for activity in activities:
+        complaint_id = activity.get("complaint_id")
+        key = _shard_for(complaint_id) if complaint_id is not None else None
+        if key is not None:
+            by_shard.setdefault(key, []).append(ActivityRecord.from_dict({**activity, "municipality": municipality}))
+
+    with store_lock("timeline"):
+        for key, items in by_shard.items():
+            # Build the next version from copies; readers may hold the current one
+            timeline = dict(_load(key))
+            for item in items:
+                complaint_id = item["complaint_id"]
+                indexed = timeline.get(complaint_id, [])
+                if item["id"] is not None and any(a["id"] == item["id"] for a in indexed):
+                    continue
+                timeline[complaint_id] = indexed + [item]
+            _save(key, timeline)
+
+
+def get(complaint_id: int) -> list:
+    """
+    Activities for complaint_id in the order they were recorded.
+    """
+    _ensure_built()
+    key = _shard_for(complaint_id)
+    if key is None:
+        return []
+    return [record.to_dict() for record in _load(key).get(complaint_id, [])]
+
+
+def rebuild():
+    """
+    Rebuild the whole index from every municipality's activity log.
+    """
+    timelines = {}
+    for muni_key, muni in load_index().items():
+        for activity in load_activities(muni_key, include_archived=True):
+            complaint_id = activity.get("complaint_id")
+            key = _shard_for(complaint_id) if complaint_id is not None else None
+            if key is not None:
+                item = ActivityRecord.from_dict({**activity, "municipality": muni["municipality"]})
+                timelines.setdefault(key, {}).setdefault(complaint_id, []).append(item)
+
+    with store_lock("timeline"):
+        timeline_dir = file_handler.DATA_DIR/TIMELINE_DIR
+        timeline_dir.mkdir(parents=True, exist_ok=True)
+        for stale in timeline_dir.glob("*.json"):
+            stale.unlink()
+        _timelines.clear()
+
+        for key, timeline in timelines.items():
+            for items in timeline.values():
+                items.sort(key=lambda a: a["timestamp"])
+            _save(key, timeline)
+
+
+def preload():
+    """Build the index if missing and load every timeline shard."""
+    _ensure_built()
+    for path in (file_handler.DATA_DIR/TIMELINE_DIR).glob("*.json*"):  # JSON or snapshot
+        _load(path.name.split(".json")[0])
+
+
+def reset_cache():
+    """Drop cached timelines (e.g. after DATA_DIR changes in tests)."""
+    _timelines.clear()
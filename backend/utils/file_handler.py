@@ -1,34 +1,181 @@
 import json
+import os
+import time
 from pathlib import Path
+from . import generations
+from .metrics import (STORAGE_LOAD_SECONDS, STORAGE_PARSE_SECONDS, STORAGE_READ_BYTES,
+                      STORAGE_SAVE_SECONDS, STORAGE_WRITTEN_BYTES)
+from .atomic import atomic_write
+from .snapshot import read_snapshot, write_snapshot
 
 #path to the directory
 DATA_DIR = Path(__file__).resolve().parent.parent/'data'
 
+# Binary snapshots live next to the JSON file they replace (users.json.snap).
+# With HAMRO_SNAPSHOT_FORMAT=binary saves write snapshots; loads always use
+# whichever of the two files is newer, so either format is picked up automatically.
+SNAPSHOT_SUFFIX = ".snap"
+SNAPSHOT_FORMAT = os.environ.get("HAMRO_SNAPSHOT_FORMAT", "json")
+
+
+def store_label(filename: str) -> str:
+    """
+    Metrics label for filename: its top-level directory ("complaints" for every
+    shard, segment and index below it) or, for top-level files, the file's stem.
+    """
+    head, sep, _ = filename.partition("/")
+    return head if sep else head.split(".")[0]
+
+
+def bump_version(filename: str):
+    """
+    Change filename's data_version() in every worker. save_json() does this;
+    call it after writing a data file by other means.
+    """
+    # Shared with the other workers, so two saves landing within the
+    # filesystem's mtime granularity still produce distinct versions.
+    generations.bump(DATA_DIR, filename)
+
+
+def _stat(path: Path):
+    try:
+        return path.stat()
+    except FileNotFoundError:
+        return None
+
+
+def _active_file(filename: str):
+    """
+    Return (path, stat) of the file currently holding filename's data:
+    the snapshot if it is at least as new as the JSON file, else the JSON file.
+    stat is None when neither exists.
+    """
+    json_path = DATA_DIR/filename
+    snap_path = DATA_DIR/(filename + SNAPSHOT_SUFFIX)
+    json_stat = _stat(json_path)
+    snap_stat = _stat(snap_path)
+
+    if snap_stat is not None and (json_stat is None or snap_stat.st_mtime_ns >= json_stat.st_mtime_ns):
+        return snap_path, snap_stat
+    return json_path, json_stat
+
+
+def data_exists(filename: str) -> bool:
+    """
+    True if filename exists in either JSON or snapshot form.
+    """
+    return _active_file(filename)[1] is not None
+
+
 def load_json(filename: str):
     """
     Load JSON file (user.json, complains.json, municipality.json).
     Returns a Python object (list/dict). If file is empty/missing -> [].
+    A newer binary snapshot of the file is loaded instead when present.
+    Saves replace files atomically, so a file that does not parse is
+    corrupt rather than half-written and raises instead of reading as [].
     """
-    filepath = DATA_DIR/filename
+    filepath, stat = _active_file(filename)
 
-    if not filepath.exists():
+    if stat is None:
         return []
-    
-    with open(filepath, "r", encoding = "utf-8") as f:
-        try:
-            return json.load(f)
-        
-        except json.JSONDecodeError:
-            return [] #if the file has some issue or is empty
-        
+
+    if stat.st_size == 0:
+        return [] #empty file
+
+    store = store_label(filename)
+    start = time.perf_counter()
+    if filepath.suffix == SNAPSHOT_SUFFIX:
+        data = read_snapshot(filepath)
+        parse_start = start  # mmapped: reading and decoding are the same step
+    else:
+        with open(filepath, "r", encoding = "utf-8") as f:
+            text = f.read()
+        parse_start = time.perf_counter()
+        data = json.loads(text)
+    end = time.perf_counter()
+
+    STORAGE_LOAD_SECONDS.observe(end - start, store=store)
+    STORAGE_PARSE_SECONDS.observe(end - parse_start, store=store)
+    STORAGE_READ_BYTES.inc(stat.st_size, store=store)
+    return data
+
 
 def save_json(filename:str, data):
     """
-    Save Python object into JSON file inside /data directory.
+    Save Python object into JSON file inside /data directory
+    (or as a binary snapshot when HAMRO_SNAPSHOT_FORMAT=binary).
     """
 
     filepath = DATA_DIR/filename
+    store = store_label(filename)
+    start = time.perf_counter()
+
+    if SNAPSHOT_FORMAT == "binary":
+        filepath = DATA_DIR/(filename + SNAPSHOT_SUFFIX)
+        write_snapshot(filepath, data)
+    else:
+        with atomic_write(filepath, 'w', encoding = 'utf-8') as f:
+            json.dump(data,f, indent = 4, ensure_ascii=False)
+
+    STORAGE_SAVE_SECONDS.observe(time.perf_counter() - start, store=store)
+    STORAGE_WRITTEN_BYTES.inc(filepath.stat().st_size, store=store)
+    bump_version(filename)
+
+
+def delete_data(filename: str):
+    """
+    Remove filename in both JSON and snapshot form.
+    """
+    for path in (DATA_DIR/filename, DATA_DIR/(filename + SNAPSHOT_SUFFIX)):
+        path.unlink(missing_ok=True)
+    bump_version(filename)
+
 
-    with open(filepath, 'w', encoding = 'utf-8') as f:
+def export_json(filename: str):
+    """
+    Write filename's current data (whatever format it is in) as human-readable JSON.
+    """
+    data = load_json(filename)
+    with atomic_write(DATA_DIR/filename, 'w', encoding = 'utf-8') as f:
         json.dump(data,f, indent = 4, ensure_ascii=False)
-        
\ No newline at end of file
+    bump_version(filename)
+
+
+def import_json(filename: str):
+    """
+    Convert filename's JSON file into a binary snapshot.
+    """
+    with open(DATA_DIR/filename, "r", encoding = "utf-8") as f:
+        data = json.load(f)
+    write_snapshot(DATA_DIR/(filename + SNAPSHOT_SUFFIX), data)
+    bump_version(filename)
+
+
+def data_files():
+    """
+    Names (relative to DATA_DIR) of all JSON/snapshot data files.
+    """
+    names = set()
+    for path in DATA_DIR.rglob("*"):
+        name = path.relative_to(DATA_DIR).as_posix()
+        if name.endswith(".json" + SNAPSHOT_SUFFIX):
+            names.add(name[: -len(SNAPSHOT_SUFFIX)])
+        elif name.endswith(".json"):
+            names.add(name)
+    return sorted(names)
+
+
+def data_version(filename: str):
+    """
+    Return a cheap version stamp for a data file.
+    The stamp changes whenever the file is saved (by this process or any
+    other), so it can be used as a cache key without reading the file.
+    """
+    generation = generations.current(DATA_DIR, filename)
+    filepath, stat = _active_file(filename)
+
+    if stat is None:
+        return (generation, 0, 0, 0)
+
+    return (generation, stat.st_ino, stat.st_mtime_ns, stat.st_size)
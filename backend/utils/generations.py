@@ -0,0 +1,72 @@
+"""
+Shared write counters for data files.
+
+Several uvicorn workers cache the same data files. A file's mtime alone is
+not a reliable change signal between processes: two saves can land in the
+same filesystem clock tick with the same size (an upvote turning 1 into 2).
+Every save therefore also bumps a counter in a small memory-mapped file
+shared by all workers:
+
+    data/.generations    SLOTS little-endian u64 counters
+
+A file's counter lives in slot crc32(filename) % SLOTS. Files sharing a slot
+only cause an extra reload, never a missed one.
+"""
+
+import mmap
+import struct
+import threading
+import zlib
+from pathlib import Path
+
+GENERATIONS_FILE = ".generations"
+SLOTS = 4096
+
+_SLOT = struct.Struct("<Q")
+
+# data dir -> mmap of its counters file
+_maps = {}
+_maps_lock = threading.Lock()
+
+
+def _map(data_dir: Path) -> mmap.mmap:
+    counters = _maps.get(data_dir)
+    if counters is not None:
+        return counters
+
+    with _maps_lock:
+        counters = _maps.get(data_dir)
+        if counters is None:
+            path = data_dir/GENERATIONS_FILE
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "a+b") as f:
+                if f.seek(0, 2) < SLOTS * _SLOT.size:
+                    f.truncate(SLOTS * _SLOT.size)
+                counters = mmap.mmap(f.fileno(), SLOTS * _SLOT.size)
+            _maps[data_dir] = counters
+    return counters
+
+
+def _offset(filename: str) -> int:
+    return (zlib.crc32(filename.encode("utf-8")) % SLOTS) * _SLOT.size
+
+
+def current(data_dir: Path, filename: str) -> int:
+    return _SLOT.unpack_from(_map(data_dir), _offset(filename))[0]
+
+
+def bump(data_dir: Path, filename: str):
+    """
+    Mark filename as changed for every process. Call after the file was replaced.
+    """
+    counters = _map(data_dir)
+    offset = _offset(filename)
+    _SLOT.pack_into(counters, offset, _SLOT.unpack_from(counters, offset)[0] + 1)
+
+
+def reset():
+    """Unmap all counter files (e.g. after DATA_DIR changes in tests)."""
+    with _maps_lock:
+        for counters in _maps.values():
+            counters.close()
+        _maps.clear()
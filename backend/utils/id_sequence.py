@@ -0,0 +1,77 @@
+"""
+Server-side ID allocation.
+
+IDs come from a persisted monotonic counter per entity in sequences.json
+instead of scanning the data for max(id). With several workers each process
+reserves a block of IDS_PER_BLOCK ids at a time under a file lock, so the
+shared counter is only touched once per block.
+"""
+
+import os
+import threading
+from .file_handler import load_json, save_json
+from . import file_handler
+from .locking import file_lock
+
+SEQUENCE_FILE = "sequences.json"
+LOCK_FILE = "sequences.lock"
+
+# 1 keeps ids dense for a single worker; raise it when running many workers
+IDS_PER_BLOCK = max(1, int(os.environ.get("HAMRO_ID_BLOCK_SIZE", "1")))
+
+# name -> [next id to hand out, end of reserved block (exclusive)]
+_blocks = {}
+_lock = threading.Lock()
+
+
+def max_id_in(filename: str) -> int:
+    return max((item["id"] for item in load_json(filename)), default=0)
+
+
+def _reserve_block(name: str, seed) -> list:
+    with file_lock(file_handler.DATA_DIR/LOCK_FILE):
+        sequences = load_json(SEQUENCE_FILE) or {}
+        last = sequences.get(name)
+        if last is None:
+            # First allocation: continue from the ids already in the data
+            last = seed()
+        sequences[name] = last + IDS_PER_BLOCK
+        save_json(SEQUENCE_FILE, sequences)
+    return [last + 1, last + 1 + IDS_PER_BLOCK]
+
+
+def next_id(name: str, seed) -> int:
+    """
+    Allocate the next id for name ("users", "complaints", ...).
+    seed() returns the highest existing id; it is only called once, to start
+    the sequence after the data already on disk.
+    """
+    with _lock:
+        block = _blocks.get(name)
+        if block is None or block[0] >= block[1]:
+            block = _blocks[name] = _reserve_block(name, seed)
+        allocated = block[0]
+        block[0] += 1
+    return allocated
+
+
+def reserve(name: str, count: int, seed) -> range:
+    """
+    Allocate count consecutive ids for name in one step (bulk imports).
+    They come straight from the shared counter, past every block already
+    handed to a worker.
+    """
+    with file_lock(file_handler.DATA_DIR/LOCK_FILE):
+        sequences = load_json(SEQUENCE_FILE) or {}
+        last = sequences.get(name)
+        if last is None:
+            last = seed()
+        sequences[name] = last + count
+        save_json(SEQUENCE_FILE, sequences)
+    return range(last + 1, last + 1 + count)
+
+
+def reset_blocks():
+    """Forget reserved blocks (e.g. after DATA_DIR changes in tests)."""
+    with _lock:
+        _blocks.clear()
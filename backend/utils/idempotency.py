@@ -0,0 +1,130 @@
+"""
+Idempotency keys for retry-safe writes.
+
+A client that sends `Idempotency-Key: <unique value>` with a write can retry
+it freely: the first request with that key runs, and every repeat within
+HAMRO_IDEMPOTENCY_TTL seconds gets the stored result (marked with an
+`Idempotent-Replayed: true` header) without saving, uploading or queueing
+anything again.
+
+Keys are scoped per route and user, so two users cannot collide. Reusing a
+key with a different request is refused with 422, and a repeat that arrives
+while the first request is still running gets 409. Only successful results
+are stored; after an error the same key can be retried.
+
+The cache is in memory, bounded (HAMRO_IDEMPOTENCY_CAPACITY keys, oldest
+evicted first) and per worker process, so retries are only deduplicated
+when they reach the same worker.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from fastapi import HTTPException, Response
+
+TTL_SECONDS = float(os.environ.get("HAMRO_IDEMPOTENCY_TTL", "86400"))
+CAPACITY = int(os.environ.get("HAMRO_IDEMPOTENCY_CAPACITY", "10000"))
+# Longer keys are refused rather than stored
+MAX_KEY_LENGTH = 255
+
+_PENDING = object()
+
+
+def fingerprint(*parts) -> str:
+    """Stable digest of the request fields that define "the same request"."""
+    return hashlib.sha256(json.dumps(parts, default=str).encode("utf-8")).hexdigest()
+
+
+def upload_fingerprint(upload):
+    """What identifies an uploaded file for fingerprint() (its bytes are not read)."""
+    return (upload.filename, upload.size) if upload else None
+
+
+class IdempotencyCache:
+    """
+    Bounded TTL map of (scope, key) -> [expires at, fingerprint, result].
+    """
+
+    def __init__(self, capacity: int = CAPACITY, ttl: float = TTL_SECONDS):
+        self.capacity = capacity
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def begin(self, scope: str, key: str, digest: str, now: float | None = None):
+        """
+        Claim key for a new request and return None, or return the stored
+        result of an earlier one. Raises 409/422 as described above.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._evict(now)
+            entry = self._entries.get((scope, key))
+            if entry is None:
+                self._entries[(scope, key)] = [now + self.ttl, digest, _PENDING]
+                return None
+        if entry[1] != digest:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+        if entry[2] is _PENDING:
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+        return copy.deepcopy(entry[2])
+
+    def complete(self, scope: str, key: str, digest: str, result, now: float | None = None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._entries.pop((scope, key), None)
+            self._entries[(scope, key)] = [now + self.ttl, digest, copy.deepcopy(result)]
+            self._evict(now)
+
+    def release(self, scope: str, key: str):
+        """Forget a claimed key whose request failed, so it can be retried."""
+        with self._lock:
+            entry = self._entries.get((scope, key))
+            if entry is not None and entry[2] is _PENDING:
+                del self._entries[(scope, key)]
+
+    def _evict(self, now: float):
+        """Drop expired keys and keys over capacity, oldest first; callers hold _lock."""
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry[0] > now and len(self._entries) <= self.capacity:
+                return
+            del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+async def idempotent(key: str | None, scope: str, digest: str, response: Response, handler):
+    """
+    Run the endpoint body handler() once per key and return its result;
+    without a key just run it.
+    """
+    if key is None:
+        return await handler()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+
+    stored = idempotency_cache.begin(scope, key, digest)
+    if stored is not None:
+        response.headers["Idempotent-Replayed"] = "true"
+        return stored
+    try:
+        result = await handler()
+    except BaseException:
+        idempotency_cache.release(scope, key)
+        raise
+    idempotency_cache.complete(scope, key, digest, result)
+    return result
+
+
+# Shared by all routes in this process
+idempotency_cache = IdempotencyCache()
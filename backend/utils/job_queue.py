@@ -0,0 +1,333 @@
+"""
+In-process job queue for post-commit side effects.
+
+Request handlers commit the core record (a complaint, a status change) and
+hand follow-up work -- moving uploaded images into place, appending
+municipality activities, updating the timeline index -- to this queue, so
+the response does not wait for it.
+
+Jobs are durable: before a job is queued it is appended to a spool file of
+this process, and a "done" line follows once it has finished. A worker that
+starts up replays the spools of processes that died with jobs pending:
+
+    data/jobs/spool-<pid>.jsonl    {"op": "add", "id", "name", "payload", ...} / {"op": "done", "id"}
+    data/jobs/blobs/<job id>.<name>    binary job inputs (uploaded images)
+    data/jobs/failed.jsonl         jobs that failed MAX_ATTEMPTS times
+
+The queue is bounded; when it is full the caller runs the job itself, so a
+backlog slows writers down instead of growing without limit. Failed jobs are
+retried with exponential backoff, and a job whose "done" line was not written
+before a crash is replayed, so a handler may run again after it (partly)
+succeeded. Handlers must recognise work already done: payload["job_id"] stays
+the same across retries and replay for that purpose.
+With HAMRO_JOB_WORKERS=0 jobs run inline in enqueue() (used by the tests).
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from . import file_handler
+from .atomic import atomic_write
+from .metrics import JOB_DURATION
+
+WORKERS = int(os.environ.get("HAMRO_JOB_WORKERS", "2"))
+CAPACITY = int(os.environ.get("HAMRO_JOB_CAPACITY", "1000"))
+MAX_ATTEMPTS = int(os.environ.get("HAMRO_JOB_ATTEMPTS", "3"))
+# Seconds before the first retry; doubled for every further attempt
+RETRY_DELAY = float(os.environ.get("HAMRO_JOB_RETRY_DELAY", "0.5"))
+
+SPOOL_DIR = "jobs"
+FAILED_FILE = "jobs/failed.jsonl"
+# Latency percentiles are computed over this many most recent jobs
+LATENCY_SAMPLES = 1000
+
+
+def _alive(pid: int) -> bool:
+    if os.name == "nt":
+        return True  # no cheap liveness check; leave other processes' spools alone
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _percentile(samples: list, fraction: float):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class JobQueue:
+    """
+    Bounded worker pool with retries and a durable spool.
+    """
+
+    def __init__(self, workers: int = WORKERS, capacity: int = CAPACITY,
+                 max_attempts: int = MAX_ATTEMPTS, retry_delay: float = RETRY_DELAY):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._handlers = {}
+        self._queue = queue.Queue(maxsize=capacity)
+        self._threads = []
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0  # enqueued and not finished, including retries waiting
+        self._spool = None  # (path, file)
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+
+    # ---------------- registration / enqueue ---------------- #
+
+    def register(self, name: str):
+        """
+        Decorator registering handler(payload) for jobs called name.
+        """
+        def decorator(handler):
+            self._handlers[name] = handler
+            return handler
+        return decorator
+
+    def enqueue(self, name: str, payload: dict, blobs: dict | None = None) -> str:
+        """
+        Durably queue a job and return its id. payload must be JSON
+        serialisable; the handler receives it with the id as
+        payload["job_id"]. blobs ({name: bytes}) are stored next to the spool
+        and their paths passed to the handler as payload["blobs"].
+        """
+        if name not in self._handlers:
+            raise KeyError(f"No handler registered for job {name!r}")
+
+        job_id = uuid.uuid4().hex
+        payload = {**payload, "job_id": job_id}
+        if blobs:
+            paths = {}
+            for blob_name, data in blobs.items():
+                path = file_handler.DATA_DIR/SPOOL_DIR/"blobs"/f"{job_id}.{blob_name}"
+                with atomic_write(path, "wb") as f:
+                    f.write(data)
+                paths[blob_name] = str(path)
+            payload = {**payload, "blobs": paths}
+
+        job = {"id": job_id, "name": name, "payload": payload, "attempts": 0, "enqueued_at": time.time()}
+
+        if self.workers <= 0:
+            self._run_inline(job)
+            return job_id
+
+        self.start()
+        with self._lock:
+            self._spool_write({"op": "add", **job})
+            self._pending += 1
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            # Bounded: the caller does the work instead of growing the backlog
+            self._execute(job)
+        return job_id
+
+    # ---------------- lifecycle ---------------- #
+
+    def start(self):
+        """
+        Start the worker threads (idempotent) and replay jobs left behind by
+        processes that are no longer running.
+        """
+        if self._threads or self.workers <= 0:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        self._recover()
+
+    def join(self, timeout: float | None = None) -> bool:
+        """
+        Wait until every queued job has finished. Returns False on timeout.
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def stop(self, timeout: float | None = None):
+        """
+        Finish queued jobs (up to timeout) and stop the workers. Jobs still
+        pending stay in the spool and are replayed by the next process.
+        """
+        self.join(timeout)
+        threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join(timeout)
+        with self._lock:
+            if self._spool is not None:
+                self._spool[1].close()
+                self._spool = None
+
+    @property
+    def pending(self) -> int:
+        """Jobs queued, running or waiting for a retry (a cheap read for load shedding)."""
+        return self._pending
+
+    def stats(self) -> dict:
+        """
+        Queue depth, outcome counters and job latency (enqueue to finish, ms).
+        """
+        with self._lock:
+            latencies = list(self._latencies)
+            return {
+                "workers": len(self._threads),
+                "capacity": self._queue.maxsize,
+                "depth": self._queue.qsize(),
+                "pending": self._pending,
+                "completed": self.completed,
+                "failed": self.failed,
+                "retried": self.retried,
+                "latency_ms": {
+                    "p50": _percentile(latencies, 0.50),
+                    "p99": _percentile(latencies, 0.99),
+                    "max": max(latencies, default=None),
+                },
+            }
+
+    # ---------------- execution ---------------- #
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            self._execute(job)
+
+    def _attempt(self, job: dict):
+        job["attempts"] += 1
+        start = time.perf_counter()
+        try:
+            self._handlers[job["name"]](job["payload"])
+        except Exception as e:
+            JOB_DURATION.observe(time.perf_counter() - start, job=job["name"], result="error")
+            return e
+        JOB_DURATION.observe(time.perf_counter() - start, job=job["name"], result="ok")
+        return None
+
+    def _execute(self, job: dict):
+        error = self._attempt(job)
+        if error is not None and job["attempts"] < self.max_attempts:
+            with self._lock:
+                self.retried += 1
+            delay = self.retry_delay * 2 ** (job["attempts"] - 1)
+            timer = threading.Timer(delay, self._queue.put, args=(job,))
+            timer.daemon = True
+            timer.start()
+            return
+        self._finish(job, error, spooled=True)
+
+    def _run_inline(self, job: dict):
+        error = self._attempt(job)
+        while error is not None and job["attempts"] < self.max_attempts:
+            with self._lock:
+                self.retried += 1
+            time.sleep(self.retry_delay * 2 ** (job["attempts"] - 1))
+            error = self._attempt(job)
+        with self._lock:
+            self._pending += 1
+        self._finish(job, error, spooled=False)
+
+    def _finish(self, job: dict, error, spooled: bool):
+        if error is not None:
+            record = {**job, "error": repr(error), "failed_at": time.time()}
+            failed_path = file_handler.DATA_DIR/FAILED_FILE
+            failed_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(failed_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        else:
+            for path in job["payload"].get("blobs", {}).values():
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+
+        with self._idle:
+            self._latencies.append((time.time() - job["enqueued_at"]) * 1000)
+            if error is None:
+                self.completed += 1
+            else:
+                self.failed += 1
+            if spooled:
+                self._spool_write({"op": "done", "id": job["id"]})
+            self._pending -= 1
+            if self._pending == 0:
+                if self._spool is not None:
+                    self._spool[1].truncate(0)  # nothing left to replay
+                self._idle.notify_all()
+
+    # ---------------- spool ---------------- #
+
+    def _spool_write(self, record: dict):
+        """Append one spool line; callers hold _lock."""
+        path = file_handler.DATA_DIR/SPOOL_DIR/f"spool-{os.getpid()}.jsonl"
+        if self._spool is None or self._spool[0] != path:
+            if self._spool is not None:
+                self._spool[1].close()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._spool = (path, open(path, "a", encoding="utf-8"))
+        self._spool[1].write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._spool[1].flush()
+
+    def _recover(self):
+        spool_dir = file_handler.DATA_DIR/SPOOL_DIR
+        if not spool_dir.exists():
+            return
+
+        for path in sorted(spool_dir.glob("*.jsonl")):
+            prefix, _, rest = path.stem.partition("-")
+            if prefix not in ("spool", "recovering"):
+                continue
+            pid = int(rest.split("-")[0])
+            if pid == os.getpid() or _alive(pid):
+                continue
+
+            # Claim the file so only one restarted worker replays it
+            claimed = spool_dir/f"recovering-{os.getpid()}-{uuid.uuid4().hex}.jsonl"
+            try:
+                os.replace(path, claimed)
+            except FileNotFoundError:
+                continue
+
+            jobs = {}
+            with open(claimed, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # last line cut short by the crash
+                    if record["op"] == "add":
+                        jobs[record["id"]] = {k: v for k, v in record.items() if k != "op"}
+                    else:
+                        jobs.pop(record["id"], None)
+
+            for job in jobs.values():
+                if job["name"] not in self._handlers:
+                    continue
+                with self._lock:
+                    self._spool_write({"op": "add", **job})
+                    self._pending += 1
+                self._queue.put(job)
+            claimed.unlink()
+
+
+# Shared by the whole app; handlers are registered in backend.jobs
+jobs = JobQueue()
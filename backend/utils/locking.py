@@ -0,0 +1,88 @@
+"""
+Cross-process file locks.
+
+Used wherever several uvicorn workers may read-modify-write the same file.
+flock is used on POSIX and msvcrt byte-range locking on Windows.
+
+Locks are reentrant within a thread, so a store's writer functions can call
+each other while holding the store lock.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class _PathLock:
+    """
+    flock locks are per open file, so threads of one process still need
+    their own lock; depth counts nested acquisitions by the owning thread.
+    """
+    __slots__ = ("thread_lock", "depth")
+
+    def __init__(self):
+        self.thread_lock = threading.RLock()
+        self.depth = 0
+
+
+_path_locks = {}
+_path_locks_guard = threading.Lock()
+
+
+def _path_lock(path: Path) -> _PathLock:
+    with _path_locks_guard:
+        return _path_locks.setdefault(str(path), _PathLock())
+
+
+def _acquire(path: Path) -> int:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+    else:
+        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+    return fd
+
+
+def _release(fd: int):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    os.close(fd)
+
+
+@contextmanager
+def file_lock(path: Path):
+    """
+    Hold an exclusive lock on path (created if missing) for the duration of the block.
+    """
+    path = Path(path)
+    lock = _path_lock(path)
+
+    with lock.thread_lock:
+        fd = _acquire(path) if lock.depth == 0 else None
+        lock.depth += 1
+        try:
+            yield
+        finally:
+            lock.depth -= 1
+            if fd is not None:
+                _release(fd)
+
+
+def store_lock(name: str):
+    """
+    Cross-process writer lock of one store (data/locks/<name>.lock).
+    Hold it around every read-modify-write of the store's files.
+    """
+    from . import file_handler  # DATA_DIR is patched in tests
+    return file_lock(file_handler.DATA_DIR/"locks"/f"{name}.lock")
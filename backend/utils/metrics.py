@@ -0,0 +1,184 @@
+"""
+Prometheus metrics without the client library.
+
+Counters and histograms live in process memory and are rendered in the text
+exposition format by render() for GET /metrics. With several uvicorn workers
+each worker reports its own numbers; scrape them individually or sum them in
+Prometheus.
+
+Labels are kept low-cardinality on purpose: routes are reported by their
+template (/complaints/{complaint_id}) and data files by store (complaints,
+municipalities, users), never by id, shard or month.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds, from in-memory cache hits to slow full-file writes
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}  # label values -> value
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: tuple) -> dict:
+        return dict(zip(self.labelnames, key))
+
+    def samples(self):
+        """Yield (sample name, labels, value) for the exposition format."""
+        raise NotImplementedError
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name, self._labels(key), value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # [per-bucket counts (last one is +Inf), sum, count]
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        entry = self._values.get(self._key(labels))
+        return entry[2] if entry else 0
+
+    def samples(self):
+        with self._lock:
+            items = [(key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items()]
+        for key, (counts, total, count) in items:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket", {**labels, "le": _format_value(float(bound))}, cumulative
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, count
+
+
+class Callback(_Metric):
+    """
+    A value read when /metrics is scraped (queue depth, cache sizes).
+    """
+
+    def __init__(self, name: str, documentation: str, read, kind: str = "gauge"):
+        super().__init__(name, documentation)
+        self.kind = kind
+        self._read = read
+
+    def samples(self):
+        yield self.name, {}, self._read()
+
+
+def render() -> str:
+    """
+    Every registered metric in the Prometheus text exposition format.
+    """
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    """Zero every counter and histogram (e.g. between tests)."""
+    for metric in _registry:
+        metric.clear()
+
+
+HTTP_REQUESTS = Counter(
+    "hamro_http_requests_total", "HTTP requests by route template and status code.",
+    ("method", "route", "status"))
+HTTP_DURATION = Histogram(
+    "hamro_http_request_duration_seconds", "Time from request start to the end of the response.",
+    ("method", "route"))
+
+STORAGE_LOAD_SECONDS = Histogram(
+    "hamro_storage_load_seconds", "load_json: reading and decoding one data file.", ("store",))
+STORAGE_PARSE_SECONDS = Histogram(
+    "hamro_storage_parse_seconds", "load_json: decoding only (JSON parse or snapshot decode).", ("store",))
+STORAGE_READ_BYTES = Counter(
+    "hamro_storage_read_bytes_total", "Bytes of data files loaded.", ("store",))
+STORAGE_SAVE_SECONDS = Histogram(
+    "hamro_storage_save_seconds", "save_json: encoding and atomically replacing one data file.", ("store",))
+STORAGE_WRITTEN_BYTES = Counter(
+    "hamro_storage_written_bytes_total", "Bytes of data files written.", ("store",))
+
+TOKEN_VERIFY_SECONDS = Histogram(
+    "hamro_token_verify_seconds", "JWT decoding and validation.", ("result",))
+
+JOB_DURATION = Histogram(
+    "hamro_job_duration_seconds", "Run time of one background job attempt.", ("job", "result"))
@@ -0,0 +1,149 @@
+"""
+Municipality storage.
+
+Municipalities are looked up through a normalised key index instead of a
+lower-cased linear scan, and each municipality's activities live in their
+own shard directory, so a staff post only rewrites its own municipality:
+
+    data/municipalities/index.json    [{id, name, city, municipality, key}, ...]
+    data/municipalities/<key>/        time-segmented activity log (see activity_log)
+
+A legacy data/municipality.json (activities embedded in each record) is
+split into this layout the first time the index is loaded.
+"""
+
+import threading
+import unicodedata
+from . import activity_log, file_handler
+from .file_handler import load_json, save_json, data_version, data_exists
+from .locking import store_lock
+
+LEGACY_FILE = "municipality.json"
+INDEX_FILE = "municipalities/index.json"
+
+# Generic words dropped from names so "Kathmandu", "kathmandu metropolitan"
+# and "Kathmandu Metropolitan City" all resolve to the same municipality
+_GENERIC_SUFFIXES = (
+    "sub metropolitan city",
+    "metropolitan city",
+    "rural municipality",
+    "sub metropolitan",
+    "metropolitan",
+    "municipality",
+    "city",
+    "उपमहानगरपालिका",
+    "महानगरपालिका",
+    "गाउँपालिका",
+    "नगरपालिका",
+)
+
+# (index file version, {key: record})
+_index_cache = (None, {})
+_index_lock = threading.Lock()
+
+
+def municipality_key(name: str) -> str:
+    """
+    Normalise a municipality name into its index key (also its shard directory name).
+    Letters, combining marks and digits of any script are kept ("काठमाडौं"
+    stays whole); everything else separates words.
+    """
+    name = unicodedata.normalize("NFC", (name or "").casefold())
+    words = " ".join("".join(c if unicodedata.category(c)[0] in "LMN" else " " for c in name).split())
+    for suffix in _GENERIC_SUFFIXES:
+        if words.endswith(" " + suffix):
+            words = words[: -len(suffix)].strip()
+            break
+    return words.replace(" ", "-") or "unknown"
+
+
+def migrate_legacy():
+    """
+    Split a legacy municipality.json into the index + per-municipality shards.
+    The legacy file is renamed to municipality.json.migrated afterwards.
+    """
+    legacy_path = file_handler.DATA_DIR/LEGACY_FILE
+    if not legacy_path.exists() or data_exists(INDEX_FILE):
+        return
+
+    with store_lock("municipalities"):
+        if legacy_path.exists() and not data_exists(INDEX_FILE):
+            _migrate_legacy(legacy_path)
+
+
+def _migrate_legacy(legacy_path):
+    index = []
+    for muni in load_json(LEGACY_FILE):
+        key = municipality_key(muni["municipality"])
+        record = {k: v for k, v in muni.items() if k != "activities"}
+        record["key"] = key
+        index.append(record)
+        activity_log.append(key, muni.get("activities", []))
+
+    save_json(INDEX_FILE, index)
+    legacy_path.rename(legacy_path.with_name(LEGACY_FILE + ".migrated"))
+
+
+def load_index() -> dict:
+    """
+    Return {key: municipality record}, reloaded only when index.json changes.
+    """
+    global _index_cache
+    migrate_legacy()
+
+    version = data_version(INDEX_FILE)
+    cached_version, index = _index_cache
+    if cached_version == version:
+        return index
+
+    with _index_lock:
+        index = {record["key"]: record for record in load_json(INDEX_FILE)}
+        _index_cache = (version, index)
+    return index
+
+
+def find_municipality(name: str):
+    """
+    Return the municipality record matching name, or None.
+    """
+    return load_index().get(municipality_key(name))
+
+
+def load_activities(key: str, since: str | None = None, until: str | None = None,
+                    include_archived: bool = False) -> list:
+    return activity_log.query(key, since, until, include_archived)
+
+
+def append_activities(key: str, activities: list):
+    """
+    Append activities to one municipality's shard; other shards are not touched.
+    """
+    activity_log.append(key, activities)
+
+
+def load_all(include_archived: bool = False) -> list:
+    """
+    Municipalities in the legacy shape (records with their activities embedded).
+    """
+    return [
+        {
+            **{k: v for k, v in record.items() if k != "key"},
+            "activities": load_activities(key, include_archived=include_archived)
+        }
+        for key, record in load_index().items()
+    ]
+
+
+def store_version():
+    """
+    Version stamp covering the index and every activity shard.
+    """
+    index = load_index()
+    return (data_version(INDEX_FILE),) + tuple(activity_log.version(key) for key in index)
+
+
+def reset_cache():
+    """Drop the in-memory index (e.g. after DATA_DIR changes in tests)."""
+    global _index_cache
+    with _index_lock:
+        _index_cache = (None, {})
@@ -0,0 +1,106 @@
+"""
+Sampling profiler for slow requests.
+
+Off unless HAMRO_SLOW_REQUEST_MS is set. While a request has been running
+longer than that threshold, a sampler thread records the stacks of the
+other threads every HAMRO_PROFILE_INTERVAL_MS. When the request finishes
+over the threshold, the sampled stacks are logged in collapsed form (one
+"frame;frame;frame count" line per stack, as flamegraph tools read it) and,
+with HAMRO_PROFILE_DIR set, written to a file there.
+
+Stacks of every busy thread are included, because a sync endpoint runs in
+a thread-pool thread the middleware cannot identify.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Innermost frames of threads that are just waiting for work
+_IDLE = {("threading.py", "wait"), ("selectors.py", "select"), ("queue.py", "get"), ("base_events.py", "_run_once")}
+
+
+def _collapse(frame) -> str | None:
+    if (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in _IDLE:
+        return None
+    names = []
+    while frame is not None:
+        names.append(f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class _Request:
+    __slots__ = ("label", "start", "samples")
+
+    def __init__(self, label: str):
+        self.label = label
+        self.start = time.perf_counter()
+        self.samples = Counter()
+
+
+class SlowRequestProfiler:
+
+    def __init__(self, threshold_ms: float, interval_ms: float = 5, out_dir: str | None = None):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+        self.out_dir = Path(out_dir) if out_dir else None
+        self._active = set()
+        self._lock = threading.Lock()
+        self._sampler = None
+
+    @classmethod
+    def from_env(cls):
+        threshold = os.environ.get("HAMRO_SLOW_REQUEST_MS")
+        if not threshold:
+            return None
+        return cls(float(threshold), float(os.environ.get("HAMRO_PROFILE_INTERVAL_MS", "5")),
+                   os.environ.get("HAMRO_PROFILE_DIR"))
+
+    def begin(self, label: str) -> _Request:
+        request = _Request(label)
+        with self._lock:
+            self._active.add(request)
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample, name="slow-request-sampler", daemon=True)
+                self._sampler.start()
+        return request
+
+    def end(self, request: _Request) -> float:
+        """
+        Stop sampling request; dump its stacks if it was slow. Returns its duration in seconds.
+        """
+        elapsed = time.perf_counter() - request.start
+        with self._lock:
+            self._active.discard(request)
+        if elapsed >= self.threshold:
+            self._dump(request, elapsed)
+        return elapsed
+
+    def _sample(self):
+        own = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            now = time.perf_counter()
+            with self._lock:
+                slow = [r for r in self._active if now - r.start >= self.threshold]
+            if not slow:
+                continue
+            stacks = [s for tid, frame in sys._current_frames().items() if tid != own and (s := _collapse(frame))]
+            for request in slow:
+                request.samples.update(stacks)
+
+    def _dump(self, request: _Request, elapsed: float):
+        lines = [f"{stack} {count}" for stack, count in request.samples.most_common()]
+        logger.warning("Slow request %s took %.1f ms (%d stack samples)\n%s",
+                       request.label, elapsed * 1000, sum(request.samples.values()), "\n".join(lines))
+        if self.out_dir is not None:
+            self.out_dir.mkdir(parents=True, exist_ok=True)
+            name = f"slow-{time.strftime('%Y%m%d-%H%M%S')}-{threading.get_ident()}-{id(request)}.folded"
+            (self.out_dir/name).write_text("\n".join(lines) + "\n", encoding="utf-8")
@@ -0,0 +1,139 @@
+"""
+In-memory token-bucket rate limiting and load shedding for write endpoints.
+
+Each limited route has a bucket per client (user id, or IP address for
+login and registration) holding up to `burst` tokens that refill at
+`burst / period` per second; a request takes one token or gets 429 with
+Retry-After. Limits are configured per route with HAMRO_RATE_LIMITS, e.g.
+
+    HAMRO_RATE_LIMITS="upvote=30/60,login=5/60"    (requests / seconds)
+
+and HAMRO_RATE_LIMIT=off disables limiting altogether.
+
+Buckets live in insertion-ordered dicts: a lookup moves the bucket to the
+end, so idle buckets collect at the front and are evicted from there in
+O(1) per bucket. Limits are per worker process.
+
+Separately, write endpoints shed load: while more than HAMRO_SHED_QUEUE_DEPTH
+background jobs are pending, new writes get 429 instead of adding to the backlog.
+"""
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from .metrics import Counter
+
+ENABLED = os.environ.get("HAMRO_RATE_LIMIT", "on") != "off"
+
+# route -> (requests, seconds)
+DEFAULT_LIMITS = {
+    "login": (10, 60),
+    "register": (5, 60),
+    "create_complaint": (10, 60),
+    "upvote": (60, 60),
+    "staff_write": (120, 60),
+}
+
+# Pending background jobs above which writes are refused (job queue capacity is 1000)
+SHED_QUEUE_DEPTH = int(os.environ.get("HAMRO_SHED_QUEUE_DEPTH", "800"))
+SHED_RETRY_AFTER = int(os.environ.get("HAMRO_SHED_RETRY_AFTER", "2"))
+
+# Buckets untouched this long are full again and can be dropped
+IDLE_SECONDS = float(os.environ.get("HAMRO_RATE_LIMIT_IDLE_SECONDS", "600"))
+MAX_BUCKETS = 100_000
+
+RATE_LIMITED = Counter(
+    "hamro_rate_limited_total", "Requests refused with 429, by limit and reason.", ("limit", "reason"))
+
+
+def parse_limits(spec: str) -> dict:
+    """
+    Parse "name=requests/seconds,..." into {name: (requests, seconds)}.
+    """
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition("=")
+        requests, _, seconds = value.partition("/")
+        limits[name.strip()] = (int(requests), float(seconds or 60))
+    return limits
+
+
+class TokenBucketLimiter:
+
+    def __init__(self, requests: int, seconds: float, idle_seconds: float = IDLE_SECONDS,
+                 max_buckets: int = MAX_BUCKETS):
+        self.burst = requests
+        self.rate = requests / seconds  # tokens per second
+        self.idle = max(idle_seconds, seconds)
+        self.max_buckets = max_buckets
+        self._buckets = OrderedDict()  # key -> [tokens, last refill]
+        self._lock = threading.Lock()
+
+    def acquire(self, key, now: float | None = None) -> float:
+        """
+        Take a token for key. Returns 0 on success, otherwise the seconds
+        until a token is available.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            bucket = self._buckets.pop(key, None)
+            self._evict(now)
+            if bucket is None:
+                bucket = [float(self.burst), now]
+            else:
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            self._buckets[key] = bucket
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+            return (1 - bucket[0]) / self.rate
+
+    def _evict(self, now: float):
+        """Drop buckets idle for longer than self.idle (oldest first); callers hold _lock."""
+        while self._buckets:
+            key, (_, last) = next(iter(self._buckets.items()))
+            if now - last < self.idle and len(self._buckets) < self.max_buckets:
+                return
+            del self._buckets[key]
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+def _configured_limits() -> dict:
+    return {**DEFAULT_LIMITS, **parse_limits(os.environ.get("HAMRO_RATE_LIMITS", ""))}
+
+
+limiters = {name: TokenBucketLimiter(*limit) for name, limit in _configured_limits().items()}
+
+
+def check(limit: str, key) -> int | None:
+    """
+    Seconds the client should wait (for Retry-After) if key is over limit, else None.
+    """
+    if not ENABLED:
+        return None
+    wait = limiters[limit].acquire(key)
+    if not wait:
+        return None
+    RATE_LIMITED.inc(limit=limit, reason="rate")
+    return max(1, math.ceil(wait))
+
+
+def check_load(limit: str, pending: int) -> int | None:
+    """
+    Retry-After seconds if the write backlog is too deep to accept another write, else None.
+    """
+    if not ENABLED or pending <= SHED_QUEUE_DEPTH:
+        return None
+    RATE_LIMITED.inc(limit=limit, reason="overload")
+    return SHED_RETRY_AFTER
+
+
+def reset():
+    """Forget every bucket (e.g. between tests)."""
+    global limiters
+    limiters = {name: TokenBucketLimiter(*limit) for name, limit in _configured_limits().items()}
@@ -0,0 +1,152 @@
+"""
+Compact in-memory records for complaints and activities.
+
+The stores keep thousands of these resident, so instead of one dict per
+record they use __slots__ classes with:
+- interned municipality / ward / status / action strings (one copy shared by all records),
+- timestamps as integer microseconds since the epoch,
+- upvoters as an array('q') of ints instead of a list of int objects.
+
+Records still support item access (record["status"], record.get("image_url"),
+record["status"] = "working") so route code reads the same as with dicts.
+The on-disk JSON format is unchanged: from_dict()/to_dict() convert at the
+load/save boundary.
+"""
+
+import sys
+from array import array
+from datetime import datetime, timedelta
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def pack_time(value):
+    """
+    ISO timestamp -> int microseconds. Strings that would not round-trip
+    exactly (dates, offsets, odd formats) are kept as-is.
+    """
+    if not isinstance(value, str):
+        return value
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return value
+    if parsed.tzinfo is not None or parsed.isoformat() != value:
+        return value
+    return (parsed - _EPOCH) // _MICROSECOND
+
+
+def unpack_time(value):
+    if isinstance(value, int):
+        return (_EPOCH + value * _MICROSECOND).isoformat()
+    return value
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class _Record:
+    """
+    Shared item-access helpers; subclasses define FIELDS, TIME_FIELDS and INTERNED.
+    """
+    __slots__ = ()
+    FIELDS = ()
+    TIME_FIELDS = frozenset()
+    INTERNED = frozenset()
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        record = cls.__new__(cls)
+        for field in cls.FIELDS:
+            record[field] = data.get(field)
+        extra = {k: v for k, v in data.items() if k not in cls.FIELDS}
+        object.__setattr__(record, "extra", extra or None)
+        return record
+
+    def to_dict(self) -> dict:
+        data = {field: self[field] for field in self.FIELDS}
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def copy(self):
+        """
+        Private copy for a writer to change; published records are never modified.
+        """
+        record = self.__class__.__new__(self.__class__)
+        for field in self.FIELDS:
+            object.__setattr__(record, field, getattr(self, field))
+        object.__setattr__(record, "extra", dict(self.extra) if self.extra else None)
+        return record
+
+    def __getitem__(self, field):
+        if field not in self.FIELDS:
+            if self.extra and field in self.extra:
+                return self.extra[field]
+            raise KeyError(field)
+        value = getattr(self, field)
+        if field in self.TIME_FIELDS:
+            return unpack_time(value)
+        return value
+
+    def __setitem__(self, field, value):
+        if field not in self.FIELDS:
+            if self.extra is None:
+                object.__setattr__(self, "extra", {})
+            self.extra[field] = value
+            return
+        if field in self.TIME_FIELDS:
+            value = pack_time(value)
+        elif field in self.INTERNED:
+            value = _intern(value)
+        object.__setattr__(self, field, value)
+
+    def __contains__(self, field):
+        return field in self.FIELDS or bool(self.extra and field in self.extra)
+
+    def get(self, field, default=None):
+        try:
+            return self[field]
+        except KeyError:
+            return default
+
+
+class ComplaintRecord(_Record):
+    FIELDS = (
+        "id", "title", "content", "author_id", "author_phone", "municipality", "ward",
+        "status", "created_at", "upvotes", "upvoted_by", "image_url", "completed_at",
+    )
+    TIME_FIELDS = frozenset({"created_at", "completed_at"})
+    INTERNED = frozenset({"municipality", "ward", "status"})
+    __slots__ = FIELDS + ("extra",)
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        record = super().from_dict(data)
+        object.__setattr__(record, "upvoted_by", array("q", data.get("upvoted_by") or ()))
+        return record
+
+    def to_dict(self) -> dict:
+        data = super().to_dict()
+        data["upvoted_by"] = self.upvoted_by.tolist()
+        return data
+
+    def copy(self):
+        record = super().copy()
+        object.__setattr__(record, "upvoted_by", array("q", self.upvoted_by))
+        return record
+
+
+class ActivityRecord(_Record):
+    FIELDS = ("id", "complaint_id", "title", "action", "statement", "timestamp", "by", "action_image")
+    TIME_FIELDS = frozenset({"timestamp"})
+    INTERNED = frozenset({"action"})
+    __slots__ = FIELDS + ("extra",)
+
+    def to_dict(self) -> dict:
+        data = super().to_dict()
+        if data["id"] is None:
+            del data["id"]  # activities from before ids were assigned
+        return data
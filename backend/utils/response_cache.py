@@ -0,0 +1,139 @@
+"""
+Pre-serialised response cache.
+
+Read endpoints that return the same data until the next write keep the
+encoded JSON bytes for the current data version here, together with
+pre-compressed variants. A cache hit skips validation, JSON encoding and
+compression entirely and just picks the variant the client accepts.
+"""
+
+import gzip
+import json
+import threading
+from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional compression
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional compression
+    zstandard = None
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+# Server preference when the client accepts several encodings equally
+ENCODING_PREFERENCE = ("br", "zstd", "gzip")
+
+
+def encode_json(data) -> bytes:
+    """
+    Encode data as compact UTF-8 JSON, using orjson when installed.
+    """
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def compress_variants(body: bytes) -> dict:
+    """
+    Return {content-encoding: bytes} for every available compressor.
+    The uncompressed body is always present under "identity".
+    """
+    variants = {"identity": body}
+    if len(body) < MIN_COMPRESS_SIZE:
+        return variants
+
+    variants["gzip"] = gzip.compress(body, compresslevel=6)
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=5)
+    if zstandard is not None:
+        variants["zstd"] = zstandard.ZstdCompressor(level=3).compress(body)
+    return variants
+
+
+def parse_accept_encoding(header: str | None) -> set:
+    """
+    Return the set of encodings the client accepts (q=0 entries excluded).
+    """
+    accepted = set()
+    if not header:
+        return accepted
+
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name)
+    return accepted
+
+
+def choose_encoding(variants: dict, accept_encoding: str | None) -> str:
+    accepted = parse_accept_encoding(accept_encoding)
+    for encoding in ENCODING_PREFERENCE:
+        if encoding in variants and (encoding in accepted or "*" in accepted):
+            return encoding
+    return "identity"
+
+
+class ResponseCache:
+    """
+    Holds the encoded response of one data version per cache key.
+    Older versions are dropped as soon as a newer one is built.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, version, build) -> dict:
+        """
+        Return the compressed variants for key at version.
+        build() is called to produce the data only on a miss.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        variants = compress_variants(encode_json(build()))
+        with self._lock:
+            self._entries[key] = (version, variants)
+        return variants
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+response_cache = ResponseCache()
+
+
+def cached_json_response(request, key: str, version, build) -> Response:
+    """
+    Serve the cached encoding of build() for version, negotiating
+    Content-Encoding against the request's Accept-Encoding header.
+    """
+    variants = response_cache.get(key, version, build)
+    encoding = choose_encoding(variants, request.headers.get("accept-encoding"))
+
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+
+    return Response(content=variants[encoding], media_type="application/json", headers=headers)
@@ -1,5 +1,7 @@
+import time
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
+from .metrics import TOKEN_VERIFY_SECONDS
 
 # Secret key (keep this safe!)
 SECRET_KEY = "your_secret_key_here"  
@@ -14,8 +16,11 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     return encoded_jwt
 
 def verify_token(token: str):
+    start = time.perf_counter()
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        TOKEN_VERIFY_SECONDS.observe(time.perf_counter() - start, result="ok")
         return payload  # returns decoded user data
     except JWTError:
+        TOKEN_VERIFY_SECONDS.observe(time.perf_counter() - start, result="invalid")
         return None
\ No newline at end of file
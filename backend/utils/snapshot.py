@@ -0,0 +1,158 @@
+"""
+Binary snapshot format for data files.
+
+A snapshot is a length-prefixed record layout that can be memory-mapped and
+decoded without parsing pretty-printed JSON text:
+
+    magic        8 bytes   b"HAWZSNP1"
+    codec        u8        0 = JSON (orjson when installed), 1 = msgpack
+    kind         u8        0 = list, 1 = dict
+    count        u32       number of records
+    offsets      u64 * (count + 1), relative to the start of the record area
+    records      encoded items; for dicts each record is a [key, value] pair
+
+Each record is encoded on its own, so SnapshotReader can decode a single
+record by index without touching the rest of the file.
+"""
+
+import gc
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+from .atomic import atomic_write
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional codec
+    msgpack = None
+
+MAGIC = b"HAWZSNP1"
+CODEC_JSON = 0
+CODEC_MSGPACK = 1
+KIND_LIST = 0
+KIND_DICT = 1
+
+_HEADER = struct.Struct("<8sBBI")
+
+
+def _default_codec() -> int:
+    return CODEC_MSGPACK if msgpack is not None else CODEC_JSON
+
+
+def _encoder(codec: int):
+    if codec == CODEC_MSGPACK:
+        return msgpack.packb
+    if orjson is not None:
+        return orjson.dumps
+    return lambda item: json.dumps(item, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _decoder(codec: int):
+    if codec == CODEC_MSGPACK:
+        if msgpack is None:
+            raise RuntimeError("Snapshot was written with msgpack, which is not installed")
+        return lambda buf: msgpack.unpackb(buf, strict_map_key=False)
+    if orjson is not None:
+        return orjson.loads
+    return lambda buf: json.loads(bytes(buf))
+
+
+def encode(data, codec: int | None = None) -> bytes:
+    """
+    Encode a top-level list or dict as snapshot bytes.
+    """
+    codec = _default_codec() if codec is None else codec
+    if isinstance(data, dict):
+        kind, items = KIND_DICT, [[k, v] for k, v in data.items()]
+    elif isinstance(data, list):
+        kind, items = KIND_LIST, data
+    else:
+        raise TypeError("Snapshots hold a top-level list or dict")
+
+    encode_item = _encoder(codec)
+    chunks = [encode_item(item) for item in items]
+
+    offsets = [0]
+    for chunk in chunks:
+        offsets.append(offsets[-1] + len(chunk))
+
+    header = _HEADER.pack(MAGIC, codec, kind, len(chunks))
+    table = struct.pack(f"<{len(offsets)}Q", *offsets)
+    return b"".join([header, table, *chunks])
+
+
+def write_snapshot(path: Path, data):
+    with atomic_write(path, "wb") as f:
+        f.write(encode(data))
+
+
+class SnapshotReader:
+    """
+    Memory-mapped view of a snapshot file with per-record random access.
+    """
+
+    def __init__(self, path: Path):
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        if len(self._map) < _HEADER.size:
+            self.close()
+            raise ValueError(f"{path} is not a snapshot")
+        magic, codec, self.kind, self.count = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a snapshot")
+
+        table_start = _HEADER.size
+        self._offsets = struct.unpack_from(f"<{self.count + 1}Q", self._map, table_start)
+        self._base = table_start + 8 * (self.count + 1)
+        self._decode = _decoder(codec)
+        self._view = memoryview(self._map)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index: int):
+        start = self._base + self._offsets[index]
+        end = self._base + self._offsets[index + 1]
+        return self._decode(self._view[start:end])
+
+    def load(self):
+        """Decode the whole snapshot back into a list or dict."""
+        # Decoding allocates many small acyclic containers; the cyclic GC
+        # passes this would trigger cost more than the decoding itself.
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            items = [self[i] for i in range(self.count)]
+        finally:
+            if gc_enabled:
+                gc.enable()
+        if self.kind == KIND_DICT:
+            return {key: value for key, value in items}
+        return items
+
+    def close(self):
+        if hasattr(self, "_view"):
+            self._view.release()
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_snapshot(path: Path):
+    with SnapshotReader(path) as reader:
+        return reader.load()
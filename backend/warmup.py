@@ -0,0 +1,110 @@
+"""
+Start-up warm-up.
+
+Without it the first requests a new worker serves pay the cold-load cost of
+every data file and index. The app's lifespan hook runs warm_up steps that
+load the stores and build their indexes, and /readyz reports 503 until they
+have all finished, so a rolling deploy only routes traffic to warm workers.
+
+HAMRO_WARMUP selects how:
+    background  (default) warm up in a thread; /healthz answers immediately
+    blocking    finish warming up before the server accepts connections
+    off         load everything lazily on first use
+"""
+
+import logging
+import os
+import threading
+import time
+from .jobs import jobs
+from .routes.complaints import UPLOAD_DIR
+from .routes.municipality import UPLOAD_FOLDER
+from .utils import auth_utils, complaint_store, complaint_timeline, municipality_store
+
+WARMUP_MODE = os.environ.get("HAMRO_WARMUP", "background")
+
+logger = logging.getLogger(__name__)
+
+
+def make_upload_dirs():
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+
+
+def load_municipalities():
+    """Municipality key index plus every recent activity segment."""
+    for key in municipality_store.load_index():
+        municipality_store.load_activities(key)
+
+
+def load_complaints():
+    """Every hot shard with its id index, the directory and the author index."""
+    for key in complaint_store.shard_keys():
+        complaint_store.shard(key)
+    complaint_store.load_authors()
+
+
+# (name, step) in the order they run
+STEPS = [
+    ("upload_dirs", make_upload_dirs),
+    ("users", auth_utils.preload),
+    ("municipalities", load_municipalities),
+    ("complaints", load_complaints),
+    ("timeline", complaint_timeline.preload),
+    ("jobs", jobs.start),
+]
+
+
+class WarmUp:
+    """
+    Runs STEPS once and records the state and duration of each.
+    """
+
+    def __init__(self, steps=STEPS):
+        self.steps = steps
+        self.started_at = None
+        self.finished_at = None
+        self._status = {name: {"state": "pending", "ms": None} for name, _ in steps}
+
+    @property
+    def ready(self) -> bool:
+        return all(status["state"] == "done" for status in self._status.values())
+
+    def run(self):
+        self.started_at = time.time()
+        for name, step in self.steps:
+            status = self._status[name]
+            status["state"] = "running"
+            began = time.perf_counter()
+            try:
+                step()
+            except Exception as e:
+                status.update(state="failed", error=repr(e), ms=round((time.perf_counter() - began) * 1000, 1))
+                logger.exception("Warm-up step %s failed", name)
+                break
+            status.update(state="done", ms=round((time.perf_counter() - began) * 1000, 1))
+            logger.info("Warm-up step %s took %.1f ms", name, status["ms"])
+        self.finished_at = time.time()
+
+    def start(self, mode: str | None = None):
+        mode = mode or WARMUP_MODE
+        if mode == "blocking":
+            self.run()
+            return
+        make_upload_dirs()  # static file serving needs them before the first request
+        if mode == "off":
+            for status in self._status.values():
+                status["state"] = "done"
+            return
+        threading.Thread(target=self.run, name="warm-up", daemon=True).start()
+
+    def report(self) -> dict:
+        if self.started_at is None:
+            elapsed = None
+        else:
+            elapsed = round(((self.finished_at or time.time()) - self.started_at) * 1000, 1)
+        return {
+            "ready": self.ready,
+            "elapsed_ms": elapsed,
+            "steps": [{"name": name, **self._status[name]} for name, _ in self.steps],
+        }
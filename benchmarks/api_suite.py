@@ -0,0 +1,238 @@
+"""
+End-to-end API benchmark against a generated data set, checked against baselines.
+
+Generates a data set (see benchmarks.datagen), points the real app at a copy
+of it and times each scenario through TestClient: login, listing a
+municipality's complaints, upvoting, creating a complaint with an image,
+reading a municipality's activities and updating a complaint's status.
+Reports throughput and p50/p99 latency per scenario (the best of --repeats
+runs, as timeit does, since a single p99 is mostly machine noise) and exits
+with status 1 when a scenario is slower than the stored baseline allows.
+
+Usage:
+    python -m benchmarks.api_suite [--scale 1k] [--iterations 200] [--repeats 3]
+    python -m benchmarks.api_suite --scale 100k --update-baselines
+
+Baselines are kept per scale in benchmarks/baselines.json; a scale without
+one fails the check. They depend on the machine, so record them on the
+machine (or CI runner class) that checks them.
+"""
+
+import argparse
+import itertools
+import json
+import random
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+from fastapi.testclient import TestClient
+from benchmarks import datagen
+
+BASELINES = Path(__file__).with_name("baselines.json")
+# A scenario regresses when it is this much slower than its baseline
+TOLERANCE = 0.5
+# Smallest valid PNG, for the create-with-image scenario
+PNG = bytes.fromhex("89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+                    "1f15c4890000000d4944415478da63f8ffff3f0005fe02fea7d6a4ee0000000049454e44ae426082")
+
+
+def _headers(user_id: int, phone: str, role: str) -> dict:
+    from backend.utils.security import create_access_token
+    token = create_access_token({"sub": phone, "role": role, "id": user_id}, timedelta(minutes=60))
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _percentile(samples: list, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+@contextmanager
+def _app_data(data_dir: Path):
+    """
+    Point the app's stores and upload folders at data_dir, restoring them afterwards.
+    """
+    from backend import warmup
+    from backend.routes import complaints, municipality
+    from backend.utils import (activity_log, analytics, auth_utils, complaint_archive, complaint_store,
+                               complaint_timeline, file_handler, generations, id_sequence, municipality_store,
+                               rate_limit)
+    from backend.utils.response_cache import response_cache
+
+    def reset():
+        response_cache.clear()
+        generations.reset()
+        id_sequence.reset_blocks()
+        for module in (municipality_store, complaint_store, complaint_archive, complaint_timeline,
+                       auth_utils, activity_log, analytics):
+            module.reset_cache()
+
+    saved = [(module, name, getattr(module, name)) for module, name in (
+        (file_handler, "DATA_DIR"), (complaints, "UPLOAD_DIR"), (municipality, "UPLOAD_FOLDER"),
+        (warmup, "UPLOAD_DIR"), (warmup, "UPLOAD_FOLDER"), (warmup, "WARMUP_MODE"),
+        (rate_limit, "ENABLED"))]
+    file_handler.DATA_DIR = data_dir
+    complaints.UPLOAD_DIR = warmup.UPLOAD_DIR = str(data_dir/"uploads"/"complaints")
+    municipality.UPLOAD_FOLDER = warmup.UPLOAD_FOLDER = str(data_dir/"uploads"/"municipality")
+    warmup.WARMUP_MODE = "blocking"  # time the scenarios, not the first loads
+    rate_limit.ENABLED = False  # each scenario repeats one client far past any limit
+    reset()
+    try:
+        yield
+    finally:
+        for module, name, value in saved:
+            setattr(module, name, value)
+        reset()
+
+
+def scenarios(counts: dict, requests: int = 0) -> dict:
+    """
+    name -> request(client, i) for iteration i; each request must return 200.
+    Tokens for the first requests upvotes are signed here, outside the timing.
+    """
+    rng = random.Random(datagen.SEED)
+    users = counts["users"]
+    citizen = _headers(1, "9700000001", "citizen")
+    staff = _headers(datagen.staff_id(users, 0), f"96{datagen.staff_id(users, 0):08d}", "staff")
+    busiest = datagen.municipality_name(0)
+    statuses = ["working", "completed", "open"]
+    # Voters outside the generated range never collide with stored upvotes
+    voters = itertools.count(10_000_000)
+    voter_headers = iter([_headers(voter, f"98{voter}", "citizen") for voter in itertools.islice(voters, requests)])
+
+    def login(client, i):
+        user_id = rng.randint(1, users)
+        return client.post("/auth/login", json={"phone": f"97{user_id:08d}", "password": datagen.PASSWORD})
+
+    def list_municipality(client, i):
+        return client.get("/complaints/", params={"municipality": busiest}, headers=citizen)
+
+    def upvote(client, i):
+        headers = next(voter_headers, None)
+        if headers is None:  # more requests than were prepared
+            voter = next(voters)
+            headers = _headers(voter, f"98{voter}", "citizen")
+        complaint_id = rng.randint(1, counts["complaints"])
+        return client.post(f"/complaints/{complaint_id}/upvote", headers=headers)
+
+    def create_with_image(client, i):
+        return client.post("/complaints/", data={"title": f"bench {i}", "content": "Pothole near the school."},
+                           files={"image": ("pothole.png", PNG, "image/png")}, headers=citizen)
+
+    def activities(client, i):
+        return client.get(f"/municipality/{busiest}/activities", headers=citizen)
+
+    def status_update(client, i):
+        complaint_id = rng.randint(1, counts["complaints"])
+        return client.post("/municipality/update-complaint-status", headers=staff,
+                           data={"complaint_id": complaint_id, "status": statuses[i % len(statuses)]})
+
+    return {
+        "login": login,
+        "list_municipality": list_municipality,
+        "upvote": upvote,
+        "create_with_image": create_with_image,
+        "activities": activities,
+        "status_update": status_update,
+    }
+
+
+def _timed(request, client, iterations: int) -> dict:
+    latencies = []
+    began = time.perf_counter()
+    for i in range(iterations):
+        start = time.perf_counter()
+        response = request(client, i)
+        latencies.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            raise RuntimeError(f"{response.request.url}: {response.status_code} {response.text}")
+    elapsed = time.perf_counter() - began
+    return {
+        "rps": round(iterations / elapsed, 1),
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+def run(data_dir: Path, counts: dict, iterations: int, repeats: int = 1) -> dict:
+    """
+    Time every scenario against the data set in data_dir, keeping the best
+    of repeats runs per metric. Returns
+    {"warmup_ms": ..., "scenarios": {name: {"rps", "p50_ms", "p99_ms"}}}.
+    """
+    from backend.main import create_app
+
+    with _app_data(Path(data_dir)):
+        app = create_app()
+        with TestClient(app) as client:
+            warmup_ms = app.state.warmup.report()["elapsed_ms"]
+            results = {}
+            for name, request in scenarios(counts, iterations * repeats).items():
+                runs = [_timed(request, client, iterations) for _ in range(repeats)]
+                results[name] = {
+                    "rps": max(r["rps"] for r in runs),
+                    "p50_ms": min(r["p50_ms"] for r in runs),
+                    "p99_ms": min(r["p99_ms"] for r in runs),
+                }
+    return {"warmup_ms": warmup_ms, "scenarios": results}
+
+
+def compare(results: dict, baseline: dict, tolerance: float = TOLERANCE) -> list:
+    """
+    Regressions of results against baseline (both name -> metrics), as messages.
+    """
+    regressions = []
+    for name, base in baseline.items():
+        current = results.get(name)
+        if current is None:
+            continue
+        for metric in ("p50_ms", "p99_ms"):
+            if current[metric] > base[metric] * (1 + tolerance):
+                regressions.append(f"{name}: {metric} {current[metric]} > baseline {base[metric]}")
+        if current["rps"] < base["rps"] / (1 + tolerance):
+            regressions.append(f"{name}: rps {current['rps']} < baseline {base['rps']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scale", choices=datagen.SCALES, default="1k")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--update-baselines", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)/"data"
+        began = time.perf_counter()
+        counts = datagen.generate(data_dir, datagen.SCALES[args.scale])
+        print(f"Generated {args.scale} data set in {time.perf_counter() - began:.1f}s")
+        report = run(data_dir, counts, args.iterations, args.repeats)
+
+    print(f"Warm-up: {report['warmup_ms']} ms")
+    print(f"{'scenario':<20} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for name, result in report["scenarios"].items():
+        print(f"{name:<20} {result['rps']:>9} {result['p50_ms']:>9} {result['p99_ms']:>9}")
+
+    baselines = json.loads(BASELINES.read_text(encoding="utf-8")) if BASELINES.exists() else {}
+    if args.update_baselines:
+        baselines[args.scale] = report["scenarios"]
+        BASELINES.write_text(json.dumps(baselines, indent=2) + "\n", encoding="utf-8")
+        print(f"Baselines for {args.scale} written to {BASELINES}")
+        return
+
+    if args.scale not in baselines:
+        # Passing without a baseline would let a regression through unnoticed
+        raise SystemExit(f"No baselines for {args.scale} in {BASELINES}; record them with --update-baselines")
+    regressions = compare(report["scenarios"], baselines[args.scale], args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Reproducible synthetic data sets in the legacy file layout.
+
+Writes users.json, complains.json and municipality.json into a data directory;
+the app splits them into its sharded layout on first access, exactly as it
+does for an old deployment. Data is skewed the way real traffic is: a few
+municipalities hold most complaints, upvotes follow a Pareto distribution and
+every municipality has a long activity history.
+
+Usage:
+    python -m benchmarks.datagen --scale 100k --out /tmp/hamro-100k
+"""
+
+import argparse
+import json
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Number of complaints per scale; users and activities grow with it
+SCALES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+
+MUNICIPALITY_COUNT = 20
+WARDS = 32
+STATUSES = ["open", "open", "open", "working", "completed"]
+PASSWORD = "pass1234"
+SEED = 2025
+END = datetime(2025, 9, 1)
+HISTORY_DAYS = 540
+# Mean days from creation to completion (exponentially distributed, like real resolution times)
+RESOLUTION_DAYS = 14
+
+
+def municipality_name(index: int) -> str:
+    return f"Municipality {index:02d}"
+
+
+def staff_id(users: int, index: int) -> int:
+    """Id of the staff member of municipality index (staff follow the citizens)."""
+    return users + 1 + index
+
+
+def sizes(complaints: int) -> dict:
+    return {
+        "complaints": complaints,
+        "users": max(100, complaints // 5),
+        "activities_per_municipality": max(50, complaints // MUNICIPALITY_COUNT),
+    }
+
+
+def _timestamp(rng: random.Random) -> str:
+    offset = rng.random() * HISTORY_DAYS * 86400
+    return (END - timedelta(seconds=offset)).isoformat()
+
+
+def _completed_at(rng: random.Random, created_at: str) -> str:
+    """A completion time a random delay after created_at, no later than END."""
+    delay = timedelta(days=rng.expovariate(1 / RESOLUTION_DAYS))
+    return min(datetime.fromisoformat(created_at) + delay, END).isoformat()
+
+
+def generate(data_dir: Path, complaints: int) -> dict:
+    """
+    Write a data set with complaints complaints into data_dir and return its sizes.
+    """
+    rng = random.Random(SEED)
+    counts = sizes(complaints)
+    data_dir = Path(data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+
+    # Zipf-like: municipality 0 gets the most complaints
+    weights = [1 / (i + 1) for i in range(MUNICIPALITY_COUNT)]
+
+    users = []
+    for user_id in range(1, counts["users"] + 1):
+        muni = rng.choices(range(MUNICIPALITY_COUNT), weights)[0]
+        users.append({
+            "id": user_id,
+            "name": f"Citizen {user_id}",
+            "phone": f"97{user_id:08d}",
+            "password": PASSWORD,
+            "role": "citizen",
+            "city": "Kathmandu",
+            "municipality": municipality_name(muni),
+            "ward": str(rng.randint(1, WARDS)),
+        })
+    for muni in range(MUNICIPALITY_COUNT):
+        user_id = staff_id(counts["users"], muni)
+        users.append({
+            "id": user_id,
+            "name": f"Staff {muni}",
+            "phone": f"96{user_id:08d}",
+            "password": PASSWORD,
+            "role": "staff",
+            "city": "Kathmandu",
+            "municipality": municipality_name(muni),
+            "ward": "1",
+        })
+
+    created = sorted(_timestamp(rng) for _ in range(complaints))
+    complaint_list = []
+    for complaint_id, created_at in enumerate(created, start=1):
+        author = rng.randint(1, counts["users"])
+        voters = rng.sample(range(1, counts["users"] + 1), k=min(int(rng.paretovariate(1.2)) - 1, 500, counts["users"]))
+        status = rng.choice(STATUSES)
+        complaint_list.append({
+            "id": complaint_id,
+            "title": f"Complaint {complaint_id}",
+            "content": "Garbage has not been collected in our ward for a week.",
+            "author_id": author,
+            "author_phone": f"97{author:08d}",
+            "municipality": municipality_name(rng.choices(range(MUNICIPALITY_COUNT), weights)[0]),
+            "ward": str(rng.randint(1, WARDS)),
+            "status": status,
+            "created_at": created_at,
+            "upvotes": len(voters),
+            "upvoted_by": voters,
+            "image_url": None,
+            "completed_at": _completed_at(rng, created_at) if status == "completed" else None,
+        })
+
+    municipalities = []
+    for muni in range(MUNICIPALITY_COUNT):
+        activities = []
+        for _ in range(counts["activities_per_municipality"]):
+            complaint = complaint_list[rng.randrange(complaints)] if rng.random() < 0.7 else None
+            activities.append({
+                "complaint_id": complaint["id"] if complaint else None,
+                "title": complaint["title"] if complaint else "Ward clean-up drive",
+                "action": f"Marked as {rng.choice(STATUSES)}" if complaint else "working",
+                "statement": "A team has been sent to the area.",
+                "timestamp": _timestamp(rng),
+                "by": staff_id(counts["users"], muni),
+                "action_image": None,
+            })
+        activities.sort(key=lambda a: a["timestamp"])
+        municipalities.append({
+            "id": 100 + muni,
+            "name": municipality_name(muni),
+            "city": "Kathmandu",
+            "municipality": municipality_name(muni),
+            "activities": activities,
+        })
+
+    for name, data in (("users.json", users), ("complains.json", complaint_list), ("municipality.json", municipalities)):
+        with open(data_dir/name, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scale", choices=SCALES, default="1k")
+    parser.add_argument("--out", type=Path, required=True)
+    args = parser.parse_args()
+
+    counts = generate(args.out, SCALES[args.scale])
+    print(f"Wrote {counts['complaints']:,} complaints, {counts['users']:,} citizens and "
+          f"{counts['activities_per_municipality'] * MUNICIPALITY_COUNT:,} activities to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Memory footprint of resident complaints: plain dicts vs ComplaintRecord.
+
+Usage:
+    python -m benchmarks.memory_footprint [--count 100000]
+
+Records are decoded from JSON first so strings are not accidentally shared
+the way literals in a generator would be, matching what load_json produces.
+"""
+
+import argparse
+import gc
+import json
+import random
+import tracemalloc
+from datetime import datetime, timedelta
+from backend.utils.records import ActivityRecord, ComplaintRecord
+
+MUNICIPALITIES = ["Kathmandu Metropolitan", "Lalitpur Metropolitan", "Bhaktapur Municipality", "baneshwor"]
+STATUSES = ["open", "working", "completed"]
+
+
+def synthetic_complaints(count: int) -> bytes:
+    rng = random.Random(42)
+    start = datetime(2025, 1, 1)
+    complaints = []
+    for i in range(1, count + 1):
+        voters = rng.sample(range(1, 50_000), k=min(int(rng.paretovariate(1.5)), 200))
+        complaints.append({
+            "id": i,
+            "title": f"complaint {i}",
+            "content": "garbage has not been collected for a week",
+            "author_id": rng.randint(1, 50_000),
+            "author_phone": f"98{rng.randint(10_000_000, 99_999_999)}",
+            "municipality": rng.choice(MUNICIPALITIES),
+            "ward": str(rng.randint(1, 32)),
+            "status": rng.choice(STATUSES),
+            "created_at": (start + timedelta(seconds=i * 37, microseconds=rng.randint(1, 999_999))).isoformat(),
+            "upvotes": len(voters),
+            "upvoted_by": voters,
+            "image_url": None,
+        })
+    return json.dumps(complaints).encode()
+
+
+def synthetic_activities(count: int) -> bytes:
+    rng = random.Random(7)
+    start = datetime(2025, 1, 1)
+    activities = [
+        {
+            "complaint_id": rng.randint(1, count),
+            "title": f"complaint {i}",
+            "action": f"Marked as {rng.choice(STATUSES)}",
+            "statement": "team dispatched",
+            "timestamp": (start + timedelta(seconds=i * 53, microseconds=rng.randint(1, 999_999))).isoformat(),
+            "by": rng.choice([700, 800, 802]),
+            "action_image": None,
+        }
+        for i in range(count)
+    ]
+    return json.dumps(activities).encode()
+
+
+def measure(build) -> int:
+    gc.collect()
+    tracemalloc.start()
+    data = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del data
+    return size
+
+
+def report(name: str, payload: bytes, record_cls, count: int):
+    as_dicts = measure(lambda: json.loads(payload))
+    as_records = measure(lambda: [record_cls.from_dict(d) for d in json.loads(payload)])
+    print(f"{name} x {count:,}")
+    print(f"  dicts:   {as_dicts / 2**20:8.1f} MiB  ({as_dicts / count:6.0f} B/record)")
+    print(f"  records: {as_records / 2**20:8.1f} MiB  ({as_records / count:6.0f} B/record)")
+    print(f"  saving:  {100 * (1 - as_records / as_dicts):.0f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=100_000)
+    args = parser.parse_args()
+
+    report("complaints", synthetic_complaints(args.count), ComplaintRecord, args.count)
+    report("activities", synthetic_activities(args.count), ActivityRecord, args.count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Lost-update check with several worker processes sharing one data directory.
+
+Each process runs its own copy of the app (as uvicorn workers do) and, at
+the same time as the others, creates complaints, upvotes one complaint and
+posts municipality actions. Afterwards every write must be on disk.
+
+Usage:
+    python -m benchmarks.multiprocess_load [--workers 4] [--ops 50]
+
+The data directory is a copy of backend/data, so the real data is not touched.
+"""
+
+import argparse
+import multiprocessing
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+UPVOTED_COMPLAINT = 1
+CITIZEN = {"user_id": 801, "phone": "9841289518421", "role": "citizen"}
+STAFF = {"user_id": 800, "phone": "982142673123", "role": "staff"}
+STAFF_MUNICIPALITY = "baneshwor"
+
+
+def _headers(user_id: int, phone: str, role: str) -> dict:
+    from backend.utils.security import create_access_token
+    token = create_access_token({"sub": phone, "role": role, "id": user_id}, timedelta(minutes=30))
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _worker(data_dir: str, worker: int, ops: int, start):
+    from fastapi.testclient import TestClient
+    from backend.main import app
+    from backend.jobs import jobs
+    from backend.utils import file_handler, rate_limit
+
+    file_handler.DATA_DIR = Path(data_dir)
+    rate_limit.ENABLED = False  # every op comes from the same two users
+    client = TestClient(app)
+    citizen = _headers(**CITIZEN)
+    staff = _headers(**STAFF)
+
+    start.wait()
+    for op in range(ops):
+        voter = 1_000_000 + worker * ops + op
+        tag = f"load-{worker}-{op}"
+        responses = [
+            client.post(f"/complaints/{UPVOTED_COMPLAINT}/upvote", headers=_headers(voter, f"98{voter}", "citizen")),
+            client.post("/complaints/", data={"title": tag, "content": tag}, headers=citizen),
+            client.post("/municipality/post-action", data={"title": tag, "action": "load test"}, headers=staff),
+        ]
+        for response in responses:
+            if response.status_code != 200:
+                raise RuntimeError(f"{response.request.url}: {response.status_code} {response.text}")
+    # Let post-commit jobs (activity appends) finish, as a clean shutdown does
+    jobs.stop(timeout=60)
+
+
+def _counts(data_dir: Path) -> dict:
+    from backend.utils import complaint_store, file_handler, municipality_store
+
+    file_handler.DATA_DIR = data_dir
+    complaint_store.reset_cache()
+    municipality_store.reset_cache()
+    complaints = complaint_store.load_all()
+    return {
+        "upvoters": set(complaint_store.get(UPVOTED_COMPLAINT)["upvoted_by"]),
+        "complaints": [c for c in complaints if c["title"].startswith("load-")],
+        "ids": [c["id"] for c in complaints],
+        "actions": [a for a in municipality_store.load_activities(STAFF_MUNICIPALITY) if a["action"] == "load test"],
+    }
+
+
+def run(data_dir: Path, workers: int, ops: int) -> dict:
+    """
+    Run workers processes against data_dir and return what was lost.
+    Every value in the result is 0 when no update was lost.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    start = ctx.Event()
+    processes = [ctx.Process(target=_worker, args=(str(data_dir), w, ops, start)) for w in range(workers)]
+    for process in processes:
+        process.start()
+
+    began = time.perf_counter()
+    start.set()
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - began
+
+    failed = [p.exitcode for p in processes if p.exitcode != 0]
+    counts = _counts(data_dir)
+    expected = workers * ops
+    expected_voters = {1_000_000 + i for i in range(expected)}
+    return {
+        "failed_workers": len(failed),
+        "lost_upvotes": len(expected_voters - counts["upvoters"]),
+        "lost_complaints": expected - len(counts["complaints"]),
+        "duplicate_ids": len(counts["ids"]) - len(set(counts["ids"])),
+        "lost_actions": expected - len(counts["actions"]),
+        "seconds": elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--ops", type=int, default=50)
+    args = parser.parse_args()
+
+    from backend.utils import file_handler
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)/"data"
+        shutil.copytree(file_handler.DATA_DIR, data_dir)
+        result = run(data_dir, args.workers, args.ops)
+
+    writes = args.workers * args.ops * 3
+    print(f"{args.workers} workers x {args.ops} ops: {writes} writes in {result.pop('seconds'):.2f}s")
+    for name, value in result.items():
+        print(f"  {name:<16} {value}")
+    if any(result.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Load/save timings of the pretty-printed JSON data files vs binary snapshots.
+
+Usage:
+    python -m benchmarks.snapshot_formats [--count 100000]
+"""
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+from backend.utils.snapshot import read_snapshot, write_snapshot, SnapshotReader
+from benchmarks.memory_footprint import synthetic_complaints
+
+
+def timed(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def save_pretty_json(path: Path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4, ensure_ascii=False)
+
+
+def load_pretty_json(path: Path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def random_access(path: Path, index: int):
+    with SnapshotReader(path) as reader:
+        return reader[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=100_000)
+    args = parser.parse_args()
+
+    data = json.loads(synthetic_complaints(args.count))
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = Path(tmp)/"complaints.json"
+        snap_path = Path(tmp)/"complaints.json.snap"
+
+        rows = [
+            ("save", timed(lambda: save_pretty_json(json_path, data)), timed(lambda: write_snapshot(snap_path, data))),
+            ("load", timed(lambda: load_pretty_json(json_path)), timed(lambda: read_snapshot(snap_path))),
+            ("read 1 record", timed(lambda: load_pretty_json(json_path)[-1]), timed(lambda: random_access(snap_path, args.count - 1))),
+        ]
+        sizes = (json_path.stat().st_size, snap_path.stat().st_size)
+
+    print(f"{args.count:,} complaints   json (indent=4)   snapshot")
+    for name, json_time, snap_time in rows:
+        print(f"  {name:<14} {json_time * 1000:12.1f} ms {snap_time * 1000:10.1f} ms")
+    print(f"  {'size':<14} {sizes[0] / 2**20:12.1f} MB {sizes[1] / 2**20:10.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
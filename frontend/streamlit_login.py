@@ -1,6 +1,8 @@
 import streamlit as st
 import requests
 import json
+import hashlib
+import uuid
 from datetime import datetime
 import time
 
@@ -21,12 +23,29 @@ def get_headers():
         return {"Authorization": f"Bearer {st.session_state.token}"}
     return {}
 
-def make_request(method, endpoint, data=None, files=None, headers=None):
+def submission_key(form, data, files=None):
+    """
+    Idempotency key for a form submission. It stays the same until the
+    submission succeeds, so re-submitting after a slow or failed response
+    is not applied twice; edited content gets a new key.
+    """
+    nonce = st.session_state.setdefault(f"submission_{form}", uuid.uuid4().hex)
+    image = files["image"].name if files else None
+    content = hashlib.sha256(json.dumps([data, image], sort_keys=True, default=str).encode()).hexdigest()[:16]
+    return f"{nonce}-{content}"
+
+def submission_done(form):
+    """Start a fresh idempotency key for the next submission of form"""
+    st.session_state.pop(f"submission_{form}", None)
+
+def make_request(method, endpoint, data=None, files=None, headers=None, idempotency_key=None):
     """Make API request with error handling"""
     try:
         url = f"{API_BASE_URL}{endpoint}"
         if headers is None:
             headers = get_headers()
+        if idempotency_key:
+            headers = {**headers, "Idempotency-Key": idempotency_key}
         
         if method == "GET":
             response = requests.get(url, headers=headers)
@@ -68,13 +87,6 @@ def register_user(user_data):
     """Register new user"""
     return make_request("POST", "/auth/register", user_data, headers={})
 
-def get_next_user_id():
-    """Get next available user ID"""
-    success, users = make_request("GET", "/auth/users")
-    if success and users:
-        return max(user['id'] for user in users) + 1
-    return 1001
-
 # Page configuration
 st.set_page_config(
     page_title="Hamro Aawaz - Complaint Box",
@@ -157,7 +169,6 @@ if not st.session_state.logged_in:
             if submit:
                 if all([name, phone, password, city, municipality, ward]):
                     user_data = {
-                        "id": get_next_user_id(),
                         "name": name,
                         "phone": phone,
                         "password": password,
@@ -207,8 +218,10 @@ else:
                         data = {"title": title, "content": content}
                         files = {"image": image} if image else None
                         
-                        success, result = make_request("POST", "/complaints/", data, files)
+                        success, result = make_request("POST", "/complaints/", data, files,
+                                                       idempotency_key=submission_key("complaint", data, files))
                         if success:
+                            submission_done("complaint")
                             st.success("Complaint submitted successfully!")
                             st.rerun()
                         else:
@@ -285,8 +298,11 @@ else:
                                     }
                                     files = {"image": action_image} if action_image else None
                                     
-                                    success, result = make_request("POST", "/municipality/update-complaint-status", data, files)
+                                    form = f"status_{complaint['id']}"
+                                    success, result = make_request("POST", "/municipality/update-complaint-status", data, files,
+                                                                   idempotency_key=submission_key(form, data, files))
                                     if success:
+                                        submission_done(form)
                                         st.success("Status updated!")
                                         st.rerun()
                                     else:
@@ -319,8 +335,10 @@ else:
                             }
                             files = {"image": post_image} if post_image else None
         
-                            success, result = make_request("POST", "/municipality/post-action", data, files)
+                            success, result = make_request("POST", "/municipality/post-action", data, files,
+                                                           idempotency_key=submission_key("post_action", data, files))
                             if success:
+                                submission_done("post_action")
                                 st.success("Municipality post created successfully!")
                                 st.rerun()
                             else:
@@ -380,6 +398,7 @@ else:
             success, user_details = make_request("GET", "/auth/me")
             if success:
                 user_info = user_details['current_user']
+                current_user_details = user_details.get('profile', {})
                 
                 col1, col2 = st.columns(2)
                 with col1:
@@ -387,26 +406,19 @@ else:
                     st.markdown(f"**Role:** {user_info.get('role', 'N/A').title()}")
                     st.markdown(f"**User ID:** {user_info.get('id', 'N/A')}")
                 
-                # Get full user details from users endpoint
-                success, all_users = make_request("GET", "/auth/users")
-                if success:
-                    current_user_details = next((u for u in all_users if u['id'] == user_info['id']), None)
-                    if current_user_details:
-                        with col2:
-                            st.markdown(f"**Name:** {current_user_details.get('name', 'N/A')}")
-                            st.markdown(f"**City:** {current_user_details.get('city', 'N/A')}")
-                            st.markdown(f"**Municipality:** {current_user_details.get('municipality', 'N/A')}")
-                            st.markdown(f"**Ward:** {current_user_details.get('ward', 'N/A')}")
+                with col2:
+                    st.markdown(f"**Name:** {current_user_details.get('name', 'N/A')}")
+                    st.markdown(f"**City:** {current_user_details.get('city', 'N/A')}")
+                    st.markdown(f"**Municipality:** {current_user_details.get('municipality', 'N/A')}")
+                    st.markdown(f"**Ward:** {current_user_details.get('ward', 'N/A')}")
         
         st.markdown("---")
         
         # User's complaints
         st.subheader("My Complaints")
-        success, all_complaints = make_request("GET", "/complaints/")
+        success, user_complaints = make_request("GET", "/complaints/mine")
         
-        if success and all_complaints:
-            user_complaints = [c for c in all_complaints if c['author_id'] == st.session_state.user['id']]
-            
+        if success:
             if user_complaints:
                 for complaint in user_complaints:
                     st.markdown(f"""
@@ -0,0 +1,61 @@
+"""
+Shared fixtures: run the app against a throwaway copy of backend/data.
+"""
+import shutil
+from datetime import timedelta
+import pytest
+from fastapi.testclient import TestClient
+from backend.main import app
+from backend.utils import (
+    activity_log, analytics, auth_utils, complaint_archive, complaint_store, complaint_timeline,
+    file_handler, generations, id_sequence, municipality_store, rate_limit,
+)
+from backend.utils.idempotency import idempotency_cache
+from backend.utils.job_queue import jobs
+from backend.utils.response_cache import response_cache
+from backend.utils.security import create_access_token
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Copy the sample data into a temp dir and point the app at it."""
+    target = tmp_path / "data"
+    shutil.copytree(file_handler.DATA_DIR, target)
+    monkeypatch.setattr(file_handler, "DATA_DIR", target)
+    # Run post-commit jobs inline so tests can read their effects right away
+    monkeypatch.setattr(jobs, "workers", 0)
+    response_cache.clear()
+    idempotency_cache.clear()
+    generations.reset()
+    id_sequence.reset_blocks()
+    municipality_store.reset_cache()
+    complaint_store.reset_cache()
+    complaint_archive.reset_cache()
+    complaint_timeline.reset_cache()
+    auth_utils.reset_cache()
+    activity_log.reset_cache()
+    analytics.reset_cache()
+    rate_limit.reset()
+    yield target
+    response_cache.clear()
+    idempotency_cache.clear()
+    generations.reset()
+    id_sequence.reset_blocks()
+    municipality_store.reset_cache()
+    complaint_store.reset_cache()
+    complaint_archive.reset_cache()
+    complaint_timeline.reset_cache()
+    auth_utils.reset_cache()
+    activity_log.reset_cache()
+    analytics.reset_cache()
+    rate_limit.reset()
+
+
+@pytest.fixture
+def client(data_dir):
+    return TestClient(app)
+
+
+def auth_headers(user_id: int, phone: str, role: str = "citizen") -> dict:
+    token = create_access_token({"sub": phone, "role": role, "id": user_id}, timedelta(minutes=5))
+    return {"Authorization": f"Bearer {token}"}
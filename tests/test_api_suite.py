@@ -0,0 +1,33 @@
+"""
+Smoke test for the benchmark suite: a tiny generated data set through every scenario.
+"""
+import json
+from benchmarks import api_suite, datagen
+
+
+def test_datagen_is_reproducible(tmp_path):
+    datagen.generate(tmp_path/"a", 200)
+    datagen.generate(tmp_path/"b", 200)
+    for name in ("users.json", "complains.json", "municipality.json"):
+        assert (tmp_path/"a"/name).read_bytes() == (tmp_path/"b"/name).read_bytes()
+
+    complaints = json.loads((tmp_path/"a"/"complains.json").read_text(encoding="utf-8"))
+    assert len(complaints) == 200
+    assert all(c["upvotes"] == len(c["upvoted_by"]) for c in complaints)
+    completed = [c for c in complaints if c["status"] == "completed"]
+    assert completed and all(c["created_at"] <= c["completed_at"] for c in completed)
+    assert any(c["completed_at"] > c["created_at"] for c in completed)
+
+
+def test_suite_runs_every_scenario(tmp_path):
+    counts = datagen.generate(tmp_path/"data", 200)
+    report = api_suite.run(tmp_path/"data", counts, iterations=3)
+
+    assert set(report["scenarios"]) == set(api_suite.scenarios(counts))
+    for result in report["scenarios"].values():
+        assert result["rps"] > 0 and result["p99_ms"] >= result["p50_ms"]
+    assert list((tmp_path/"data"/"uploads"/"complaints").iterdir())
+
+    baseline = {name: {**result, "p99_ms": result["p99_ms"] / 10} for name, result in report["scenarios"].items()}
+    assert not api_suite.compare(report["scenarios"], report["scenarios"])
+    assert len(api_suite.compare(report["scenarios"], baseline)) == len(baseline)
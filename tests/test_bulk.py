@@ -0,0 +1,114 @@
+import json
+import pytest
+from conftest import auth_headers
+from backend import cli
+from backend.utils import auth_utils, complaint_store
+
+ADMIN = auth_headers(1, "9800000000", role="admin")
+
+
+def _ndjson(records) -> bytes:
+    return "".join(json.dumps(r) + "\n" for r in records).encode("utf-8")
+
+
+def _complaint(title: str, **fields) -> dict:
+    return {"title": title, "content": "Imported", "author_id": 801, "author_phone": "9841289518421",
+            "municipality": "baneshwor Municipality", "ward": "4", **fields}
+
+
+def test_complaint_import_assigns_ids_in_one_write(client, data_dir):
+    records = [_complaint(f"legacy {i}") for i in range(3)]
+    records.append(_complaint("done", status="completed", upvoted_by=[5, 6]))
+    response = client.post("/admin/import/complaints", content=_ndjson(records), headers=ADMIN)
+    assert response.status_code == 200
+    report = response.json()
+    assert report["imported"] == 4 and report["ids"] == [4, 7]
+
+    titles = [c["title"] for c in complaint_store.load_municipality("baneshwor")[-4:]]
+    assert titles == ["legacy 0", "legacy 1", "legacy 2", "done"]
+    assert complaint_store.get(7)["upvotes"] == 2
+    assert complaint_store.complaint_ids_by_author(801)[-4:] == [4, 5, 6, 7]
+
+    lines = client.get("/admin/export/complaints", headers=ADMIN).text.splitlines()
+    assert [json.loads(line)["id"] for line in lines] == list(range(1, 8))
+
+
+def test_invalid_lines_abort_the_import(client):
+    body = _ndjson([_complaint("ok")]) + b"not json\n" + _ndjson([{"title": "no author"}])
+    response = client.post("/admin/import/complaints", content=body, headers=ADMIN)
+    assert response.status_code == 422
+    assert [e["line"] for e in response.json()["detail"]["errors"]] == [2, 3]
+    assert complaint_store.max_id() == 3
+
+    response = client.post("/admin/import/complaints", params={"skip_invalid": True}, content=body, headers=ADMIN)
+    assert response.json()["imported"] == 1 and response.json()["invalid"] == 2
+
+    assert client.post("/admin/import/complaints", content=body, headers=auth_headers(801, "9841289518421")).status_code == 403
+
+
+def test_unknown_authors_are_rejected(client):
+    body = _ndjson([_complaint("ok"), _complaint("ghost", author_id=424242)])
+    response = client.post("/admin/import/complaints", content=body, headers=ADMIN)
+    assert response.status_code == 422
+    assert response.json()["detail"]["errors"] == [{"line": 2, "error": "author_id: no user with id 424242"}]
+    assert complaint_store.max_id() == 3
+
+
+def test_import_is_written_in_chunks(client, monkeypatch):
+    from backend import bulk
+    monkeypatch.setattr(bulk, "COMMIT_SIZE", 2)
+    writes = []
+    add_many = complaint_store.add_many
+    monkeypatch.setattr(complaint_store, "add_many", lambda chunk: (writes.append(len(chunk)), add_many(chunk)))
+
+    body = _ndjson([_complaint(f"chunked {i}") for i in range(5)])
+    response = client.post("/admin/import/complaints", content=body, headers=ADMIN)
+    assert response.json()["imported"] == 5 and response.json()["ids"] == [4, 8]
+    assert writes == [2, 2, 1]
+    assert [complaint_store.get(i)["title"] for i in range(4, 9)] == [f"chunked {i}" for i in range(5)]
+
+
+def test_complaint_timestamps_must_be_iso(client):
+    body = _ndjson([_complaint("old", created_at="05/01/2023"),
+                    _complaint("dated", created_at="2023-05-01", status="completed",
+                               completed_at="2023-05-03T06:00:00+00:00")])
+    response = client.post("/admin/import/complaints", content=body, headers=ADMIN)
+    assert response.status_code == 422
+    [error] = response.json()["detail"]["errors"]
+    assert error["line"] == 1 and error["error"].startswith("created_at")
+
+    response = client.post("/admin/import/complaints", params={"skip_invalid": True}, content=body, headers=ADMIN)
+    assert response.json()["imported"] == 1
+    dated = complaint_store.get(response.json()["ids"][0])
+    assert dated["created_at"] == "2023-05-01T00:00:00"
+    assert client.get("/analytics/baneshwor/wards", headers=ADMIN).status_code == 200
+
+
+def test_user_import_and_export_via_cli(data_dir, tmp_path, capsys):
+    source = tmp_path/"users.ndjson"
+    source.write_bytes(_ndjson([
+        {"name": f"Citizen {i}", "phone": f"98000000{i:02d}", "password": "pass1234", "role": "citizen",
+         "city": "Kathmandu", "municipality": "baneshwor Municipality", "ward": "4"}
+        for i in range(5)
+    ]))
+    cli.main(["import-ndjson", "users", str(source)])
+    assert auth_utils.authenticate_user("9800000003", "pass1234")["name"] == "Citizen 3"
+
+    # Importing the same phones again is refused as a whole
+    with pytest.raises(SystemExit, match="nothing imported"):
+        cli.main(["import-ndjson", "users", str(source)])
+    assert "line 1: phone: already registered: 9800000000" in capsys.readouterr().err
+
+    out = tmp_path/"export.ndjson"
+    cli.main(["export-ndjson", "users", "--out", str(out)])
+    exported = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+    assert len(exported) == len(auth_utils.get_all_users())
+    assert all("password" not in user for user in exported)
+
+
+def test_user_list_is_for_admins_and_hides_passwords(client):
+    assert client.get("/auth/users").status_code == 403  # no token
+    assert client.get("/auth/users", headers=auth_headers(801, "9841289518421")).status_code == 403
+
+    users = client.get("/auth/users", headers=ADMIN).json()
+    assert users and all("password" not in user for user in users)
@@ -0,0 +1,144 @@
+"""
+Tests for the complaints endpoints and their sharded store.
+"""
+import json
+import shutil
+import threading
+from conftest import auth_headers
+from backend.utils import complaint_timeline
+
+KATHMANDU_CITIZEN = auth_headers(20, "9841999999")
+BANESHWOR_CITIZEN = auth_headers(801, "9841289518421")
+
+
+def test_create_and_upvote_touch_only_own_municipality_shard(client, data_dir):
+    baneshwor = data_dir / "complaints" / "baneshwor.json"
+    before = baneshwor.stat().st_mtime_ns
+
+    created = client.post("/complaints/", data={"title": "pothole", "content": "deep"}, headers=KATHMANDU_CITIZEN)
+    assert created.status_code == 200
+    complaint_id = created.json()["id"]
+
+    assert client.post(f"/complaints/{complaint_id}/upvote", headers=BANESHWOR_CITIZEN).status_code == 200
+    assert baneshwor.stat().st_mtime_ns == before
+
+    shard = json.loads((data_dir / "complaints" / "kathmandu.json").read_text())
+    assert shard[-1]["upvoted_by"] == [801]
+    directory = json.loads((data_dir / "complaints" / "directory.json").read_text())
+    assert directory[str(complaint_id)] == "kathmandu"
+
+
+def test_list_merges_shards_in_id_order_and_filters_by_municipality(client):
+    client.post("/complaints/", data={"title": "pothole", "content": "deep"}, headers=KATHMANDU_CITIZEN)
+
+    everything = client.get("/complaints/", headers=BANESHWOR_CITIZEN).json()
+    ids = [c["id"] for c in everything]
+    assert ids == sorted(ids)
+    assert {c["municipality"] for c in everything} == {"baneshwor", "Kathmandu Metropolitan"}
+
+    scoped = client.get("/complaints/?municipality=Kathmandu", headers=BANESHWOR_CITIZEN).json()
+    assert [c["title"] for c in scoped] == ["pothole"]
+
+
+def test_completed_complaints_move_to_archive_tier(client, data_dir):
+    from backend.utils import complaint_archive
+
+    staff = auth_headers(800, "982142673123", role="staff")
+    client.post("/municipality/update-complaint-status", data={"complaint_id": 2, "status": "completed"}, headers=staff)
+
+    assert complaint_archive.archive_completed(days=-1) == 1
+    assert (data_dir / "complaints" / "archive" / "baneshwor.json.gz").exists()
+
+    hot = [c["id"] for c in client.get("/complaints/", headers=BANESHWOR_CITIZEN).json()]
+    everything = [c["id"] for c in client.get("/complaints/?include_archived=true", headers=BANESHWOR_CITIZEN).json()]
+    assert 2 not in hot
+    assert everything == sorted(hot + [2])
+
+    archived = client.get("/complaints/2", headers=BANESHWOR_CITIZEN).json()
+    assert archived["status"] == "completed" and archived["completed_at"]
+    assert client.post("/complaints/2/upvote", headers=BANESHWOR_CITIZEN).status_code == 404
+
+
+def test_reopen_during_archiving_waits_for_the_shard_to_be_archived(client, data_dir, monkeypatch):
+    from backend.utils import complaint_archive, complaint_store
+
+    staff = auth_headers(800, "982142673123", role="staff")
+    client.post("/municipality/update-complaint-status", data={"complaint_id": 2, "status": "completed"}, headers=staff)
+
+    reopened, reopening = [], []
+    bump_version = complaint_archive.bump_version
+
+    def reopen_while_archiving(filename):
+        bump_version(filename)
+        reopen = threading.Thread(target=lambda: reopened.append(
+            complaint_store.update(2, lambda c: c.__setitem__("status", "working"))))
+        reopen.start()
+        reopen.join(0.2)
+        assert reopen.is_alive()  # blocked until the shard is trimmed
+        reopening.append(reopen)
+
+    monkeypatch.setattr(complaint_archive, "bump_version", reopen_while_archiving)
+    assert complaint_archive.archive_completed(days=-1) == 1
+    reopening[0].join(5)
+    assert reopened == [None] and complaint_archive.find(2)["status"] == "completed"
+
+
+def test_unknown_municipality_filter_is_not_cached(client):
+    from backend.utils import complaint_store
+    from backend.utils.response_cache import response_cache
+
+    client.get("/complaints/", params={"municipality": "baneshwor"}, headers=BANESHWOR_CITIZEN)
+    shards, cached = len(complaint_store._shards), len(response_cache._entries)
+    for i in range(20):
+        response = client.get("/complaints/", params={"municipality": f"nowhere {i}"}, headers=BANESHWOR_CITIZEN)
+        assert response.status_code == 200 and response.json() == []
+    assert (len(complaint_store._shards), len(response_cache._entries)) == (shards, cached)
+
+
+def test_timeline_lists_status_changes_for_one_complaint(client):
+    staff = auth_headers(800, "982142673123", role="staff")
+    created = client.post("/complaints/", data={"title": "pothole", "content": "deep"}, headers=KATHMANDU_CITIZEN)
+    complaint_id = created.json()["id"]
+
+    for status in ("working", "completed"):
+        client.post(
+            "/municipality/update-complaint-status",
+            data={"complaint_id": complaint_id, "status": status, "statement": status},
+            headers=staff,
+        )
+
+    timeline = client.get(f"/complaints/{complaint_id}/timeline", headers=KATHMANDU_CITIZEN).json()
+    assert timeline["complaint"]["status"] == "completed"
+    assert [a["action"] for a in timeline["timeline"]] == ["Marked as working", "Marked as completed"]
+
+    detail = client.get(f"/complaints/{complaint_id}", headers=KATHMANDU_CITIZEN).json()
+    assert len(detail["activities"]) == 2
+    assert client.get("/complaints/99999/timeline", headers=KATHMANDU_CITIZEN).status_code == 404
+
+
+def test_status_update_is_indexed_once_when_the_timeline_is_rebuilt(client, data_dir):
+    staff = auth_headers(800, "982142673123", role="staff")
+    before = client.get("/complaints/2/timeline", headers=staff).json()["timeline"]
+    shutil.rmtree(data_dir/"complaints"/"timeline")
+    complaint_timeline.reset_cache()
+
+    client.post("/municipality/update-complaint-status", data={"complaint_id": 2, "status": "working"}, headers=staff)
+    timeline = client.get("/complaints/2/timeline", headers=staff).json()["timeline"]
+    assert len(timeline) == len(before) + 1
+
+
+def test_mine_returns_only_own_complaints_from_author_index(client):
+    created = client.post("/complaints/", data={"title": "pothole", "content": "deep"}, headers=KATHMANDU_CITIZEN)
+
+    mine = client.get("/complaints/mine", headers=KATHMANDU_CITIZEN).json()
+    assert [c["id"] for c in mine] == [created.json()["id"]]
+
+    others = client.get("/complaints/mine", headers=BANESHWOR_CITIZEN).json()
+    assert others and all(c["author_id"] == 801 for c in others)
+
+
+def test_me_returns_full_profile_without_password(client):
+    body = client.get("/auth/me", headers=KATHMANDU_CITIZEN).json()
+    assert body["current_user"]["id"] == 20
+    assert body["profile"]["municipality"] == "Kathmandu Metropolitan"
+    assert "password" not in body["profile"]
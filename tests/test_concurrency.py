@@ -0,0 +1,81 @@
+"""
+Readers work on immutable snapshots while writers publish new versions;
+writers in different processes never lose each other's updates.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from backend.utils import complaint_store, file_handler, generations
+from backend.utils.locking import store_lock
+from benchmarks import multiprocess_load
+
+
+def test_update_publishes_a_copy_and_leaves_reader_snapshot_intact(data_dir):
+    before = complaint_store.shard("baneshwor")
+    old = before.by_id[1]
+    old_status = old["status"]
+
+    complaint_store.update(1, lambda c: c.__setitem__("status", "working"))
+
+    assert old["status"] == old_status
+    assert before.by_id[1] is old
+    assert complaint_store.get(1)["status"] == "working"
+
+
+def test_failed_change_publishes_nothing(data_dir):
+    version = complaint_store.store_version("baneshwor")
+
+    def reject(complaint):
+        complaint["status"] = "working"
+        raise RuntimeError("rejected")
+
+    with pytest.raises(RuntimeError):
+        complaint_store.update(1, reject)
+
+    assert complaint_store.store_version("baneshwor") == version
+    assert complaint_store.get(1)["status"] != "working"
+
+
+def test_concurrent_upvotes_are_not_lost(data_dir):
+    voters = range(1000, 1050)
+
+    def upvote(user_id):
+        complaint_store.update(2, lambda c: c["upvoted_by"].append(user_id))
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(upvote, voters))
+
+    complaint_store.reset_cache()
+    assert set(voters) <= set(complaint_store.get(2)["upvoted_by"])
+    assert not list(data_dir.rglob("*.tmp"))
+
+
+def test_corrupt_file_raises_instead_of_reading_empty(data_dir):
+    (data_dir/"users.json").write_text('[{"id": 1', encoding="utf-8")
+    with pytest.raises(ValueError):
+        file_handler.load_json("users.json")
+
+
+def test_version_changes_on_same_size_rewrite(data_dir):
+    file_handler.save_json("counter.json", {"upvotes": 1})
+    before = file_handler.data_version("counter.json")
+    file_handler.save_json("counter.json", {"upvotes": 2})
+    assert file_handler.data_version("counter.json") != before
+
+    # another worker's save is seen through the shared counter file
+    before = file_handler.data_version("counter.json")
+    generations.reset()
+    generations.bump(data_dir, "counter.json")
+    assert file_handler.data_version("counter.json") != before
+
+
+def test_store_lock_is_reentrant(data_dir):
+    with store_lock("complaints"):
+        with store_lock("complaints"):
+            complaint_store.update(1, lambda c: c.__setitem__("status", "working"))
+    assert complaint_store.get(1)["status"] == "working"
+
+
+def test_no_updates_lost_across_worker_processes(data_dir):
+    result = multiprocess_load.run(data_dir, workers=3, ops=10)
+    result.pop("seconds")
+    assert result == dict.fromkeys(result, 0)
@@ -0,0 +1,36 @@
+"""
+Tests for server-side id allocation.
+"""
+import json
+from backend.utils import id_sequence
+
+
+def new_user(phone: str) -> dict:
+    return {
+        "name": "Test User",
+        "phone": phone,
+        "password": "pw",
+        "role": "citizen",
+        "city": "Kathmandu",
+        "municipality": "baneshwor",
+        "ward": "10",
+    }
+
+
+def test_register_allocates_ids_after_existing_users(client, data_dir):
+    existing = max(u["id"] for u in json.loads((data_dir / "users.json").read_text()))
+
+    first = client.post("/auth/register", json=new_user("9800000001")).json()["user"]
+    second = client.post("/auth/register", json=new_user("9800000002")).json()["user"]
+
+    assert first["id"] == existing + 1
+    assert second["id"] == existing + 2
+    assert json.loads((data_dir / "sequences.json").read_text())["users"] == existing + 2
+
+
+def test_block_reservation_persists_high_water_mark(data_dir, monkeypatch):
+    monkeypatch.setattr(id_sequence, "IDS_PER_BLOCK", 10)
+    ids = [id_sequence.next_id("complaints", lambda: 41) for _ in range(3)]
+
+    assert ids == [42, 43, 44]
+    assert json.loads((data_dir / "sequences.json").read_text())["complaints"] == 51
@@ -0,0 +1,66 @@
+from conftest import auth_headers
+from backend.routes import complaints
+from backend.utils import complaint_store
+from backend.utils.idempotency import IdempotencyCache
+
+CITIZEN = auth_headers(801, "9841289518421")
+STAFF = auth_headers(800, "982142673123", role="staff")
+
+
+def test_complaint_retry_returns_original_without_rewriting(client, data_dir, monkeypatch):
+    monkeypatch.setattr(complaints, "UPLOAD_DIR", str(data_dir/"uploads"))
+    headers = {**CITIZEN, "Idempotency-Key": "submit-1"}
+    form = {"title": "Pothole", "content": "Deep one"}
+    files = {"image": ("pothole.png", b"\x89PNG fake", "image/png")}
+
+    first = client.post("/complaints/", data=form, files=files, headers=headers)
+    version = complaint_store.store_version()
+    retry = client.post("/complaints/", data=form, files=files, headers=headers)
+
+    assert retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert complaint_store.store_version() == version
+    assert complaint_store.max_id() == first.json()["id"]
+
+    # Same key, different request
+    changed = client.post("/complaints/", data={**form, "title": "Other"}, headers=headers)
+    assert changed.status_code == 422
+    # Keys are per user
+    other = client.post("/complaints/", data=form, files=files,
+                        headers={**auth_headers(700, "9800000700"), "Idempotency-Key": "submit-1"})
+    assert "Idempotent-Replayed" not in other.headers
+
+
+def test_status_update_and_post_retries_are_not_reapplied(client):
+    headers = {**STAFF, "Idempotency-Key": "status-1"}
+    for _ in range(2):
+        response = client.post("/municipality/update-complaint-status", headers=headers,
+                               data={"complaint_id": 1, "status": "working"})
+        assert response.status_code == 200
+    timeline = client.get("/complaints/1/timeline", headers=CITIZEN).json()["timeline"]
+    assert [a["action"] for a in timeline].count("Marked as working") == 1
+
+    headers = {**STAFF, "Idempotency-Key": "post-1"}
+    for _ in range(2):
+        client.post("/municipality/post-action", data={"title": "Drive", "action": "planned"}, headers=headers)
+    feed = client.get("/municipality/baneshwor/activities", headers=CITIZEN).json()
+    assert [a["title"] for a in feed].count("Drive") == 1
+
+
+def test_failed_requests_can_be_retried_with_the_same_key(client):
+    headers = {**STAFF, "Idempotency-Key": "missing"}
+    data = {"complaint_id": 999, "status": "working"}
+    assert client.post("/municipality/update-complaint-status", headers=headers, data=data).status_code == 404
+    assert client.post("/municipality/update-complaint-status", headers=headers, data=data).status_code == 404
+
+
+def test_cache_is_bounded_and_expires():
+    cache = IdempotencyCache(capacity=2, ttl=10)
+    for key in ("a", "b", "c"):
+        assert cache.begin("s", key, "d", now=0) is None
+        cache.complete("s", key, "d", {"key": key}, now=0)
+    assert len(cache) == 2
+    assert cache.begin("s", "a", "d", now=1) is None  # evicted, so it runs again
+    assert cache.begin("s", "c", "d", now=1) == {"key": "c"}
+    assert cache.begin("s", "c", "d", now=20) is None  # expired
@@ -0,0 +1,182 @@
+"""
+Post-commit job queue: retries, bounded capacity, durable spool.
+"""
+import json
+import threading
+import pytest
+from backend.utils.job_queue import JobQueue
+from conftest import auth_headers
+
+STAFF = auth_headers(800, "982142673123", "staff")
+
+
+def test_failing_job_is_retried_then_dead_lettered(data_dir):
+    queue = JobQueue(workers=1, max_attempts=3, retry_delay=0.01)
+    calls = []
+
+    @queue.register("flaky")
+    def flaky(payload):
+        calls.append(payload["n"])
+        if len(calls) < 3:
+            raise OSError("disk busy")
+
+    @queue.register("broken")
+    def broken(payload):
+        raise ValueError("bad payload")
+
+    queue.enqueue("flaky", {"n": 1})
+    queue.enqueue("broken", {"n": 2})
+    assert queue.join(timeout=5)
+
+    stats = queue.stats()
+    assert calls == [1, 1, 1]
+    assert (stats["completed"], stats["failed"], stats["retried"]) == (1, 1, 4)
+    assert stats["pending"] == 0 and stats["latency_ms"]["p50"] is not None
+
+    failed = [json.loads(line) for line in (data_dir/"jobs/failed.jsonl").read_text().splitlines()]
+    assert [f["name"] for f in failed] == ["broken"]
+    # nothing left to replay once the queue is idle
+    assert all(p.stat().st_size == 0 for p in (data_dir/"jobs").glob("spool-*.jsonl"))
+    queue.stop(timeout=5)
+
+
+def test_full_queue_runs_job_in_caller(data_dir):
+    queue = JobQueue(workers=1, capacity=1)
+    release = threading.Event()
+    ran_in = []
+
+    @queue.register("slow")
+    def slow(payload):
+        ran_in.append(threading.current_thread().name)
+        release.wait(5)
+
+    @queue.register("quick")
+    def quick(payload):
+        ran_in.append(threading.current_thread().name)
+
+    queue.enqueue("slow", {})   # taken by the worker
+    while queue.stats()["depth"]:
+        pass
+    queue.enqueue("quick", {})  # fills the queue
+    queue.enqueue("quick", {})  # queue full: runs here
+    assert ran_in[-1] == threading.current_thread().name
+    release.set()
+    assert queue.join(timeout=5)
+    queue.stop(timeout=5)
+
+
+def test_spooled_jobs_of_dead_process_are_replayed(data_dir):
+    spool = data_dir/"jobs"/"spool-999999999.jsonl"
+    spool.parent.mkdir(parents=True)
+    lines = [
+        {"op": "add", "id": "a", "name": "note", "payload": {"n": 1}, "attempts": 0, "enqueued_at": 0},
+        {"op": "add", "id": "b", "name": "note", "payload": {"n": 2}, "attempts": 0, "enqueued_at": 0},
+        {"op": "done", "id": "a"},
+    ]
+    spool.write_text("".join(json.dumps(line) + "\n" for line in lines) + '{"op": "ad')
+
+    queue = JobQueue(workers=1)
+    seen = []
+    queue.register("note")(lambda payload: seen.append(payload["n"]))
+    queue.start()
+    assert queue.join(timeout=5)
+    assert seen == [2]
+    assert not spool.exists()
+    queue.stop(timeout=5)
+
+
+def test_upload_is_moved_into_place_by_job(client, data_dir, tmp_path, monkeypatch):
+    from backend.routes import municipality
+    monkeypatch.setattr(municipality, "UPLOAD_FOLDER", str(tmp_path/"uploads"))
+
+    response = client.post(
+        "/municipality/post-action",
+        data={"title": "Road fixed", "action": "repair"},
+        files={"image": ("road.png", b"\x89PNG...", "image/png")},
+        headers=STAFF,
+    )
+    assert response.status_code == 200
+    stored = tmp_path/"uploads"/response.json()["post"]["action_image"].rsplit("/", 1)[1]
+    assert stored.read_bytes() == b"\x89PNG..."
+    assert not list((data_dir/"jobs"/"blobs").iterdir())
+
+
+def test_upload_is_not_stored_when_its_record_is_not_saved(client, data_dir, tmp_path, monkeypatch):
+    from backend.routes import complaints, municipality
+    from backend.utils import complaint_store
+    monkeypatch.setattr(municipality, "UPLOAD_FOLDER", str(tmp_path/"uploads"))
+    monkeypatch.setattr(complaints, "UPLOAD_DIR", str(tmp_path/"uploads"))
+
+    def full_disk(complaint):
+        raise OSError("disk full")
+    monkeypatch.setattr(complaint_store, "add", full_disk)
+    image = {"image": ("road.png", b"\x89PNG...", "image/png")}
+    with pytest.raises(OSError):
+        client.post("/complaints/", data={"title": "pothole", "content": "deep"}, files=image,
+                    headers=auth_headers(801, "9841289518421"))
+    missing = client.post("/municipality/update-complaint-status", data={"complaint_id": 99999, "status": "working"},
+                          files=image, headers=STAFF)
+    assert missing.status_code == 404
+    assert not (tmp_path/"uploads").exists()
+
+
+def _fail_once(monkeypatch, module, name, after_call=False):
+    """Make module.name raise OSError once, before or after doing its work."""
+    real = getattr(module, name)
+    failures = [OSError("disk busy")]
+
+    def flaky(*args):
+        if failures and not after_call:
+            raise failures.pop()
+        real(*args)
+        if failures:
+            raise failures.pop()
+    monkeypatch.setattr(module, name, flaky)
+
+
+def test_retried_jobs_do_not_repeat_their_work(client, data_dir, monkeypatch):
+    from backend.utils import activity_log, analytics, complaint_timeline
+    from backend.utils.job_queue import jobs
+    monkeypatch.setattr(jobs, "retry_delay", 0)
+    retried = jobs.retried
+
+    def feed_entries(complaint_id):
+        feed = client.get("/municipality/baneshwor/activities", headers=STAFF).json()
+        return sum(a["complaint_id"] == complaint_id for a in feed)
+
+    # The feed segment is written, then the index save fails and the job is retried
+    entries = feed_entries(2)
+    _fail_once(monkeypatch, activity_log, "_save_segment_index")
+    assert client.post("/municipality/update-complaint-status", data={"complaint_id": 2, "status": "working"},
+                       headers=STAFF).status_code == 200
+    assert feed_entries(2) == entries + 1
+
+    # Timeline and rollup are saved, then the jobs fail before being marked done
+    before = client.get("/analytics/baneshwor/wards", headers=STAFF).json()["wards"]
+    indexed = len(client.get("/complaints/1/timeline", headers=STAFF).json()["timeline"])
+    _fail_once(monkeypatch, complaint_timeline, "_save", after_call=True)
+    _fail_once(monkeypatch, analytics, "_save", after_call=True)
+    assert client.post("/municipality/update-complaint-status", data={"complaint_id": 1, "status": "completed"},
+                       headers=STAFF).status_code == 200
+
+    assert len(client.get("/complaints/1/timeline", headers=STAFF).json()["timeline"]) == indexed + 1
+    after = client.get("/analytics/baneshwor/wards", headers=STAFF).json()["wards"]
+    assert sum(w["resolved"] for w in after) == sum(w["resolved"] for w in before) + 1
+    assert jobs.retried == retried + 3
+
+
+def test_queue_failure_is_logged_not_shown_to_the_client(client, data_dir, tmp_path, monkeypatch, caplog):
+    from backend.routes import complaints
+    from backend.utils.job_queue import jobs
+    monkeypatch.setattr(complaints, "UPLOAD_DIR", str(tmp_path/"uploads"))
+
+    def spool_unwritable(*args, **kwargs):
+        raise PermissionError(f"{data_dir}/jobs is read-only")
+    monkeypatch.setattr(jobs, "enqueue", spool_unwritable)
+
+    response = client.post("/complaints/", data={"title": "pothole", "content": "deep"},
+                           files={"image": ("road.png", b"\x89PNG...", "image/png")},
+                           headers=auth_headers(801, "9841289518421"))
+    assert response.status_code == 500
+    assert response.json() == {"detail": "Error saving image"}
+    assert "read-only" in caplog.text
@@ -0,0 +1,64 @@
+"""
+/metrics exposition, storage/JWT timers and the slow-request profiler.
+"""
+import time
+from backend.utils import metrics
+from backend.utils.profiler import SlowRequestProfiler
+from conftest import auth_headers
+
+CITIZEN = auth_headers(801, "9841289518421")
+
+
+def test_metrics_report_route_templates_storage_and_tokens(client):
+    requests_before = metrics.HTTP_REQUESTS.value(method="GET", route="/complaints/{complaint_id}", status="200")
+    tokens_before = metrics.TOKEN_VERIFY_SECONDS.count(result="ok")
+
+    assert client.get("/complaints/1", headers=CITIZEN).status_code == 200
+    assert client.get("/complaints/1", headers={"Authorization": "Bearer junk"}).status_code == 401
+
+    assert metrics.HTTP_REQUESTS.value(method="GET", route="/complaints/{complaint_id}", status="200") == requests_before + 1
+    assert metrics.TOKEN_VERIFY_SECONDS.count(result="ok") == tokens_before + 1
+    assert metrics.STORAGE_READ_BYTES.value(store="complaints") > 0
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert '# TYPE hamro_http_request_duration_seconds histogram' in body
+    assert 'hamro_http_requests_total{method="GET",route="/complaints/{complaint_id}",status="401"}' in body
+    assert 'hamro_storage_parse_seconds_count{store="complaints"}' in body
+    assert 'hamro_token_verify_seconds_bucket{result="invalid",le="+Inf"}' in body
+    assert "hamro_job_queue_depth 0" in body
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram("test_seconds", "test", ("op",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, op="x")
+    samples = {(name, labels.get("le")): value for name, labels, value in histogram.samples()}
+    assert samples[("test_seconds_bucket", "0.1")] == 1
+    assert samples[("test_seconds_bucket", "1.0")] == 2
+    assert samples[("test_seconds_bucket", "+Inf")] == 3
+    assert samples[("test_seconds_count", None)] == 3
+    metrics._registry.remove(histogram)
+
+
+def test_slow_request_stacks_are_dumped(tmp_path):
+    profiler = SlowRequestProfiler(threshold_ms=5, interval_ms=1, out_dir=str(tmp_path))
+
+    def busy_handler():
+        end = time.perf_counter() + 0.05
+        while time.perf_counter() < end:
+            pass
+
+    request = profiler.begin("GET /slow")
+    busy_handler()
+    profiler.end(request)
+
+    dumps = list(tmp_path.glob("slow-*.folded"))
+    assert len(dumps) == 1
+    assert "busy_handler" in dumps[0].read_text()
+
+    fast = profiler.begin("GET /fast")
+    profiler.end(fast)
+    assert len(list(tmp_path.glob("slow-*.folded"))) == 1
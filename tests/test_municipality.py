@@ -0,0 +1,152 @@
+"""
+Tests for staff-facing municipality endpoints.
+"""
+import json
+import os
+import time
+from backend.utils import activity_log, municipality_store
+from conftest import auth_headers
+
+STAFF = auth_headers(800, "982142673123", role="staff")
+CITIZEN = auth_headers(801, "9841289518421")
+
+
+def test_batch_status_update_applies_all_items_in_one_call(client, data_dir):
+    response = client.post(
+        "/municipality/update-complaint-status/batch",
+        json={"updates": [
+            {"complaint_id": 1, "status": "working", "statement": "crew assigned"},
+            {"complaint_id": 3, "status": "completed"},
+            {"complaint_id": 9999, "status": "completed"},
+        ]},
+        headers=STAFF,
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["updated"] == 2
+    assert [r["ok"] for r in body["results"]] == [True, True, False]
+
+    complaints = {c["id"]: c for c in json.loads((data_dir / "complaints" / "baneshwor.json").read_text())}
+    assert complaints[1]["status"] == "working"
+    assert complaints[3]["status"] == "completed"
+
+    feed = client.get("/municipality/activities", headers=STAFF).json()
+    assert {a["complaint_id"] for a in feed[:2]} == {1, 3}
+
+
+def test_batch_status_update_is_staff_only(client):
+    response = client.post(
+        "/municipality/update-complaint-status/batch",
+        json={"updates": [{"complaint_id": 1, "status": "working"}]},
+        headers=CITIZEN,
+    )
+    assert response.status_code == 403
+
+
+def test_batch_post_action_writes_all_posts(client):
+    response = client.post(
+        "/municipality/post-action/batch",
+        json={"posts": [{"title": f"drain {i}", "action": "working"} for i in range(3)]},
+        headers=STAFF,
+    )
+    assert response.status_code == 200
+    titles = {a["title"] for a in client.get("/municipality/activities", headers=STAFF).json()}
+    assert {"drain 0", "drain 1", "drain 2"} <= titles
+
+
+def test_posts_are_in_the_feed_without_the_job_queue(client, monkeypatch):
+    from backend.utils.job_queue import jobs
+
+    def broken(payload):
+        raise OSError("queue down")
+    monkeypatch.setitem(jobs._handlers, "append_activities", broken)
+    monkeypatch.setattr(jobs, "retry_delay", 0)
+
+    client.post("/municipality/post-action", data={"title": "Drain cleared", "action": "repair"}, headers=STAFF)
+    client.post("/municipality/post-action/batch", json={"posts": [{"title": "Bins emptied", "action": "cleaning"}]},
+                headers=STAFF)
+    titles = [a["title"] for a in client.get("/municipality/baneshwor/activities", headers=STAFF).json()]
+    assert titles[:2] == ["Bins emptied", "Drain cleared"]
+
+
+def test_municipality_key_normalises_names():
+    key = municipality_store.municipality_key
+    assert key("Kathmandu Metropolitan") == key("kathmandu") == key(" KATHMANDU  metropolitan city ")
+    assert key("Baneshwor Municipality") == "baneshwor"
+    assert key("काठमाडौं महानगरपालिका") == key("काठमाडौं") == "काठमाडौं"
+    assert len({key("काठमाडौं"), key("ललितपुर"), key("")}) == 3
+
+
+def test_post_touches_only_own_shard(client, data_dir):
+    other = data_dir / "municipalities" / "kathmandu" / "segments.json"
+    before = other.stat().st_mtime_ns
+
+    response = client.post("/municipality/post-action", data={"title": "t", "action": "working"}, headers=STAFF)
+    assert response.status_code == 200
+
+    assert other.stat().st_mtime_ns == before
+    own = municipality_store.load_activities("baneshwor")
+    assert own[-1]["title"] == "t"
+
+
+def test_legacy_file_is_split_into_shards(data_dir):
+    legacy = [{"id": 1, "name": "X", "city": "X", "municipality": "X Municipality",
+               "activities": [{"title": "a", "timestamp": "2025-01-01T00:00:00"}]}]
+    (data_dir / "municipality.json").write_text(json.dumps(legacy))
+    (data_dir / "municipalities" / "index.json").unlink()
+
+    assert list(municipality_store.load_index()) == ["x"]
+    assert municipality_store.load_activities("x")[0]["title"] == "a"
+    assert (data_dir / "municipality.json.migrated").exists()
+
+
+def test_range_query_opens_only_overlapping_segments(client, data_dir):
+    activity_log.append("baneshwor", [{"title": "old", "timestamp": "2020-03-01T10:00:00"}])
+
+    recent = client.get("/municipality/baneshwor/activities?since=2025-01-01", headers=STAFF).json()
+    assert recent and all(a["timestamp"] >= "2025-01-01" for a in recent)
+
+    old = client.get("/municipality/activities?until=2021-01-01", headers=STAFF).json()
+    assert [a["title"] for a in old] == ["old"]
+
+    assert client.get("/municipality/activities?since=yesterday", headers=STAFF).status_code == 400
+
+
+def test_date_only_until_includes_that_whole_day(client):
+    activity_log.append("baneshwor", [{"title": "evening", "timestamp": "2020-03-01T18:30:00"}])
+
+    day = client.get("/municipality/baneshwor/activities?since=2020-03-01&until=2020-03-01", headers=STAFF).json()
+    assert [a["title"] for a in day] == ["evening"]
+    morning = client.get("/municipality/baneshwor/activities?until=2020-03-01T12:00:00", headers=STAFF).json()
+    assert "evening" not in [a["title"] for a in morning]
+
+
+def test_bounds_with_an_offset_are_compared_in_local_time(client):
+    saved_tz = os.environ.get("TZ")
+    os.environ["TZ"] = "Asia/Kathmandu"
+    time.tzset()
+    try:
+        activity_log.append("baneshwor", [{"title": "evening", "timestamp": "2020-03-01T18:30:00"}])
+
+        def titles(**bounds):
+            feed = client.get("/municipality/baneshwor/activities", params=bounds, headers=STAFF).json()
+            return [a["title"] for a in feed]
+        # 12:45 UTC is 18:30 in Kathmandu
+        assert "evening" in titles(since="2020-03-01T12:45:00Z", until="2020-03-01T12:45:00Z")
+        assert "evening" not in titles(until="2020-03-01T18:29:59+05:45")
+        assert "evening" not in titles(since="2020-03-01T18:30:01+05:45")
+    finally:
+        if saved_tz is None:
+            del os.environ["TZ"]
+        else:
+            os.environ["TZ"] = saved_tz
+        time.tzset()
+
+
+def test_archive_compacts_old_segments_out_of_default_feed(data_dir):
+    activity_log.append("baneshwor", [{"title": "old", "timestamp": "2020-03-01T10:00:00"}])
+
+    assert activity_log.archive("baneshwor", retention_days=365) >= 1
+    assert (data_dir / "municipalities" / "baneshwor" / "segments" / "2020-03.json.gz").exists()
+    assert "old" not in [a["title"] for a in activity_log.query("baneshwor")]
+    assert "old" in [a["title"] for a in activity_log.query("baneshwor", include_archived=True)]
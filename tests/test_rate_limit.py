@@ -0,0 +1,45 @@
+from conftest import auth_headers
+from backend.utils import rate_limit
+from backend.utils.rate_limit import TokenBucketLimiter, parse_limits
+
+
+def test_token_bucket_refills_and_evicts_idle_buckets():
+    limiter = TokenBucketLimiter(2, 10, idle_seconds=60)
+    assert limiter.acquire("a", now=0) == 0
+    assert limiter.acquire("a", now=0) == 0
+    assert limiter.acquire("a", now=0) == 5.0  # one token every 5 seconds
+    assert limiter.acquire("a", now=5) == 0
+
+    limiter.acquire("b", now=30)
+    limiter.acquire("c", now=100)
+    assert len(limiter) == 1  # a and b were idle for over a minute
+
+    assert parse_limits("upvote=30/60, login=5") == {"upvote": (30, 60.0), "login": (5, 60.0)}
+
+
+def test_login_is_limited_per_ip(client):
+    credentials = {"phone": "9841289518421", "password": "wrong"}
+    for _ in range(rate_limit.DEFAULT_LIMITS["login"][0]):
+        assert client.post("/auth/login", json=credentials).status_code == 401
+
+    response = client.post("/auth/login", json=credentials)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+def test_upvotes_are_limited_per_user(client, monkeypatch):
+    monkeypatch.setitem(rate_limit.limiters, "upvote", TokenBucketLimiter(1, 60))
+    first = auth_headers(5001, "9800005001")
+    assert client.post("/complaints/1/upvote", headers=first).status_code == 200
+    assert client.post("/complaints/2/upvote", headers=first).status_code == 429
+    # Another user has a bucket of their own
+    assert client.post("/complaints/2/upvote", headers=auth_headers(5002, "9800005002")).status_code == 200
+
+
+def test_writes_are_shed_when_job_backlog_is_deep(client, monkeypatch):
+    monkeypatch.setattr(rate_limit, "SHED_QUEUE_DEPTH", -1)
+    response = client.post("/complaints/", data={"title": "t", "content": "c"}, headers=auth_headers(801, "9841289518421"))
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == str(rate_limit.SHED_RETRY_AFTER)
+    # Reads are never shed
+    assert client.get("/complaints/1", headers=auth_headers(801, "9841289518421")).status_code == 200
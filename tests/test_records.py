@@ -0,0 +1,47 @@
+"""
+Tests for the compact complaint/activity records.
+"""
+from array import array
+from backend.utils.records import ActivityRecord, ComplaintRecord
+
+COMPLAINT = {
+    "id": 7,
+    "title": "waste",
+    "content": "waste is unmanaged",
+    "author_id": 100,
+    "author_phone": "9812042131",
+    "municipality": "baneshwor",
+    "ward": "3",
+    "status": "open",
+    "created_at": "2025-08-29T08:07:25.370511",
+    "upvotes": 2,
+    "upvoted_by": [801, 100],
+    "image_url": None,
+    "completed_at": None,
+}
+
+
+def test_complaint_record_round_trips_and_packs_fields():
+    record = ComplaintRecord.from_dict(COMPLAINT)
+    assert record.to_dict() == COMPLAINT
+    assert isinstance(record.created_at, int)
+    assert isinstance(record.upvoted_by, array)
+
+
+def test_complaint_record_supports_dict_style_updates():
+    record = ComplaintRecord.from_dict(COMPLAINT)
+    record["upvoted_by"].append(5)
+    record["status"] = "completed"
+    record["completed_at"] = "2025-09-01T10:00:00"
+
+    assert 5 in record["upvoted_by"]
+    assert record.get("completed_at") == "2025-09-01T10:00:00"
+    assert record.to_dict()["upvoted_by"] == [801, 100, 5]
+
+
+def test_activity_record_keeps_unknown_keys_and_odd_timestamps():
+    activity = {"complaint_id": None, "title": "t", "action": "working", "statement": None,
+                "timestamp": "2025-08-29", "by": 700, "action_image": None, "municipality": "X"}
+    record = ActivityRecord.from_dict(activity)
+    assert record.to_dict() == activity
+    assert record["municipality"] == "X"
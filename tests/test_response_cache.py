@@ -0,0 +1,39 @@
+"""
+Tests for the pre-serialised response cache.
+"""
+import gzip
+import json
+from backend.utils.response_cache import choose_encoding, compress_variants
+from conftest import auth_headers
+
+CITIZEN = auth_headers(801, "9841289518421")
+
+
+def test_choose_encoding_respects_accept_header():
+    variants = compress_variants(b"x" * 4096)
+    assert choose_encoding(variants, "gzip, deflate") == "gzip"
+    assert choose_encoding(variants, "gzip;q=0") == "identity"
+    assert choose_encoding(variants, None) == "identity"
+
+
+def test_list_complaints_served_compressed_and_refreshed_after_write(client):
+    first = client.get("/complaints/", headers={**CITIZEN, "Accept-Encoding": "gzip"})
+    assert first.status_code == 200
+    assert first.headers["vary"] == "Accept-Encoding"
+    before = first.json()
+    # Sample complaint 3 is upvoted by user 100 only
+    assert before[-1]["id"] == 3 and before[-1]["upvoted_by"] == [100]
+
+    response = client.post("/complaints/3/upvote", headers=CITIZEN)
+    assert response.status_code == 200
+    assert response.json()["upvotes"] == 2
+
+    plain = client.get("/complaints/", headers={**CITIZEN, "Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.json()[-1]["upvoted_by"] == [100, 801]
+    assert json.loads(plain.content) == plain.json()
+
+
+def test_compress_variants_round_trip():
+    body = json.dumps([{"id": i} for i in range(200)]).encode()
+    assert gzip.decompress(compress_variants(body)["gzip"]) == body
@@ -0,0 +1,47 @@
+"""
+Tests for the binary snapshot format and its use by file_handler.
+"""
+import json
+from backend.utils import file_handler
+from backend.utils.snapshot import SnapshotReader, read_snapshot, write_snapshot
+
+
+def test_snapshot_round_trips_lists_and_dicts(tmp_path):
+    records = [{"id": i, "title": f"t{i}", "upvoted_by": [1, 2]} for i in range(50)]
+    write_snapshot(tmp_path / "a.snap", records)
+    write_snapshot(tmp_path / "b.snap", {"1": "kathmandu", "2": "baneshwor"})
+
+    assert read_snapshot(tmp_path / "a.snap") == records
+    assert read_snapshot(tmp_path / "b.snap") == {"1": "kathmandu", "2": "baneshwor"}
+    with SnapshotReader(tmp_path / "a.snap") as reader:
+        assert len(reader) == 50 and reader[42]["title"] == "t42"
+
+
+def test_newer_snapshot_is_loaded_automatically_and_exported(data_dir, monkeypatch):
+    file_handler.import_json("users.json")
+    users = json.loads((data_dir / "users.json").read_text())
+
+    monkeypatch.setattr(file_handler, "SNAPSHOT_FORMAT", "binary")
+    file_handler.save_json("users.json", users[:2])
+    assert file_handler.load_json("users.json") == users[:2]
+
+    file_handler.export_json("users.json")
+    assert json.loads((data_dir / "users.json").read_text()) == users[:2]
+
+
+def test_app_runs_on_snapshots(client, data_dir, monkeypatch):
+    from backend.cli import main
+    main(["import-json"])
+    for path in data_dir.rglob("*.json"):
+        path.unlink()
+    monkeypatch.setattr(file_handler, "SNAPSHOT_FORMAT", "binary")
+
+    login = client.post("/auth/login", json={"phone": "9841289518421", "password": "pass1234"})
+    token = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    # Sample complaint 3 is upvoted by user 100 only; the vote is saved to its snapshot
+    upvoted = client.post("/complaints/3/upvote", headers=token)
+    assert upvoted.status_code == 200 and upvoted.json()["upvotes"] == 2
+    complaints = client.get("/complaints/", headers=token).json()
+    assert [c["id"] for c in complaints] == [1, 2, 3]
+    assert complaints[2]["upvoted_by"] == [100, 801]
+    assert not list(data_dir.rglob("*.json"))
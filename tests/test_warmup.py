@@ -0,0 +1,56 @@
+"""
+App factory warm-up and the health/readiness probes.
+"""
+import threading
+import time
+from fastapi.testclient import TestClient
+from backend import warmup
+from backend.main import create_app
+from backend.utils import auth_utils, complaint_store
+
+
+def test_blocking_warm_up_loads_stores_before_serving(data_dir, monkeypatch):
+    monkeypatch.setattr(warmup, "WARMUP_MODE", "blocking")
+    with TestClient(create_app()) as client:
+        assert complaint_store._shards
+        assert auth_utils._user_index[0] is not None
+
+        response = client.get("/readyz")
+        assert response.status_code == 200
+        report = response.json()
+        assert report["ready"]
+        assert [s["name"] for s in report["steps"]] == [name for name, _ in warmup.STEPS]
+        assert all(s["state"] == "done" and s["ms"] is not None for s in report["steps"])
+
+
+def test_readyz_is_503_until_background_warm_up_finishes(data_dir, monkeypatch):
+    release = threading.Event()
+    steps = [("users", auth_utils.preload), ("slow", lambda: release.wait(5))]
+    monkeypatch.setattr(warmup, "WARMUP_MODE", "background")
+
+    app = create_app()
+    app.state.warmup = warmup.WarmUp(steps)
+    with TestClient(app) as client:
+        assert client.get("/healthz").status_code == 200
+        response = client.get("/readyz")
+        assert response.status_code == 503
+        assert response.json()["steps"][1]["state"] in ("pending", "running")
+
+        release.set()
+        for _ in range(100):
+            if client.get("/readyz").status_code == 200:
+                break
+            time.sleep(0.01)
+        assert client.get("/readyz").json()["ready"]
+
+
+def test_failed_step_keeps_worker_unready(data_dir):
+    def broken():
+        raise OSError("data dir missing")
+
+    state = warmup.WarmUp([("users", auth_utils.preload), ("broken", broken), ("never", lambda: None)])
+    state.run()
+    report = state.report()
+    assert not report["ready"]
+    assert [s["state"] for s in report["steps"]] == ["done", "failed", "pending"]
+    assert "data dir missing" in report["steps"][1]["error"]